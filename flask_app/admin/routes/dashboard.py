@@ -1,9 +1,12 @@
 from flask import render_template, current_app, Blueprint, request, redirect, url_for, flash, session
 from extensions.database import db
 from flask_app.models.user import User, UserType, ApplicationStatus
+from flask_app.models.embedding import UserEmbedding
 from extensions.cognito import require_auth, CognitoTokenVerifier
 from extensions.logging import get_logger
 from extensions.embeddings import EmbeddingFactory
+from flask_app.extensions.mentor_index import mentor_vector_index
+from flask_app.extensions.embedding_jobs import embedding_job_queue
 from sqlalchemy import text
 from os import path
 
@@ -64,6 +67,8 @@ def index():
 @admin_dashboard_bp.route('/logout')
 @require_auth
 def logout():
+    if session.get('access_token'):
+        CognitoTokenVerifier().revoke_token(session['access_token'])
     session.clear()
     logger.debug(f'{session.get("username")} logged out')
     return redirect(url_for('admin.index'))
@@ -122,12 +127,22 @@ def _update_mentor_status(mentor_id, status, action_name):
             return {'success': False, 'error': 'Mentor not found'}, 404
             
         user.application_status = status
+        job = None
         if 'APPROVED' in status:
-            embedding_factory.store_embedding(user.cognito_sub, user.profile)
+            if embedding_job_queue.enabled:
+                # Embeddings are generated by the job workers, the request doesn't wait on OpenAI
+                job = embedding_job_queue.enqueue(user.cognito_sub, user.profile)
+            else:
+                embedding_factory.store_embedding(user.cognito_sub, user.profile)
         logger.info(f'{action_name.capitalize()} mentor {mentor_id} by {session.get("username")}')
+        UserEmbedding.sync_eligibility([mentor_id])
         db.session.commit()
+        mentor_vector_index.refresh_users([mentor_id])
         logger.info(f'Mentor {mentor_id} {action_name} successfully')
-        return {'success': True}, 200
+        response = {'success': True}
+        if job:
+            response['job_id'] = job.id
+        return response, 200
     except Exception as e:
         logger.error(f'Error {action_name} mentor {mentor_id}: {str(e)}')
         logger.exception(e)
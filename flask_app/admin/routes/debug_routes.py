@@ -1,9 +1,12 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from sqlalchemy.exc import OperationalError, ProgrammingError
 from sqlalchemy import text, inspect
 from extensions.database import db
-from extensions.cognito import require_auth
+from extensions.cognito import require_auth, require_admin, CognitoTokenVerifier, verified_token_cache
 from extensions.logging import get_logger
+from flask_app.extensions.vector_index import vector_index_manager
+from extensions.embeddings import TheAlgorithm
+from flask_app.extensions.embedding_jobs import embedding_job_queue
 
 logger = get_logger(__name__)
 
@@ -47,3 +50,123 @@ def check_database():
 def health_check():
     logger.debug("Health check endpoint called")
     return jsonify({"status": "Flask app with PostgreSQL is running"}), 200
+
+
+@debug_bps.route('/vector-indexes', methods=['GET'])
+@require_auth
+@require_admin
+def list_vector_indexes():
+    """List the managed pgvector indexes and the parameters they were built with"""
+    try:
+        return jsonify({"indexes": vector_index_manager.list_builds()})
+    except Exception as e:
+        logger.error(f"Error listing vector indexes: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@debug_bps.route('/vector-indexes/rebuild', methods=['POST'])
+@require_auth
+@require_admin
+def rebuild_vector_indexes():
+    """Rebuild the managed pgvector indexes, optionally overriding method and per_type"""
+    data = request.get_json(silent=True) or {}
+    logger.info(f"Rebuilding vector indexes with {data}")
+    try:
+        builds = vector_index_manager.build_indexes(method=data.get('method'), per_type=data.get('per_type'))
+        return jsonify({"indexes": builds})
+    except Exception as e:
+        logger.error(f"Error rebuilding vector indexes: {str(e)}")
+        logger.exception(e)
+        return jsonify({"error": str(e)}), 500
+
+@debug_bps.route('/caches', methods=['GET'])
+@require_auth
+@require_admin
+def list_caches():
+    """Report size and hit/miss counters of the embedding and auth caches"""
+    the_algorithm = TheAlgorithm()
+    embedding_cache = the_algorithm.embedding_factory.embedding_cache
+    match_result_cache = the_algorithm.match_result_cache
+    return jsonify({
+        "query_embeddings": the_algorithm.query_embedding_cache.stats(),
+        "match_results": match_result_cache.stats() if match_result_cache else None,
+        "embeddings": embedding_cache.stats() if embedding_cache else None,
+        "jwks": CognitoTokenVerifier().jwks.stats(),
+        "verified_tokens": verified_token_cache.stats()
+    })
+
+@debug_bps.route('/caches/flush', methods=['POST'])
+@require_auth
+@require_admin
+def flush_caches():
+    """Flush one in-process cache ({"cache": "query_embeddings"|"match_results"|"verified_tokens"}) or all of them ({"cache": "all"})"""
+    data = request.get_json(silent=True) or {}
+    cache = data.get('cache', 'query_embeddings')
+    if cache not in ('query_embeddings', 'match_results', 'verified_tokens', 'all'):
+        return jsonify({"error": "cache must be 'query_embeddings', 'match_results', 'verified_tokens' or 'all'"}), 400
+
+    the_algorithm = TheAlgorithm()
+    flushed = {}
+    if cache in ('query_embeddings', 'all'):
+        flushed["query_embeddings"] = the_algorithm.query_embedding_cache.clear()
+    if cache in ('match_results', 'all') and the_algorithm.match_result_cache:
+        flushed["match_results"] = the_algorithm.match_result_cache.clear()
+    if cache in ('verified_tokens', 'all'):
+        flushed["verified_tokens"] = verified_token_cache.clear()
+    embedding_cache = the_algorithm.embedding_factory.embedding_cache
+    if cache == 'all' and embedding_cache:
+        flushed["embeddings"] = embedding_cache.memory.clear()
+    logger.info(f"Flushed caches: {flushed}")
+    return jsonify({"flushed": flushed})
+
+@debug_bps.route('/embedding-jobs', methods=['GET'])
+@require_auth
+@require_admin
+def embedding_jobs_status():
+    """Report embedding job counts per status and the most recent dead jobs"""
+    try:
+        return jsonify(embedding_job_queue.status())
+    except Exception as e:
+        logger.error(f"Error reading embedding job status: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@debug_bps.route('/embedding-jobs/<job_id>', methods=['GET'])
+@require_auth
+@require_admin
+def get_embedding_job(job_id):
+    """Get a single embedding job"""
+    job = embedding_job_queue.get_job(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+@debug_bps.route('/embedding-jobs/<job_id>/retry', methods=['POST'])
+@require_auth
+@require_admin
+def retry_embedding_job(job_id):
+    """Put a dead embedding job back in the queue"""
+    job = embedding_job_queue.retry(job_id)
+    if not job:
+        return jsonify({"error": "Job not found or not dead"}), 404
+    return jsonify(job.to_dict())
+
+@debug_bps.route('/matching/binary-recall', methods=['GET'])
+@require_auth
+@require_admin
+def binary_recall():
+    """Measure recall of the binary prefilter search against the exact search"""
+    try:
+        sample_size = int(request.args.get('sample_size', 50))
+        limit = int(request.args.get('limit', 10))
+        candidates = request.args.get('candidates')
+        result = TheAlgorithm().measure_binary_recall(
+            sample_size=sample_size,
+            limit=limit,
+            binary_candidates=int(candidates) if candidates else None
+        )
+        return jsonify(result)
+    except ValueError:
+        return jsonify({"error": "sample_size, limit and candidates must be integers"}), 400
+    except Exception as e:
+        logger.error(f"Error measuring binary recall: {str(e)}")
+        logger.exception(e)
+        return jsonify({"error": str(e)}), 500
@@ -3,12 +3,14 @@ from flask_app.models.user import User, UserType
 from flask_app.models.embedding import UserEmbedding
 from flask_app.config import EXCLUDED_EMBEDDING_FIELDS
 from extensions.embeddings import EmbeddingFactory, TheAlgorithm
+from flask_app.extensions.embedding_catalog import embedding_catalog
+from flask_app.extensions.mentor_index import mentor_vector_index
+from flask_app.extensions.embedding_writer import embedding_writer
 from extensions.logging import get_logger
 from extensions.database import db
 import json
 from uuid import uuid4
 import threading
-import concurrent.futures
 import queue
 from typing import Dict, List, Optional, Any
 import os
@@ -16,7 +18,7 @@ import time
 import glob
 
 # Import the generate_mentors module
-from extensions.openai_generator import generate_mentor_profiles, openai_thread_pool
+from extensions.openai_generator import generate_mentor_profiles
 
 logger = get_logger(__name__)
 fake_mentors_bp = Blueprint('fake_mentors', __name__)
@@ -110,31 +112,6 @@ def fake_mentors_page():
     )
 
 
-def generate_embeddings(cognito_sub: str, embedding_data: Dict[str, str]) -> Optional[Dict[str, List[float]]]:
-    """
-    Generate embeddings for a user - this is the function that will be threaded
-    
-    This function ONLY calls the OpenAI API and does not interact with the database.
-    
-    Args:
-        cognito_sub: The user's cognito sub ID
-        embedding_data: The data to generate embeddings from
-        
-    Returns:
-        Optional[Dict[str, List[float]]]: Dictionary with embedding types as keys and vector embeddings as values,
-                                         or None if there was an error
-    """
-    try:
-        # Only call the OpenAI API part, not the database operations
-        embeddings_dict = embedding_factory.generate_embeddings(cognito_sub, embedding_data)
-        logger.debug(f'Generated embeddings for user {cognito_sub}')
-        return embeddings_dict
-    except Exception as e:
-        logger.error(f'Error generating embeddings for user {cognito_sub}: {str(e)}')
-        logger.exception(e)
-        return None
-
-
 @fake_mentors_bp.route('/fake-mentors/import', methods=['POST'])
 def import_mentors_from_json():
     """Import mentor profiles from a JSON/JSONL file"""
@@ -236,54 +213,27 @@ def import_mentors_from_json():
         # Flush to get IDs
         db.session.flush()
 
-        # Now use thread pool to generate embeddings in parallel (only the OpenAI calls)
-        future_to_sub = {}
-        for cognito_sub, embedding_data in embedding_tasks:
-            future = openai_thread_pool.submit(generate_embeddings, cognito_sub, embedding_data)
-            future_to_sub[future] = cognito_sub
-
-        # Process results as they complete
-        successful_embeddings = 0
-        embeddings_to_store = []  # Collect all embeddings to store in main thread
-
-        for future in concurrent.futures.as_completed(future_to_sub.keys()):
-            cognito_sub = future_to_sub[future]
-            embeddings_dict = future.result()
-
-            if embeddings_dict:
-                # Collect the embeddings to store later in the main thread
-                embeddings_to_store.append((cognito_sub, embeddings_dict))
+        # Generate embeddings for every profile in packed batch requests (only the OpenAI calls)
+        embeddings_by_user = embedding_factory.generate_embeddings_bulk([
+            (cognito_sub, field_name, text)
+            for cognito_sub, embedding_data in embedding_tasks
+            for field_name, text in embedding_data.items()
+        ])
+        content_hashes_by_user = {
+            cognito_sub: {field_name: embedding_factory.content_hash(text) for field_name, text in embedding_data.items()}
+            for cognito_sub, embedding_data in embedding_tasks
+        }
 
-        # Store all embeddings in the database (in the main thread)
-        for cognito_sub, embeddings_dict in embeddings_to_store:
-            try:
-                # Store each embedding in the database directly
-                for embedding_type, vector_embedding in embeddings_dict.items():
-                    # Check if an embedding of this type already exists for this user
-                    existing_embedding = UserEmbedding.query.filter_by(
-                        user_id=cognito_sub,
-                        embedding_type=embedding_type
-                    ).first()
-
-                    if existing_embedding:
-                        # Update existing embedding
-                        logger.info(f"Updating existing {embedding_type} embedding for user {cognito_sub}")
-                        existing_embedding.vector_embedding = vector_embedding
-                    else:
-                        # Create new embedding
-                        new_embedding = UserEmbedding(
-                            user_id=cognito_sub,
-                            embedding_type=embedding_type,
-                            vector_embedding=vector_embedding
-                        )
-                        db.session.add(new_embedding)
-
-                successful_embeddings += 1
-            except Exception as e:
-                logger.error(f'Error storing embeddings for user {cognito_sub}: {str(e)}')
+        # Store all embeddings with set-based upserts (COPY for large loads), in the main thread
+        embedding_writer.write(embedding_writer.build_rows(embeddings_by_user, content_hashes_by_user))
+        successful_embeddings = len(embeddings_by_user)
 
-        # Commit all changes
+        # Copy mentor eligibility onto the new rows, then commit all changes
+        db.session.flush()
+        UserEmbedding.sync_eligibility([user.cognito_sub for user in users_to_add])
         db.session.commit()
+        embedding_catalog.reconcile()
+        mentor_vector_index.refresh_users([user.cognito_sub for user in users_to_add])
 
         logger.info(
             f'Successfully imported {len(users_to_add)} mentor profiles with {successful_embeddings} embeddings')
@@ -671,54 +621,27 @@ def load_results_to_db():
         # Flush to get IDs
         db.session.flush()
 
-        # Now use thread pool to generate embeddings in parallel (only the OpenAI calls)
-        future_to_sub = {}
-        for cognito_sub, embedding_data in embedding_tasks:
-            future = openai_thread_pool.submit(generate_embeddings, cognito_sub, embedding_data)
-            future_to_sub[future] = cognito_sub
-
-        # Process results as they complete
-        successful_embeddings = 0
-        embeddings_to_store = []  # Collect all embeddings to store in main thread
-
-        for future in concurrent.futures.as_completed(future_to_sub.keys()):
-            cognito_sub = future_to_sub[future]
-            embeddings_dict = future.result()
-
-            if embeddings_dict:
-                # Collect the embeddings to store later in the main thread
-                embeddings_to_store.append((cognito_sub, embeddings_dict))
+        # Generate embeddings for every profile in packed batch requests (only the OpenAI calls)
+        embeddings_by_user = embedding_factory.generate_embeddings_bulk([
+            (cognito_sub, field_name, text)
+            for cognito_sub, embedding_data in embedding_tasks
+            for field_name, text in embedding_data.items()
+        ])
+        content_hashes_by_user = {
+            cognito_sub: {field_name: embedding_factory.content_hash(text) for field_name, text in embedding_data.items()}
+            for cognito_sub, embedding_data in embedding_tasks
+        }
 
-        # Store all embeddings in the database (in the main thread)
-        for cognito_sub, embeddings_dict in embeddings_to_store:
-            try:
-                # Store each embedding in the database directly
-                for embedding_type, vector_embedding in embeddings_dict.items():
-                    # Check if an embedding of this type already exists for this user
-                    existing_embedding = UserEmbedding.query.filter_by(
-                        user_id=cognito_sub,
-                        embedding_type=embedding_type
-                    ).first()
-
-                    if existing_embedding:
-                        # Update existing embedding
-                        logger.info(f"Updating existing {embedding_type} embedding for user {cognito_sub}")
-                        existing_embedding.vector_embedding = vector_embedding
-                    else:
-                        # Create new embedding
-                        new_embedding = UserEmbedding(
-                            user_id=cognito_sub,
-                            embedding_type=embedding_type,
-                            vector_embedding=vector_embedding
-                        )
-                        db.session.add(new_embedding)
-
-                successful_embeddings += 1
-            except Exception as e:
-                logger.error(f'Error storing embeddings for user {cognito_sub}: {str(e)}')
+        # Store all embeddings with set-based upserts (COPY for large loads), in the main thread
+        embedding_writer.write(embedding_writer.build_rows(embeddings_by_user, content_hashes_by_user))
+        successful_embeddings = len(embeddings_by_user)
 
-        # Commit all changes
+        # Copy mentor eligibility onto the new rows, then commit all changes
+        db.session.flush()
+        UserEmbedding.sync_eligibility([user.cognito_sub for user in users_to_add])
         db.session.commit()
+        embedding_catalog.reconcile()
+        mentor_vector_index.refresh_users([user.cognito_sub for user in users_to_add])
 
         logger.info(
             f'Successfully loaded {len(users_to_add)} mentor profiles with {successful_embeddings} embeddings into database')
@@ -360,6 +360,7 @@ def test_matching_algorithm():
                 formatted_matches.append({
                     "user_id": match["user_id"],
                     "score": match["score"],
+                    "distance": match["distance"],
                     "email": user.email,
                     "profile": profile,
                     "matched_on": [e.embedding_type for e in match["embeddings"]]
@@ -400,15 +401,12 @@ def run_tests_with_data(test_data: Dict[str, Any]) -> Tuple[Dict[str, Any], Opti
     # Store all test results for saving to file
     all_test_results = []
     
+    # Sanitize every search query up front so they can all be matched in one batch
+    sanitized_queries = {}
     for i, query in enumerate(queries):
-        logger.debug(f"Testing query {i+1}/{total}...")
-        
         # Extract the query data, removing the targetMentorId field
         search_query = {k: v for k, v in query.items() if k != 'targetMentorId'}
-        
-        # Generate a unique test user ID for this query
-        test_user_id = f"test-user-{uuid4()}"
-        
+
         # Sanitize the search query to ensure all values are strings
         sanitized_query = {}
         for key, value in search_query.items():
@@ -418,18 +416,22 @@ def run_tests_with_data(test_data: Dict[str, Any]) -> Tuple[Dict[str, Any], Opti
                 sanitized_query[key] = json.dumps(value)
             else:
                 sanitized_query[key] = str(value)
-        
-        try:
-            # Get matches using the algorithm
-            matches = the_algorithm.get_closest_embeddings(
-                test_user_id,  # Use a unique user ID for each test
-                sanitized_query,
-                limit=10  # Get more than 3 to see where the target mentor ranks
-            )
-        except Exception as e:
-            logger.error(f"Error getting matches for query {i+1}: {str(e)}")
-            # Return empty matches if there's an error
-            matches = []
+
+        # Use a unique test user ID for each query
+        sanitized_queries[f"test-user-{uuid4()}"] = sanitized_query
+    test_user_ids = list(sanitized_queries.keys())
+
+    try:
+        # Get matches for every query at once, more than 3 to see where the target mentor ranks
+        batch_matches = the_algorithm.get_closest_embeddings_batch(sanitized_queries, limit=10)
+    except Exception as e:
+        logger.error(f"Error getting batch matches: {str(e)}")
+        # Return empty matches if there's an error
+        batch_matches = {}
+
+    for i, query in enumerate(queries):
+        logger.debug(f"Testing query {i+1}/{total}...")
+        matches = batch_matches.get(test_user_ids[i], [])
         
         # Check if the target mentor is in the top 3 matches
         target_mentor_id = query["targetMentorId"]
@@ -261,7 +261,7 @@ def get_available_credits():
                 token, refresh_token, id_token, expires_in = parse_headers(auth_header)
         else:
             token = session.get('access_token')
-        user_info = verifier.get_user_attributes(token)
+        user_info = verifier.resolve_identity(token, required=('user_id', 'email')) or {}
 
         user_email = user_info.get('email')
         
@@ -318,7 +318,7 @@ def redeem_credit():
     code = data.get('code')
     pool_id = data.get('pool_id')
     verifier = CognitoTokenVerifier()
-    user_info = verifier.get_user_attributes(session.get('access_token'))
+    user_info = verifier.resolve_identity(session.get('access_token'), required=('user_id', 'email')) or {}
     
     if not code or not pool_id:
         return jsonify({'error': 'Missing required fields'}), 400
@@ -3,14 +3,17 @@ from flask_app.api.users.routes import get_user_from_token
 from models.user import User
 from extensions.logging import get_logger
 from extensions.embeddings import EmbeddingFactory, TheAlgorithm
-from extensions.cognito import require_auth, CognitoTokenVerifier, parse_headers
+from extensions.cognito import require_auth, require_admin_or_district_admin, CognitoTokenVerifier, parse_headers
 from extensions.matches import mentee_to_mentor_matches, submit_mentee_request, get_requests_for_mentor
+from flask_app.config import MatchingConfig
+from flask_app.extensions.match_filters import MatchFilters
 
 matching_bp = Blueprint('matching', __name__, url_prefix='/matching')
 logger = get_logger(__name__)
 embedding_factory = EmbeddingFactory()
 the_algorithm = TheAlgorithm()
 verifier = CognitoTokenVerifier()
+matching_config = MatchingConfig()
 
 @matching_bp.route('/find_matches', methods=['POST'])
 # @require_auth
@@ -27,6 +30,9 @@ def find_matches():
         "interests": "Machine Learning, Web Development",
         "goals": "Improve coding skills, learn new technologies"
     }
+
+    An optional "filters" object restricts mentors by profile fields instead of ranking on them,
+    e.g. "filters": {"country": "United States", "timeZone": "America/New_York", "timeZoneWindowHours": 2}
     
     Returns:
         A JSON object with matched users sorted by relevance
@@ -47,6 +53,11 @@ def find_matches():
         search_criteria = request.json
         if not search_criteria or not isinstance(search_criteria, dict):
             return jsonify({"error": "Invalid search criteria. Expected JSON object with search terms."}), 400
+
+        try:
+            filters = MatchFilters.from_dict(search_criteria.pop('filters', None))
+        except ValueError as e:
+            return jsonify({"error": f"Invalid filters: {str(e)}"}), 400
         
         # Get the limit parameter from query string, default to 10
         try:
@@ -59,7 +70,7 @@ def find_matches():
         logger.error(f'Search criteria: {search_criteria}')
         
         # Find matches using the algorithm
-        matches = the_algorithm.get_closest_embeddings(user_id, search_criteria, limit)
+        matches = the_algorithm.get_closest_embeddings(user_id, search_criteria, limit, filters=filters)
 
         logger.error(f'Found {len(matches)} matches for user {user_id}')
         
@@ -85,6 +96,137 @@ def find_matches():
         logger.error(f"Error finding matches: {str(e)}")
         return jsonify({"error": f"Failed to find matches: {str(e)}"}), 500
 
+@matching_bp.route('/find_matches_batch', methods=['POST'])
+@require_auth
+@require_admin_or_district_admin
+def find_matches_batch():
+    """
+    Find matches for many mentees at once, e.g. when onboarding a cohort. Admins and district admins only,
+    the results replace each mentee's saved matches.
+
+    Request body should contain a JSON object mapping each mentee's user_id to the
+    criteria to match on, in the same format as find_matches.
+
+    Example:
+    {
+        "queries": {
+            "mentee-1": {"skills": "Python, JavaScript", "goals": "Improve coding skills"},
+            "mentee-2": {"primarySubject": "Biology", "goals": "Classroom management"}
+        },
+        "filters": {"country": "United States"}
+    }
+
+    Returns:
+        A JSON object with each mentee's matched users sorted by relevance
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        queries = data.get('queries')
+        if not queries or not isinstance(queries, dict) or \
+                not all(isinstance(criteria, dict) for criteria in queries.values()):
+            return jsonify({"error": "Invalid queries. Expected JSON object of user_id -> search terms."}), 400
+        if len(queries) > matching_config.MATCHING_BATCH_MAX_QUERIES:
+            return jsonify({"error": f"At most {matching_config.MATCHING_BATCH_MAX_QUERIES} queries per request"}), 400
+        try:
+            filters = MatchFilters.from_dict(data.get('filters'))
+        except ValueError as e:
+            return jsonify({"error": f"Invalid filters: {str(e)}"}), 400
+
+        # Get the limit parameter from query string, default to 10
+        try:
+            limit = int(request.args.get('limit', 10))
+            if limit < 1 or limit > 50:
+                limit = 10  # Reset to default if out of reasonable range
+        except ValueError:
+            limit = 10
+
+        logger.info(f"Finding matches for {len(queries)} mentees")
+        matches = the_algorithm.get_closest_embeddings_batch(queries, limit, filters=filters)
+
+        results = {}
+        for mentee_id, mentee_matches in matches.items():
+            results[mentee_id] = [{"user_id": match["user_id"]} for match in mentee_matches]
+            # Save mentor IDs for this mentee
+            mentee_to_mentor_matches[mentee_id] = [match["user_id"] for match in mentee_matches]
+        logger.info(f"Saved matches for {len(results)} mentees")
+
+        return jsonify({
+            "results": results,
+            "total": len(results)
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error finding batch matches: {str(e)}")
+        logger.exception(e)
+        return jsonify({"error": f"Failed to find matches: {str(e)}"}), 500
+
+@matching_bp.route('/assign_cohort', methods=['POST'])
+@require_auth
+@require_admin_or_district_admin
+def assign_cohort():
+    """
+    Assign a cohort of mentees to mentors, respecting how many mentees each mentor can take.
+    Admins and district admins only, the results replace each mentee's saved matches.
+
+    Request body has the same queries and filters as find_matches_batch, plus optional per-mentor capacities.
+
+    Example:
+    {
+        "queries": {
+            "mentee-1": {"skills": "Python, JavaScript", "goals": "Improve coding skills"},
+            "mentee-2": {"primarySubject": "Biology", "goals": "Classroom management"}
+        },
+        "capacities": {"mentor-1": 3},
+        "default_capacity": 5
+    }
+
+    Returns:
+        A JSON object with each mentee's assigned mentor and recommended list
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        queries = data.get('queries')
+        if not queries or not isinstance(queries, dict) or \
+                not all(isinstance(criteria, dict) for criteria in queries.values()):
+            return jsonify({"error": "Invalid queries. Expected JSON object of user_id -> search terms."}), 400
+        if len(queries) > matching_config.MATCHING_BATCH_MAX_QUERIES:
+            return jsonify({"error": f"At most {matching_config.MATCHING_BATCH_MAX_QUERIES} queries per request"}), 400
+        try:
+            filters = MatchFilters.from_dict(data.get('filters'))
+        except ValueError as e:
+            return jsonify({"error": f"Invalid filters: {str(e)}"}), 400
+
+        try:
+            capacities = {mentor_id: int(count) for mentor_id, count in (data.get('capacities') or {}).items()}
+            default_capacity = data.get('default_capacity')
+            default_capacity = int(default_capacity) if default_capacity is not None else None
+            limit = int(request.args.get('limit', 10))
+        except (TypeError, ValueError, AttributeError):
+            return jsonify({"error": "capacities, default_capacity and limit must be integers"}), 400
+        if limit < 1 or limit > 50:
+            limit = 10  # Reset to default if out of reasonable range
+
+        logger.info(f"Assigning {len(queries)} mentees to mentors")
+        assignments = the_algorithm.assign_cohort(queries, capacities, default_capacity, limit, filters=filters)
+
+        # Save each mentee's recommended list, assigned mentor first
+        for mentee_id, assignment in assignments.items():
+            mentee_to_mentor_matches[mentee_id] = assignment["recommendations"]
+
+        unassigned = [mentee_id for mentee_id, assignment in assignments.items() if not assignment["assigned_mentor"]]
+        logger.info(f"Saved assignments for {len(assignments)} mentees, {len(unassigned)} unassigned")
+
+        return jsonify({
+            "assignments": assignments,
+            "total": len(assignments),
+            "unassigned": unassigned
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error assigning cohort: {str(e)}")
+        logger.exception(e)
+        return jsonify({"error": f"Failed to assign cohort: {str(e)}"}), 500
+
 @matching_bp.route('/debug_embeddings', methods=['GET'])
 def debug_test_embeddings():
     """
@@ -3,40 +3,13 @@ from models.user import User
 from models.mentorship_session import MentorshipSession, SessionStatus
 from extensions.database import db
 from extensions.logging import get_logger
-from extensions.cognito import require_auth, parse_headers, CognitoTokenVerifier
+from extensions.cognito import require_auth, get_user_from_token
 from datetime import datetime
-from typing import Optional
 
 sessions_bp = Blueprint('sessions', __name__)
 
-verifier = CognitoTokenVerifier()
 logger = get_logger(__name__)
 
-def get_user_from_token(headers) -> Optional[User]:
-    logger.info("Attempting to get user from token")
-    auth_token = parse_headers(headers)[0]
-    if not auth_token:
-        logger.warning("No auth token found in headers")
-        return None
-
-    logger.info("Verifying token and getting user attributes")
-    user_info = verifier.get_user_attributes(auth_token)
-    logger.debug(f'User info: {user_info}')
-
-    user_id = user_info.get('sub') or user_info.get('user_id')
-    if not user_id:
-        logger.warning("Invalid user info from token - no user identifier found")
-        return None
-
-    logger.info(f"Looking up user with ID: {user_id}")
-    user = User.get_by_id(user_id)
-    if not user:
-        logger.warning(f"User with cognito_sub {user_id} not found")
-    else:
-        logger.info(f"User found: {user.id}")
-
-    return user
-
 @sessions_bp.route('/create', methods=['POST'])
 @require_auth
 def create_session():
@@ -1,51 +1,19 @@
 from flask import Blueprint, request, jsonify
 from models.user import User, UserType, ApplicationStatus
+from models.embedding import UserEmbedding
 from extensions.database import db
 from extensions.logging import get_logger
-from extensions.cognito import require_auth, parse_headers, CognitoTokenVerifier
+from extensions.cognito import require_auth, parse_headers, CognitoTokenVerifier, get_user_from_token
 from extensions.embeddings import EmbeddingFactory
+from flask_app.extensions.mentor_index import mentor_vector_index
+from flask_app.extensions.embedding_jobs import embedding_job_queue
 from datetime import datetime
-from typing import Optional
 
 user_bp = Blueprint('users', __name__, url_prefix='/api/users')
 verifier = CognitoTokenVerifier()
 logger = get_logger(__name__)
 embedding_factory = EmbeddingFactory()
 
-def get_user_from_token(headers) -> Optional[User]:
-    """
-    Helper function to get user from token
-    
-    Args:
-        headers: The request headers containing the authentication token
-        
-    Returns:
-        User object if found, None otherwise
-    """
-    auth_token = parse_headers(headers)[0]
-    if not auth_token:
-        logger.warning("No auth token found in headers")
-        return None
-    
-    user_info = verifier.get_user_attributes(auth_token)
-    logger.debug(f'User info: {user_info}')
-    
-    # Try to get user_id from 'sub' field (standard JWT claim)
-    user_id = user_info.get('sub')
-    if not user_id:
-        # Fallback to 'user_id' field if 'sub' is not present
-        user_id = user_info.get('user_id')
-        
-    if not user_id:
-        logger.warning("Invalid user info from token - no user identifier found")
-        return None
-    
-    user = User.get_by_id(user_id)
-    if not user:
-        logger.warning(f"User with cognito_sub {user_id} not found")
-    
-    return user
-
 @user_bp.route('/submit_application', methods=['POST'])
 @require_auth
 def submit_application():
@@ -101,20 +69,43 @@ def submit_application():
     #    return jsonify({'error': 'Application already submitted.'}), 403
 
     user.application_status = ApplicationStatus.PENDING
+    job = None
     if user.user_type == 'MENTEE':
         user.application_status = ApplicationStatus.APPROVED
-        embedding_factory.store_embedding(user.cognito_sub, profile_data)
+        if embedding_job_queue.enabled:
+            # Embeddings are generated by the job workers, see /embedding_status
+            job = embedding_job_queue.enqueue(user.cognito_sub, profile_data)
+        else:
+            embedding_factory.store_embedding(user.cognito_sub, profile_data)
     user.profile = profile_data
+    db.session.flush()
+    UserEmbedding.sync_eligibility([user.cognito_sub])  # user_type may have changed
     db.session.commit()
+    mentor_vector_index.refresh_users([user.cognito_sub])  # user_type may have changed
 
     logger.info(f"Application submitted for user: {user.cognito_sub} with profile: {user.profile}")
 
     return jsonify({
         'message': 'Application submitted successfully',
         'user_id': user.cognito_sub,
-        'status': user.application_status.value
+        'status': user.application_status.value,
+        'embedding_job_id': job.id if job else None
     }), 201
 
+@user_bp.route('/embedding_status', methods=['GET'])
+@require_auth
+def get_embedding_status():
+    """Get the progress of the user's most recent embedding job"""
+    user = get_user_from_token(request.headers)
+    if not user:
+        return jsonify({'error': 'User not found or invalid token'}), 401
+
+    job = embedding_job_queue.latest_for_user(user.cognito_sub)
+    if not job:
+        return jsonify({'user_id': user.cognito_sub, 'job': None})
+
+    return jsonify({'user_id': user.cognito_sub, 'job': job.to_dict()})
+
 @user_bp.route('/update_application', methods=['POST'])
 @require_auth
 def update_application():
@@ -139,6 +130,10 @@ def update_application():
     db.session.commit() # Clear profile first
     user.profile = current_profile
     user.application_status = ApplicationStatus.PENDING if user.user_type == 'MENTOR' else ApplicationStatus.APPROVED
+
+    # New text is embedded when the application is approved, until then the approved vectors stay searchable
+    db.session.flush()
+    UserEmbedding.sync_eligibility([user.cognito_sub])  # application_status may have changed
     db.session.commit()
     
     logger.info(f"Application updated for user: {user.cognito_sub} with profile: {user.profile}")
@@ -190,3 +185,14 @@ def get_application_status():
         'status': user.application_status.value,
         'submitted_at': user.created_at.isoformat()
     })
+
+@user_bp.route('/logout', methods=['POST'])
+@require_auth
+def logout():
+    """Revoke the caller's access token so this server rejects it from now on"""
+    auth_token = parse_headers(request.headers)[0]
+    if not auth_token:
+        return jsonify({'error': 'No auth token found'}), 401
+
+    verifier.revoke_token(auth_token)
+    return jsonify({'message': 'Logged out'}), 200
@@ -2,10 +2,13 @@ from flask import Flask
 from flask_cors import CORS
 from admin.routes import create_admin_blueprint
 from api import create_api_blueprint
-from config import FlaskConfig
+from config import FlaskConfig, MatchingConfig
 from secrets import token_hex
 from extensions.database import init_db
 from extensions.logging import get_logger
+from flask_app.extensions.embedding_catalog import embedding_catalog
+from flask_app.extensions.mentor_index import mentor_vector_index
+from flask_app.extensions.embedding_jobs import embedding_job_queue
 
 logger = get_logger(__name__)
 
@@ -59,6 +62,16 @@ def create_app(config_class=FlaskConfig()):
         logger.exception(e)
         raise
 
+    # Keep the embedding type catalog in line with writes from other processes
+    matching_config = MatchingConfig()
+    embedding_catalog.start_reconcile_job(app, matching_config.EMBEDDING_CATALOG_RECONCILE_SECONDS)
+
+    # Load the in-process mentor vector index, searches use Postgres until it's ready
+    mentor_vector_index.start_background_load(app)
+
+    # Workers for embedding jobs queued by application submits and mentor approvals
+    embedding_job_queue.start_workers(app)
+
     logger.info('Flask application successfully created and configured')
     logger.debug('Application instance ready to handle requests')
     return app
@@ -1,4 +1,5 @@
 from os import environ
+import json
 from extensions.logging import get_logger
 
 logger = get_logger(__name__)
@@ -18,10 +19,160 @@ class OpenAIConfig:
         # OpenAI model
         self.EMBEDDING_MODEL = "text-embedding-3-small"
 
+        # Embedding request batching limits. OpenAI allows up to 2048 inputs and ~300k tokens per request
+        self.EMBEDDING_BATCH_MAX_ITEMS = int(environ.get('EMBEDDING_BATCH_MAX_ITEMS', 2048))
+        self.EMBEDDING_BATCH_MAX_TOKENS = int(environ.get('EMBEDDING_BATCH_MAX_TOKENS', 300000))
+        self.EMBEDDING_INPUT_MAX_TOKENS = 8191
+
+        # Number of batch requests sent at once by bulk embedding jobs (imports, etc.)
+        self.EMBEDDING_BULK_CONCURRENCY = int(environ.get('EMBEDDING_BULK_CONCURRENCY', 4))
+
+        # Content-addressed embedding cache (in-process LRU in front of the embedding_cache table)
+        self.EMBEDDING_CACHE_ENABLED = environ.get('EMBEDDING_CACHE_ENABLED', 'true').lower() == 'true'
+        self.EMBEDDING_CACHE_MEMORY_SIZE = int(environ.get('EMBEDDING_CACHE_MEMORY_SIZE', 10000))
+        self.EMBEDDING_CACHE_MAX_ROWS = int(environ.get('EMBEDDING_CACHE_MAX_ROWS', 200000))
+
+        # Bulk writes to user_embeddings: rows per upsert statement, and the row count from which binary COPY
+        # is used instead (0 disables COPY)
+        self.EMBEDDING_WRITE_CHUNK_SIZE = int(environ.get('EMBEDDING_WRITE_CHUNK_SIZE', 1000))
+        self.EMBEDDING_COPY_MIN_ROWS = int(environ.get('EMBEDDING_COPY_MIN_ROWS', 5000))
+
         # Log configuration details (excluding sensitive data)
-        logger.debug(f"OpenAI config initialized with model={self.EMBEDDING_MODEL}")
+        logger.debug(f"OpenAI config initialized with model={self.EMBEDDING_MODEL}, "
+                     f"batch_max_items={self.EMBEDDING_BATCH_MAX_ITEMS}, "
+                     f"batch_max_tokens={self.EMBEDDING_BATCH_MAX_TOKENS}")
         logger.info("OpenAI configuration completed successfully")
 
+class EmbeddingStorageConfig:
+    def __init__(self):
+        logger.info("Initializing embedding storage configuration")
+
+        # Requested from OpenAI with the dimensions parameter (text-embedding-3 models only). Unset keeps the
+        # model's native size of 1536. Changing it requires running the pgvector migration
+        dimensions = environ.get('EMBEDDING_DIMENSIONS')
+        self.EMBEDDING_DIMENSIONS = int(dimensions) if dimensions else None
+
+        # 'vector' stores float32, 'halfvec' stores float16 and halves table and index size
+        self.EMBEDDING_STORAGE_FORMAT = environ.get('EMBEDDING_STORAGE_FORMAT', 'vector')
+        if self.EMBEDDING_STORAGE_FORMAT not in ('vector', 'halfvec'):
+            logger.error(f"Invalid EMBEDDING_STORAGE_FORMAT: {self.EMBEDDING_STORAGE_FORMAT}")
+            raise ValueError("EMBEDDING_STORAGE_FORMAT must be 'vector' or 'halfvec'")
+
+        # Keep a generated bit(N) column with the binary-quantized vector, used as a prefilter before exact rerank
+        self.EMBEDDING_BINARY_PREFILTER = environ.get('EMBEDDING_BINARY_PREFILTER', 'false').lower() == 'true'
+
+        logger.debug(f"Embedding storage config initialized with dimensions={self.EMBEDDING_DIMENSIONS}, "
+                     f"format={self.EMBEDDING_STORAGE_FORMAT}, binary_prefilter={self.EMBEDDING_BINARY_PREFILTER}")
+        logger.info("Embedding storage configuration completed successfully")
+
+class MatchingConfig:
+    def __init__(self):
+        logger.info("Initializing matching configuration")
+
+        # 'single_query' sends every search vector in one UNION ALL statement, 'per_key' runs one query per key
+        self.MATCHING_SEARCH_MODE = environ.get('MATCHING_SEARCH_MODE', 'single_query')
+        if self.MATCHING_SEARCH_MODE not in ('single_query', 'per_key'):
+            logger.error(f"Invalid MATCHING_SEARCH_MODE: {self.MATCHING_SEARCH_MODE}")
+            raise ValueError("MATCHING_SEARCH_MODE must be 'single_query' or 'per_key'")
+
+        # How often the in-memory embedding type catalog is reconciled with the database, 0 disables the job
+        self.EMBEDDING_CATALOG_RECONCILE_SECONDS = int(environ.get('EMBEDDING_CATALOG_RECONCILE_SECONDS', 300))
+
+        # pgvector index management. 'hnsw' or 'ivfflat', optionally one partial index per embedding type
+        self.VECTOR_INDEX_METHOD = environ.get('VECTOR_INDEX_METHOD', 'hnsw')
+        if self.VECTOR_INDEX_METHOD not in ('hnsw', 'ivfflat'):
+            logger.error(f"Invalid VECTOR_INDEX_METHOD: {self.VECTOR_INDEX_METHOD}")
+            raise ValueError("VECTOR_INDEX_METHOD must be 'hnsw' or 'ivfflat'")
+        self.VECTOR_INDEX_PER_TYPE = environ.get('VECTOR_INDEX_PER_TYPE', 'false').lower() == 'true'
+        self.HNSW_M = int(environ.get('HNSW_M', 16))
+        self.HNSW_EF_CONSTRUCTION = int(environ.get('HNSW_EF_CONSTRUCTION', 64))
+
+        # Default per-query recall/latency knobs, applied with SET LOCAL before each search
+        self.HNSW_EF_SEARCH = int(environ.get('HNSW_EF_SEARCH', 40))
+        self.IVFFLAT_PROBES = int(environ.get('IVFFLAT_PROBES', 10))
+        # Searches with structured filters: the index scan only filters the candidates it found, so a selective
+        # filter can leave too few rows. Filtered searches use at least this ef_search and, on pgvector 0.8+,
+        # iterative index scans. Searches still short of results are run again as exact scans
+        self.HNSW_FILTERED_EF_SEARCH = int(environ.get('HNSW_FILTERED_EF_SEARCH', 200))
+
+        # Answer searches from an in-process NumPy index of active mentor vectors instead of Postgres
+        self.MATCHING_ANN_INDEX_ENABLED = environ.get('MATCHING_ANN_INDEX_ENABLED', 'false').lower() == 'true'
+
+        # How per-field search results are combined: 'weighted_cosine', 'rrf' or 'rank_sum'
+        self.MATCHING_FUSION_STRATEGY = environ.get('MATCHING_FUSION_STRATEGY', 'weighted_cosine')
+        if self.MATCHING_FUSION_STRATEGY not in ('weighted_cosine', 'rrf', 'rank_sum'):
+            logger.error(f"Invalid MATCHING_FUSION_STRATEGY: {self.MATCHING_FUSION_STRATEGY}")
+            raise ValueError("MATCHING_FUSION_STRATEGY must be 'weighted_cosine', 'rrf' or 'rank_sum'")
+        self.MATCHING_RRF_K = int(environ.get('MATCHING_RRF_K', 60))
+
+        # Per-field weights as a JSON object, e.g. {"bio": 2, "goals": 0.5}. Fields not listed weigh 1
+        try:
+            self.MATCHING_FIELD_WEIGHTS = {
+                field: float(weight)
+                for field, weight in json.loads(environ.get('MATCHING_FIELD_WEIGHTS', '{}')).items()
+            }
+        except (ValueError, AttributeError) as e:
+            logger.error(f"Invalid MATCHING_FIELD_WEIGHTS: {str(e)}")
+            raise ValueError("MATCHING_FIELD_WEIGHTS must be a JSON object of field -> number")
+
+        # Candidates fetched per field before fusion, 0 uses the requested result limit
+        self.MATCHING_CANDIDATE_DEPTH = int(environ.get('MATCHING_CANDIDATE_DEPTH', 0))
+        # Distance used for a field the candidate has no embedding for
+        self.MATCHING_MISSING_DISTANCE = float(environ.get('MATCHING_MISSING_DISTANCE', 1.0))
+
+        # In-process LRU of query-side embeddings used by find_matches, 0 TTL keeps entries until evicted
+        self.QUERY_EMBEDDING_CACHE_SIZE = int(environ.get('QUERY_EMBEDDING_CACHE_SIZE', 1000))
+        self.QUERY_EMBEDDING_CACHE_TTL_SECONDS = int(environ.get('QUERY_EMBEDDING_CACHE_TTL_SECONDS', 3600))
+
+        # Two-stage search: Hamming distance on binary codes picks MATCHING_BINARY_CANDIDATES rows per key,
+        # only those are reranked by exact cosine distance
+        self.MATCHING_BINARY_RERANK = environ.get('MATCHING_BINARY_RERANK', 'false').lower() == 'true'
+        self.MATCHING_BINARY_CANDIDATES = int(environ.get('MATCHING_BINARY_CANDIDATES', 400))
+
+        # Batch matching: mentees scored together per chunk, and the most queries one request may send
+        self.MATCHING_BATCH_CHUNK_SIZE = int(environ.get('MATCHING_BATCH_CHUNK_SIZE', 256))
+        self.MATCHING_BATCH_MAX_QUERIES = int(environ.get('MATCHING_BATCH_MAX_QUERIES', 5000))
+
+        # Cohort assignment: mentees a mentor takes unless the request says otherwise
+        self.MATCHING_MENTOR_CAPACITY = int(environ.get('MATCHING_MENTOR_CAPACITY', 5))
+
+        # Move country / stateProvince / timeZone criteria into structured filters instead of embedding them,
+        # a timeZone criterion allows mentors whose UTC offset is within the window
+        self.MATCHING_CRITERIA_AS_FILTERS = environ.get('MATCHING_CRITERIA_AS_FILTERS', 'false').lower() == 'true'
+        self.MATCHING_TIME_ZONE_WINDOW_HOURS = float(environ.get('MATCHING_TIME_ZONE_WINDOW_HOURS', 0))
+
+        # Cache of full match results, keyed by the criteria and the mentors index version
+        self.MATCH_RESULT_CACHE_ENABLED = environ.get('MATCH_RESULT_CACHE_ENABLED', 'true').lower() == 'true'
+        self.MATCH_RESULT_CACHE_SIZE = int(environ.get('MATCH_RESULT_CACHE_SIZE', 500))
+        self.MATCH_RESULT_CACHE_TTL_SECONDS = int(environ.get('MATCH_RESULT_CACHE_TTL_SECONDS', 600))
+        self.MATCH_RESULT_CACHE_NEGATIVE_TTL_SECONDS = int(environ.get('MATCH_RESULT_CACHE_NEGATIVE_TTL_SECONDS', 60))
+
+        logger.debug(f"Matching config initialized with search_mode={self.MATCHING_SEARCH_MODE}, "
+                     f"index_method={self.VECTOR_INDEX_METHOD}, per_type_indexes={self.VECTOR_INDEX_PER_TYPE}, "
+                     f"fusion={self.MATCHING_FUSION_STRATEGY}")
+        logger.info("Matching configuration completed successfully")
+
+class EmbeddingJobConfig:
+    def __init__(self):
+        logger.info("Initializing embedding job configuration")
+
+        # Embedding work from application submits and mentor approvals goes through the embedding_jobs table,
+        # which run_migration creates. When disabled, embeddings are generated inline in the request like before
+        self.EMBEDDING_JOBS_ENABLED = environ.get('EMBEDDING_JOBS_ENABLED', 'false').lower() == 'true'
+        self.EMBEDDING_JOB_WORKERS = int(environ.get('EMBEDDING_JOB_WORKERS', 2))
+        # Jobs claimed at once, their profiles are embedded together in packed batch requests
+        self.EMBEDDING_JOB_BATCH_SIZE = int(environ.get('EMBEDDING_JOB_BATCH_SIZE', 25))
+        self.EMBEDDING_JOB_MAX_ATTEMPTS = int(environ.get('EMBEDDING_JOB_MAX_ATTEMPTS', 5))
+        # Retry delay is base * 2^(attempts - 1)
+        self.EMBEDDING_JOB_RETRY_BASE_SECONDS = int(environ.get('EMBEDDING_JOB_RETRY_BASE_SECONDS', 10))
+        self.EMBEDDING_JOB_POLL_SECONDS = float(environ.get('EMBEDDING_JOB_POLL_SECONDS', 2))
+        # Running jobs not finished after this long are assumed abandoned and claimed again
+        self.EMBEDDING_JOB_LOCK_TIMEOUT_SECONDS = int(environ.get('EMBEDDING_JOB_LOCK_TIMEOUT_SECONDS', 600))
+
+        logger.debug(f"Embedding job config initialized with enabled={self.EMBEDDING_JOBS_ENABLED}, "
+                     f"workers={self.EMBEDDING_JOB_WORKERS}, batch_size={self.EMBEDDING_JOB_BATCH_SIZE}")
+        logger.info("Embedding job configuration completed successfully")
+
 class FlaskConfig:
     def __init__(self):
         logger.info("Initializing Flask configuration")
@@ -69,7 +220,28 @@ class CognitoConfig:
                 logger.error("COGNITO_REGION environment variable not set")
                 raise ValueError("Missing required COGNITO_REGION configuration")
 
+            # Signing keys are fetched once per process, refreshed on TTL expiry or an unknown kid.
+            # An unknown kid refreshes at most once per COGNITO_JWKS_MIN_REFRESH_SECONDS.
+            self.COGNITO_JWKS_TTL_SECONDS = int(environ.get('COGNITO_JWKS_TTL_SECONDS', 3600))
+            self.COGNITO_JWKS_MIN_REFRESH_SECONDS = int(environ.get('COGNITO_JWKS_MIN_REFRESH_SECONDS', 30))
+            self.COGNITO_JWKS_FETCH_TIMEOUT_SECONDS = float(environ.get('COGNITO_JWKS_FETCH_TIMEOUT_SECONDS', 5))
+
+            # Identity comes from the verified token's claims. Attributes a token doesn't carry (e.g. email in
+            # an access token) are fetched from Cognito and cached per token for a short time.
+            self.COGNITO_ATTRIBUTE_CACHE_SIZE = int(environ.get('COGNITO_ATTRIBUTE_CACHE_SIZE', 1000))
+            self.COGNITO_ATTRIBUTE_CACHE_TTL_SECONDS = int(environ.get('COGNITO_ATTRIBUTE_CACHE_TTL_SECONDS', 60))
+
+            # Claims of verified tokens are cached until the token expires, revoked tokens are remembered as long
+            self.COGNITO_TOKEN_CACHE_ENABLED = environ.get('COGNITO_TOKEN_CACHE_ENABLED', 'true').lower() == 'true'
+            self.COGNITO_TOKEN_CACHE_SIZE = int(environ.get('COGNITO_TOKEN_CACHE_SIZE', 10000))
+            self.COGNITO_REVOKED_TOKEN_CACHE_SIZE = int(environ.get('COGNITO_REVOKED_TOKEN_CACHE_SIZE', 10000))
 
+            # One cognito-idp client is shared by the whole process
+            self.COGNITO_MAX_POOL_CONNECTIONS = int(environ.get('COGNITO_MAX_POOL_CONNECTIONS', 10))
+            self.COGNITO_RETRY_MODE = environ.get('COGNITO_RETRY_MODE', 'standard')
+            self.COGNITO_MAX_ATTEMPTS = int(environ.get('COGNITO_MAX_ATTEMPTS', 3))
+            self.COGNITO_CONNECT_TIMEOUT_SECONDS = float(environ.get('COGNITO_CONNECT_TIMEOUT_SECONDS', 2))
+            self.COGNITO_READ_TIMEOUT_SECONDS = float(environ.get('COGNITO_READ_TIMEOUT_SECONDS', 5))
                 
             # Log configuration details (excluding sensitive data)
             logger.debug(f"Cognito config initialized with region={self.COGNITO_REGION}")
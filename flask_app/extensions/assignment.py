@@ -0,0 +1,60 @@
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from extensions.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def capacitated_assignment(cost: np.ndarray, capacities: np.ndarray) -> np.ndarray:
+    """
+    Assign every row to at most one column, minimizing total cost without exceeding column capacities.
+
+    Each column is expanded into one slot per unit of capacity and the resulting rectangular
+    assignment problem is solved exactly with scipy's linear_sum_assignment. A column never needs
+    more slots than there are rows, and rows or columns without any allowed pair are left out of
+    the expanded matrix.
+
+    As many rows as possible are assigned, and among those assignments the one with the lowest
+    total cost is returned. When the columns can't hold every row, the rows left unassigned are the
+    ones whose removal costs the least.
+
+    Args:
+        cost: float array of shape (rows, columns), lower is better, inf for pairs that aren't allowed
+        capacities: int array of shape (columns,)
+
+    Returns:
+        int array of shape (rows,) with the assigned column of each row, -1 if unassigned
+    """
+    rows, columns = cost.shape
+    assigned = np.full(rows, -1, dtype=np.intp)
+    allowed = np.isfinite(cost)
+    capacities = np.minimum(np.maximum(np.asarray(capacities, dtype=np.int64), 0), rows)
+
+    usable_columns = np.flatnonzero(allowed.any(axis=0) & (capacities > 0))
+    usable_rows = np.flatnonzero(allowed[:, usable_columns].any(axis=1))
+    if not usable_rows.size:
+        return assigned
+
+    slot_columns = np.repeat(usable_columns, capacities[usable_columns])
+    slot_allowed = allowed[np.ix_(usable_rows, slot_columns)]
+    expanded = cost[np.ix_(usable_rows, slot_columns)].astype(np.float64)
+    low = expanded[slot_allowed].min()
+    high = expanded[slot_allowed].max()
+    # A pair that isn't allowed costs more than any mix of allowed pairs can save, so the solver only
+    # uses one when a row has nothing else left. Those pairs are dropped from the result
+    penalty = (high - low + 1.0) * (min(usable_rows.size, slot_columns.size) + 1)
+    expanded[~slot_allowed] = high + penalty
+
+    row_index, slot_index = linear_sum_assignment(expanded)
+    keep = slot_allowed[row_index, slot_index]
+    assigned[usable_rows[row_index[keep]]] = slot_columns[slot_index[keep]]
+
+    logger.info(f"Assigned {int(keep.sum())} of {rows} rows to {columns} columns "
+                f"({slot_columns.size} slots)")
+    return assigned
+
+
+def remaining_capacity(assigned: np.ndarray, capacities: np.ndarray) -> np.ndarray:
+    """Capacity left in each column after an assignment."""
+    used = np.bincount(assigned[assigned >= 0], minlength=len(capacities))
+    return np.asarray(capacities) - used
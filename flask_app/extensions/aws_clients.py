@@ -0,0 +1,48 @@
+import threading
+from typing import Any, Dict, Tuple
+from boto3.session import Session
+from botocore.config import Config
+from extensions.logging import get_logger
+
+logger = get_logger(__name__)
+
+_clients: Dict[Tuple[str, str], Any] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(service_name: str, region: str, max_pool_connections: int = 10, retry_mode: str = 'standard',
+               max_attempts: int = 3, connect_timeout: float = 2, read_timeout: float = 5):
+    """
+    Return the process-wide boto3 client for a service and region, creating it on first use.
+
+    Building a client loads service models and sets up a connection pool, which is slow and memory
+    hungry, so it's done once and the client, which is thread-safe, is shared. Creation goes through
+    a dedicated Session under a lock since boto3's default session isn't thread-safe. The settings
+    only apply to the call that creates the client.
+
+    Args:
+        service_name: AWS service, e.g. 'cognito-idp'
+        region: AWS region
+        max_pool_connections: Keep-alive connections kept per client, size it for the number of threads
+        retry_mode: botocore retry mode, 'legacy', 'standard' or 'adaptive'
+        max_attempts: Total attempts per call, including the first
+        connect_timeout: Seconds to wait for a connection
+        read_timeout: Seconds to wait for a response
+    """
+    key = (service_name, region)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = Session().client(service_name, region_name=region, config=Config(
+                    max_pool_connections=max_pool_connections,
+                    retries={'mode': retry_mode, 'max_attempts': max_attempts},
+                    connect_timeout=connect_timeout,
+                    read_timeout=read_timeout,
+                    tcp_keepalive=True
+                ))
+                _clients[key] = client
+                logger.info(f"Created shared {service_name} client for {region} "
+                            f"(pool={max_pool_connections}, retries={retry_mode}/{max_attempts})")
+    return client
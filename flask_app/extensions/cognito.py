@@ -1,15 +1,17 @@
-import urllib
-import json
+import hashlib
 import time
 from functools import wraps
-from flask import request, session, redirect, url_for
-from jose import jwk, jwt
+from flask import request, session, redirect, url_for, g, jsonify
+from jose import jwt
 from jose.utils import base64url_decode
 
 from config import CognitoConfig
-from boto3 import client
 from extensions.logging import get_logger
 from extensions.database import db
+from flask_app.extensions.jwks_cache import get_jwks_cache
+from flask_app.extensions.aws_clients import get_client
+from flask_app.extensions.lru_cache import LRUCache
+from flask_app.extensions.token_cache import VerifiedTokenCache
 from flask_app.models.user import User, UserType
 
 config = CognitoConfig()
@@ -18,6 +20,14 @@ logger = get_logger(__name__)
 
 logger.info("Initializing Cognito authentication module")
 
+# Cognito user attributes by token digest, only used for attributes the token's claims don't carry
+_attribute_cache = LRUCache(max_size=config.COGNITO_ATTRIBUTE_CACHE_SIZE,
+                            default_ttl=config.COGNITO_ATTRIBUTE_CACHE_TTL_SECONDS)
+
+# Claims of tokens that passed verification, shared by every verifier in the process
+verified_token_cache = VerifiedTokenCache(max_size=config.COGNITO_TOKEN_CACHE_SIZE,
+                                          max_revoked=config.COGNITO_REVOKED_TOKEN_CACHE_SIZE)
+
 class CognitoTokenVerifier:
     def __init__(self,user_pool_id=config.COGNITO_USER_POOL_ID,
                  client_id=config.COGNITO_CLIENT_ID,
@@ -29,9 +39,23 @@ class CognitoTokenVerifier:
         self.region = region
         self.keys = None
         self.claims = None
-        self.get_keys()
-        # Configure AWS credentials
-        self.client = client('cognito-idp', region_name=region)
+        # Shared by every verifier for this user pool, so constructing one doesn't fetch anything
+        self.jwks = get_jwks_cache(
+            f'https://cognito-idp.{region}.amazonaws.com/{user_pool_id}/.well-known/jwks.json',
+            ttl=config.COGNITO_JWKS_TTL_SECONDS,
+            min_refresh_interval=config.COGNITO_JWKS_MIN_REFRESH_SECONDS,
+            timeout=config.COGNITO_JWKS_FETCH_TIMEOUT_SECONDS
+        )
+        # Shared, pooled client, verifiers are cheap handles onto process-wide state
+        self.client = get_client(
+            'cognito-idp',
+            region,
+            max_pool_connections=config.COGNITO_MAX_POOL_CONNECTIONS,
+            retry_mode=config.COGNITO_RETRY_MODE,
+            max_attempts=config.COGNITO_MAX_ATTEMPTS,
+            connect_timeout=config.COGNITO_CONNECT_TIMEOUT_SECONDS,
+            read_timeout=config.COGNITO_READ_TIMEOUT_SECONDS
+        )
         self.admin_group_name = admin_group_name
         self.district_admin_group_name = district_admin_group_name
 
@@ -55,7 +79,7 @@ class CognitoTokenVerifier:
             auth_result = response['AuthenticationResult']
 
             # Get user attributes
-            user_info = self.get_user_attributes(auth_result['AccessToken'])
+            user_info = self.resolve_identity(auth_result['AccessToken'])
             if not user_info:
                 return {"error": "Failed to get user information"}
 
@@ -80,7 +104,7 @@ class CognitoTokenVerifier:
     def _check_user_group(self, access_token, group_name, given_user_info = None):
         logger.debug(f"Checking if user is in {group_name} group")
         try:
-            user_info = self.get_user_attributes(access_token) if not given_user_info else given_user_info
+            user_info = self.resolve_identity(access_token) if not given_user_info else given_user_info
             logger.debug(f'User info: {user_info}')
             if not user_info:
                 return False
@@ -102,13 +126,9 @@ class CognitoTokenVerifier:
         return self._check_user_group(access_token, self.admin_group_name)
 
     def get_keys(self):
-        """Get the JSON Web Key (JWK) for the user pool"""
-        keys_url = f'https://cognito-idp.{self.region}.amazonaws.com/{self.user_pool_id}/.well-known/jwks.json'
-        logger.debug(f"Fetching JWK from: {keys_url}")
+        """Get the JSON Web Key (JWK) for the user pool from the shared JWKS cache"""
         try:
-            with urllib.request.urlopen(keys_url) as f:
-                response = f.read()
-            self.keys = json.loads(response.decode('utf-8'))['keys']
+            self.keys = self.jwks.keys
             logger.debug("Successfully retrieved JWK keys")
         except Exception as e:
             logger.error(f"Failed to fetch JWK keys: {str(e)}")
@@ -116,27 +136,38 @@ class CognitoTokenVerifier:
             raise
 
     def verify_token(self, token):
-        """Verify the JWT token"""
+        """Verify the JWT token and make sure its user exists in the database"""
+        self.verify_claims(token)
+        self.setup_user(token, self.claims)
+        return True
+
+    def verify_claims(self, token):
+        """Verify the JWT token's signature and claims, returning the claims"""
         logger.debug("Starting token verification")
         try:
+            if verified_token_cache.is_revoked(token):
+                logger.warning("Token has been revoked")
+                raise ValueError('Token has been revoked')
+
+            # A token verified before is good until it expires
+            if config.COGNITO_TOKEN_CACHE_ENABLED:
+                claims = verified_token_cache.get(token)
+                if claims is not None:
+                    logger.debug("Token found in verified token cache")
+                    self.claims = claims
+                    return claims
+
             # Get the kid (key ID) from the token header
             headers = jwt.get_unverified_headers(token)
             kid = headers['kid']
             logger.debug(f"Token kid: {kid}")
 
-            # Find the matching key in the JWK set
-            key = None
-            for k in self.keys:
-                if kid == k['kid']:
-                    key = k
-                    break
-            if not key:
+            # Get the already constructed public key for this kid, refreshed if Cognito rotated its keys
+            public_key = self.jwks.get_key(kid)
+            if public_key is None:
                 logger.error("Public key not found in JWK set")
                 raise ValueError('Public key not found in JWK set')
-
-            # Get the public key
-            public_key = jwk.construct(key)
-            logger.debug("Successfully constructed public key")
+            logger.debug("Found cached public key")
 
             # Get the message and signature
             message, encoded_signature = str(token).rsplit('.', 1)
@@ -168,9 +199,10 @@ class CognitoTokenVerifier:
                 raise ValueError('Invalid issuer')
 
             self.claims = claims
+            if config.COGNITO_TOKEN_CACHE_ENABLED:
+                verified_token_cache.set(token, claims)
             logger.info("Token successfully verified")
-            self.setup_user(token)
-            return True
+            return claims
             
         except Exception as e:
             logger.error(f"Token verification failed: {str(e)}")
@@ -206,16 +238,82 @@ class CognitoTokenVerifier:
             logger.exception(e)
             return None
 
-    def setup_user(self, access_token):
-        """Get user attributes using the access token"""
+    def revoke_token(self, token):
+        """Reject token from now on, e.g. on logout, even though its signature stays valid until exp"""
         try:
+            exp = jwt.get_unverified_claims(token).get('exp')
+        except Exception:
+            exp = None
+        verified_token_cache.revoke(token, exp)
+        logger.info("Token revoked")
+
+    @staticmethod
+    def claims_identity(claims):
+        """User info in the get_user_attributes format, taken from verified token claims"""
+        return {
+            'user_id': claims.get('sub'),
+            'email': claims.get('email'),
+            'name': claims.get('name'),
+            'username': claims.get('username') or claims.get('cognito:username'),
+            'groups': list(claims.get('cognito:groups', []))
+        }
+
+    def _cached_user_attributes(self, access_token):
+        """get_user_attributes through the short-lived attribute cache"""
+        cache_key = hashlib.sha256(access_token.encode('utf-8')).hexdigest()
+        user_info = _attribute_cache.get(cache_key)
+        if user_info is None:
             user_info = self.get_user_attributes(access_token)
+            if user_info:
+                _attribute_cache.set(cache_key, user_info)
+        return user_info
+
+    def resolve_identity(self, access_token, claims=None, required=('user_id', 'username')):
+        """
+        Get user info from the verified token's claims, without calling Cognito.
+
+        sub, username and cognito:groups come straight from the claims. Only when a required field
+        isn't in the claims are the user's attributes fetched from Cognito, through a short-TTL cache.
+        Group changes made after the token was issued show up when the client refreshes its token.
+
+        Args:
+            access_token: The access token
+            claims: Claims of the token if already verified, the token is verified otherwise
+            required: Fields that must be present, e.g. 'email' which access tokens don't carry
+
+        Returns:
+            Dictionary like get_user_attributes, or None if the token is invalid
+        """
+        if claims is None:
+            try:
+                claims = self.verify_claims(access_token)
+            except Exception:
+                return None
+
+        user_info = self.claims_identity(claims)
+        missing = [field for field in required if not user_info.get(field)]
+        if not missing:
+            return user_info
+
+        logger.debug(f'Token claims missing {missing}, fetching user attributes')
+        attributes = self._cached_user_attributes(access_token)
+        if not attributes:
+            return user_info if user_info.get('user_id') else None
+        # Claims win, the fetched attributes only fill the gaps
+        return {**attributes, **{field: value for field, value in user_info.items() if value}}
+
+    def setup_user(self, access_token, claims=None):
+        """Make sure the token's user exists in the database, returns the User (None on error)"""
+        try:
+            user_info = self.resolve_identity(access_token, claims)
             user_id = user_info['user_id']
 
             logger.debug(f'Checking for existing user.')
             existing_user = db.session.query(User).filter(User.cognito_sub == user_id).first()
             logger.debug(f'Existing user: {existing_user}')
             if not existing_user:
+                # Access tokens don't carry the email, only fetched for users seen for the first time
+                user_info = self.resolve_identity(access_token, claims, required=('user_id', 'email'))
                 user = User(
                     cognito_sub=user_id,
                     email=user_info['email'],  # Modified to directly access email from user_info
@@ -225,10 +323,10 @@ class CognitoTokenVerifier:
                 db.session.add(user)
                 db.session.commit()
                 logger.debug(f'User {user.email} added to database')
-                return True
+                return user
 
-            logger.debug(f"User {user_info['email']} already exists in database")
-            return False
+            logger.debug(f"User {existing_user.email} already exists in database")
+            return existing_user
         except Exception as e:
             logger.error(f"Error getting user attributes: {str(e)}")
             logger.exception(e)
@@ -250,11 +348,68 @@ def parse_headers(headers):
 
     return auth_header, refresh_token, id_token, expires_in
 
+def load_user_context(token, create_user=False):
+    """
+    Verify token and load its user once per request.
+
+    The claims, the user info taken from them and the User row are kept on flask.g (auth_token,
+    auth_claims, user_info, current_user), so every later lookup in the same request reads them
+    from there instead of verifying the token and querying users again.
+
+    Args:
+        token: The access token
+        create_user: Add the user to the database if it isn't there yet (what require_auth does)
+
+    Returns:
+        The User, or None if it isn't in the database
+
+    Raises:
+        Exception: If the token fails verification
+    """
+    if g.get('auth_token') == token and 'current_user' in g:
+        return g.current_user
+
+    verifier = CognitoTokenVerifier()
+    claims = verifier.verify_claims(token)
+    if create_user:
+        user = verifier.setup_user(token, claims)
+    else:
+        user = db.session.get(User, claims['sub'])
+
+    g.auth_token = token
+    g.auth_claims = claims
+    g.user_info = verifier.claims_identity(claims)
+    g.current_user = user
+    return user
+
+def get_user_from_token(headers=None):
+    """
+    Get the User for the request's token, from flask.g when require_auth already loaded it.
+
+    Args:
+        headers: The request headers containing the authentication token (default: the current request's)
+
+    Returns:
+        User object if found, None otherwise
+    """
+    auth_token = parse_headers(headers if headers is not None else request.headers)[0]
+    if not auth_token:
+        logger.warning("No auth token found in headers")
+        return None
+
+    try:
+        user = load_user_context(auth_token)
+    except Exception as e:
+        logger.warning(f"Invalid auth token: {str(e)}")
+        return None
+
+    if not user:
+        logger.warning(f"User with cognito_sub {g.user_info['user_id']} not found")
+    return user
+
 def require_auth(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        verifier = CognitoTokenVerifier()
-        
         # Check for token in session first (for web UI)
         token = None
         if 'access_token' in session:
@@ -287,7 +442,8 @@ def require_auth(f):
                 logger.error(f"Using development token {token}")
                 return f(*args, **kwargs)
             logger.debug(f'Verifying token: {token[:15]}...')
-            verifier.verify_token(token)
+            # Verify once and keep the user on flask.g for the route
+            load_user_context(token, create_user=True)
             return f(*args, **kwargs)
         except Exception as e:
             logger.error(f"Token verification failed: {str(e)}")
@@ -295,3 +451,25 @@ def require_auth(f):
             return redirect(url_for('admin.admin_dashboard.index'))
 
     return decorated
+
+def require_groups(*group_names):
+    """
+    Decorator for routes only members of one of group_names may call. Goes under require_auth.
+
+    Groups come from the cognito:groups claim of the token require_auth verified (flask.g.user_info),
+    so the check needs no call to Cognito.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            user_info = g.get('user_info')
+            if not user_info or not set(user_info['groups']) & set(group_names):
+                logger.warning(f"User {user_info['user_id'] if user_info else None} denied access to "
+                               f"{request.path}, requires one of {list(group_names)}")
+                return jsonify({'error': 'Admin privileges required'}), 403
+            return f(*args, **kwargs)
+        return decorated
+    return decorator
+
+require_admin = require_groups(config.ADMIN_GROUP_NAME)
+require_admin_or_district_admin = require_groups(config.ADMIN_GROUP_NAME, config.DISTRICT_ADMIN_GROUP_NAME)
@@ -0,0 +1,181 @@
+import hashlib
+import threading
+import unicodedata
+from datetime import datetime
+from typing import Dict, Iterable, List, Any
+from flask import has_app_context
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from extensions.database import db
+from extensions.logging import get_logger
+from extensions.lru_cache import LRUCache
+from flask_app.models.embedding_cache import EmbeddingCacheEntry
+
+logger = get_logger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache of text embeddings keyed by (model, normalized text).
+
+    The first tier is an in-process LRU shared by all threads. The second tier is the embedding_cache
+    table, which survives restarts and is shared between workers. The table tier is only used when an
+    app context is available, so worker threads that only talk to OpenAI still get the in-process tier.
+    """
+
+    # How many inserted rows to wait between size checks on the table
+    EVICTION_CHECK_INTERVAL = 100
+
+    def __init__(self, memory_size: int = 10000, max_rows: int = 200000):
+        """
+        Args:
+            memory_size: Maximum number of embeddings kept in the in-process tier
+            max_rows: Maximum number of rows kept in the embedding_cache table
+        """
+        self.memory = LRUCache(max_size=memory_size)
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._inserts_since_check = 0
+        self.db_hits = 0
+        self.db_misses = 0
+        self.db_evictions = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normalize text so trivially different spellings of the same value share a cache entry."""
+        return ' '.join(unicodedata.normalize('NFC', text).split())
+
+    @classmethod
+    def cache_key(cls, model: str, text: str) -> str:
+        """Return the content address for text embedded with model."""
+        return hashlib.sha256(f'{model}\x00{cls.normalize(text)}'.encode('utf-8')).hexdigest()
+
+    def get_many(self, model: str, texts: Iterable[str]) -> Dict[str, List[float]]:
+        """
+        Look up cached embeddings.
+
+        Args:
+            model: Embedding model name
+            texts: Texts to look up
+
+        Returns:
+            Dictionary of text -> embedding for every text that was found
+        """
+        found = {}
+        missing = {}  # cache_key -> [texts]
+        for text in texts:
+            key = self.cache_key(model, text)
+            embedding = self.memory.get(key)
+            if embedding is not None:
+                found[text] = embedding
+            else:
+                missing.setdefault(key, []).append(text)
+
+        if not missing or not has_app_context():
+            return found
+
+        try:
+            with db.engine.begin() as connection:
+                rows = connection.execute(
+                    select(EmbeddingCacheEntry.cache_key, EmbeddingCacheEntry.vector_embedding)
+                    .where(EmbeddingCacheEntry.cache_key.in_(list(missing.keys())))
+                ).all()
+
+                if rows:
+                    connection.execute(
+                        update(EmbeddingCacheEntry)
+                        .where(EmbeddingCacheEntry.cache_key.in_([row.cache_key for row in rows]))
+                        .values(last_used_at=datetime.utcnow())
+                    )
+        except Exception as e:
+            logger.error(f'Error reading embedding cache table: {str(e)}')
+            return found
+
+        for row in rows:
+            embedding = [float(value) for value in row.vector_embedding]
+            self.memory.set(row.cache_key, embedding)
+            for text in missing[row.cache_key]:
+                found[text] = embedding
+
+        with self._lock:
+            self.db_hits += len(rows)
+            self.db_misses += len(missing) - len(rows)
+
+        return found
+
+    def put_many(self, model: str, embeddings: Dict[str, List[float]]) -> None:
+        """
+        Store freshly generated embeddings in both tiers.
+
+        Args:
+            model: Embedding model name
+            embeddings: Dictionary of text -> embedding
+        """
+        rows = {}
+        for text, embedding in embeddings.items():
+            key = self.cache_key(model, text)
+            self.memory.set(key, embedding)
+            rows[key] = {'cache_key': key, 'model': model, 'vector_embedding': embedding}
+
+        if not rows or not has_app_context():
+            return
+
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(
+                    pg_insert(EmbeddingCacheEntry)
+                    .values(list(rows.values()))
+                    .on_conflict_do_nothing(index_elements=['cache_key'])
+                )
+        except Exception as e:
+            logger.error(f'Error writing embedding cache table: {str(e)}')
+            return
+
+        with self._lock:
+            self._inserts_since_check += len(rows)
+            check_size = self._inserts_since_check >= self.EVICTION_CHECK_INTERVAL
+            if check_size:
+                self._inserts_since_check = 0
+
+        if check_size:
+            self._evict_rows()
+
+    def _evict_rows(self) -> None:
+        """Trim the table back to max_rows, dropping the least recently used rows first."""
+        try:
+            with db.engine.begin() as connection:
+                row_count = connection.execute(select(func.count()).select_from(EmbeddingCacheEntry)).scalar()
+                excess = row_count - self.max_rows
+                if excess <= 0:
+                    return
+
+                oldest = (
+                    select(EmbeddingCacheEntry.cache_key)
+                    .order_by(EmbeddingCacheEntry.last_used_at.asc())
+                    .limit(excess)
+                    .scalar_subquery()
+                )
+                connection.execute(delete(EmbeddingCacheEntry).where(EmbeddingCacheEntry.cache_key.in_(oldest)))
+
+            with self._lock:
+                self.db_evictions += excess
+            logger.info(f'Evicted {excess} rows from the embedding cache table')
+        except Exception as e:
+            logger.error(f'Error evicting embedding cache rows: {str(e)}')
+
+    def clear(self) -> None:
+        """Clear the in-process tier. The table tier is left alone since it is shared."""
+        self.memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for both tiers."""
+        with self._lock:
+            return {
+                'memory': self.memory.stats(),
+                'database': {
+                    'hits': self.db_hits,
+                    'misses': self.db_misses,
+                    'evictions': self.db_evictions,
+                    'max_rows': self.max_rows
+                }
+            }
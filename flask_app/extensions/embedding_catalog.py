@@ -0,0 +1,134 @@
+import threading
+import time
+from typing import Dict, List, Optional
+from sqlalchemy import func
+from extensions.database import db
+from extensions.logging import get_logger
+from flask_app.models.embedding import UserEmbedding
+
+logger = get_logger(__name__)
+
+
+class EmbeddingCatalog:
+    """
+    In-memory catalog of the embedding types stored in user_embeddings, with a row count per type.
+
+    Writers update the catalog as they add or remove rows, and a background job reconciles it with
+    the database periodically so changes made by other processes are picked up. Searches read the
+    catalog instead of scanning the table to find out which types exist.
+
+    This class is implemented as a singleton to ensure only one instance exists.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(EmbeddingCatalog, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        # Skip initialization if already initialized
+        if hasattr(self, '_initialized') and self._initialized:
+            return
+
+        self._counts: Dict[str, int] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._reconciled_at = None
+        self._reconcile_thread = None
+
+        # Mark as initialized
+        self._initialized = True
+
+    def reconcile(self) -> Dict[str, int]:
+        """
+        Reload the per-type row counts from the database. Must be called inside an app context.
+
+        Returns:
+            Dictionary of embedding_type -> row count
+        """
+        rows = (
+            db.session.query(UserEmbedding.embedding_type, func.count(UserEmbedding.id))
+            .group_by(UserEmbedding.embedding_type)
+            .all()
+        )
+        counts = {embedding_type: count for embedding_type, count in rows}
+        with self._lock:
+            self._counts = counts
+            self._loaded = True
+            self._reconciled_at = time.time()
+        logger.debug(f"Embedding catalog reconciled with {len(counts)} types")
+        return dict(counts)
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self.reconcile()
+
+    def types(self) -> List[str]:
+        """Return the embedding types that currently have at least one row."""
+        self._ensure_loaded()
+        with self._lock:
+            return [embedding_type for embedding_type, count in self._counts.items() if count > 0]
+
+    def counts(self) -> Dict[str, int]:
+        """Return a copy of the per-type row counts."""
+        self._ensure_loaded()
+        with self._lock:
+            return dict(self._counts)
+
+    def has_type(self, embedding_type: str) -> bool:
+        """Check whether any rows exist for embedding_type."""
+        self._ensure_loaded()
+        with self._lock:
+            return self._counts.get(embedding_type, 0) > 0
+
+    def record_added(self, embedding_type: str, count: int = 1) -> None:
+        """Record that rows of embedding_type were inserted."""
+        with self._lock:
+            self._counts[embedding_type] = self._counts.get(embedding_type, 0) + count
+
+    def record_removed(self, embedding_type: str, count: int = 1) -> None:
+        """Record that rows of embedding_type were deleted."""
+        with self._lock:
+            remaining = self._counts.get(embedding_type, 0) - count
+            if remaining > 0:
+                self._counts[embedding_type] = remaining
+            else:
+                self._counts.pop(embedding_type, None)
+
+    def status(self) -> Dict[str, Optional[object]]:
+        """Return the catalog contents and when it was last reconciled."""
+        with self._lock:
+            return {
+                'loaded': self._loaded,
+                'reconciled_at': self._reconciled_at,
+                'counts': dict(self._counts)
+            }
+
+    def start_reconcile_job(self, app, interval_seconds: int) -> None:
+        """
+        Start a daemon thread that reconciles the catalog every interval_seconds.
+
+        Args:
+            app: Flask application, used to push an app context for the database queries
+            interval_seconds: Seconds between reconciles, 0 or less disables the job
+        """
+        if interval_seconds <= 0 or self._reconcile_thread is not None:
+            return
+
+        def run():
+            while True:
+                try:
+                    with app.app_context():
+                        self.reconcile()
+                except Exception as e:
+                    logger.error(f"Error reconciling embedding catalog: {str(e)}")
+                time.sleep(interval_seconds)
+
+        self._reconcile_thread = threading.Thread(target=run, name='embedding-catalog-reconcile', daemon=True)
+        self._reconcile_thread.start()
+        logger.info(f"Started embedding catalog reconcile job every {interval_seconds} seconds")
+
+
+# Global instance
+embedding_catalog = EmbeddingCatalog()
@@ -0,0 +1,329 @@
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+import click
+from sqlalchemy import func, or_, and_, select, inspect
+from sqlalchemy.dialects.postgresql import distinct_on
+from extensions.database import db
+from extensions.logging import get_logger
+from flask_app.config import EmbeddingJobConfig
+from flask_app.models.embedding_job import EmbeddingJob, EmbeddingJobStatus
+
+logger = get_logger(__name__)
+
+
+class EmbeddingJobQueue:
+    """
+    Postgres-backed queue for embedding work.
+
+    Request handlers enqueue a job in their own transaction and return right away. Worker threads
+    claim queued jobs with SELECT ... FOR UPDATE SKIP LOCKED, so any number of workers across any
+    number of processes can share the table without handing out a job twice. A user has at most one
+    job running at a time, and only their newest job is run, so profile writes can't land out of
+    order. A claimed batch is embedded together through generate_embeddings_bulk. Failed jobs are
+    retried with exponential backoff and marked dead once they run out of attempts.
+
+    This class is implemented as a singleton to ensure only one instance exists.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(EmbeddingJobQueue, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        # Skip initialization if already initialized
+        if hasattr(self, '_initialized') and self._initialized:
+            return
+
+        config = EmbeddingJobConfig()
+        self.enabled = config.EMBEDDING_JOBS_ENABLED
+        self.worker_count = config.EMBEDDING_JOB_WORKERS
+        self.batch_size = config.EMBEDDING_JOB_BATCH_SIZE
+        self.max_attempts = config.EMBEDDING_JOB_MAX_ATTEMPTS
+        self.retry_base_seconds = config.EMBEDDING_JOB_RETRY_BASE_SECONDS
+        self.poll_seconds = config.EMBEDDING_JOB_POLL_SECONDS
+        self.lock_timeout_seconds = config.EMBEDDING_JOB_LOCK_TIMEOUT_SECONDS
+        self.worker_prefix = f'{socket.gethostname()}-{os.getpid()}'
+        self._threads = []
+
+        # Mark as initialized
+        self._initialized = True
+
+    def enqueue(self, user_id: str, payload: Dict[str, Any]) -> EmbeddingJob:
+        """
+        Add an embedding job to the current session. The caller commits, so the job is only
+        visible to workers once the change that triggered it is committed too.
+
+        Payloads hold the user's whole profile, so a job still waiting in the queue for the same
+        user is updated with the new payload instead of adding a second job.
+
+        Args:
+            user_id: cognito_sub of the user whose profile should be embedded
+            payload: Profile fields to embed and store
+
+        Returns:
+            The new or updated EmbeddingJob
+        """
+        job = (
+            EmbeddingJob.query.filter_by(user_id=user_id, status=EmbeddingJobStatus.QUEUED)
+            .order_by(EmbeddingJob.created_at.desc())
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if job:
+            job.payload = dict(payload or {})
+            job.attempts = 0
+            job.max_attempts = self.max_attempts
+            job.last_error = None
+            job.run_after = datetime.utcnow()
+            logger.info(f"Updated queued embedding job {job.id} for user {user_id}")
+            return job
+
+        job = EmbeddingJob(user_id, dict(payload or {}), max_attempts=self.max_attempts)
+        db.session.add(job)
+        logger.info(f"Queued embedding job for user {user_id}")
+        return job
+
+    def claim(self, worker_name: str, limit: int) -> List[EmbeddingJob]:
+        """
+        Claim up to limit runnable jobs for worker_name.
+
+        Queued jobs that are due are claimed, as are running jobs whose worker has held them longer
+        than the lock timeout. Only the newest runnable job of each user is claimed, and users with a
+        job still running elsewhere are skipped, so one user's jobs never run concurrently or out of
+        order. Their older runnable jobs are marked superseded. Rows locked by other workers are
+        skipped instead of waited on.
+        """
+        now = datetime.utcnow()
+        abandoned_before = now - timedelta(seconds=self.lock_timeout_seconds)
+        runnable = or_(
+            and_(EmbeddingJob.status == EmbeddingJobStatus.QUEUED, EmbeddingJob.run_after <= now),
+            and_(EmbeddingJob.status == EmbeddingJobStatus.RUNNING, EmbeddingJob.started_at < abandoned_before)
+        )
+        users_running = (
+            select(EmbeddingJob.user_id)
+            .where(EmbeddingJob.status == EmbeddingJobStatus.RUNNING, EmbeddingJob.started_at >= abandoned_before)
+        )
+        newest_per_user = (
+            select(EmbeddingJob.id)
+            .where(runnable, EmbeddingJob.user_id.not_in(users_running))
+            .ext(distinct_on(EmbeddingJob.user_id))
+            .order_by(EmbeddingJob.user_id, EmbeddingJob.created_at.desc())
+        )
+        # FOR UPDATE can't be combined with DISTINCT ON, so the newest jobs are picked in a subquery.
+        # runnable is repeated here because Postgres rechecks it on rows another worker just claimed
+        jobs = (
+            db.session.query(EmbeddingJob)
+            .filter(EmbeddingJob.id.in_(newest_per_user), runnable)
+            .order_by(EmbeddingJob.run_after)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        for job in jobs:
+            job.status = EmbeddingJobStatus.RUNNING
+            job.attempts += 1
+            job.started_at = now
+            job.locked_by = worker_name
+            superseded = (
+                db.session.query(EmbeddingJob)
+                .filter(
+                    EmbeddingJob.user_id == job.user_id,
+                    EmbeddingJob.id != job.id,
+                    EmbeddingJob.created_at < job.created_at,
+                    or_(
+                        EmbeddingJob.status == EmbeddingJobStatus.QUEUED,
+                        and_(EmbeddingJob.status == EmbeddingJobStatus.RUNNING,
+                             EmbeddingJob.started_at < abandoned_before)
+                    )
+                )
+                .update({'status': EmbeddingJobStatus.SUPERSEDED, 'finished_at': now, 'locked_by': None},
+                        synchronize_session=False)
+            )
+            if superseded:
+                logger.info(f"Superseded {superseded} older embedding jobs for user {job.user_id}")
+        db.session.commit()
+        return jobs
+
+    def _mark_succeeded(self, job: EmbeddingJob) -> None:
+        job.status = EmbeddingJobStatus.SUCCEEDED
+        job.finished_at = datetime.utcnow()
+        job.last_error = None
+        job.locked_by = None
+
+    def _mark_failed(self, job: EmbeddingJob, error: str) -> None:
+        job.last_error = error[:2000]
+        job.locked_by = None
+        if job.attempts >= job.max_attempts:
+            job.status = EmbeddingJobStatus.DEAD
+            job.finished_at = datetime.utcnow()
+            logger.error(f"Embedding job {job.id} for user {job.user_id} is dead after {job.attempts} attempts: {error}")
+        else:
+            delay = self.retry_base_seconds * 2 ** (job.attempts - 1)
+            job.status = EmbeddingJobStatus.QUEUED
+            job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+            logger.warning(f"Embedding job {job.id} failed (attempt {job.attempts}), retrying in {delay}s: {error}")
+
+    def run_batch(self, worker_name: str) -> int:
+        """
+        Claim and process one batch of jobs. Must be called inside an app context.
+
+        Returns:
+            Number of jobs processed
+        """
+        jobs = self.claim(worker_name, self.batch_size)
+        if not jobs:
+            return 0
+
+        # Import here to avoid circular imports
+        from extensions.embeddings import EmbeddingFactory
+        embedding_factory = EmbeddingFactory()
+
+        # Only fields whose text changed since they were last embedded need new vectors
+        texts_by_job = {}
+        removed_by_job = {}
+        for job in jobs:
+            changed, removed = embedding_factory.diff_profile(job.user_id, job.payload or {})
+            texts_by_job[job.id] = changed
+            removed_by_job[job.id] = removed
+        db.session.commit()
+
+        # Every claimed profile is embedded together, keyed by job so two jobs for one user don't collide
+        embeddings_by_job = embedding_factory.generate_embeddings_bulk([
+            (job_id, field, text) for job_id, texts in texts_by_job.items() for field, text in texts.items()
+        ])
+
+        for job in jobs:
+            embeddings = embeddings_by_job.get(job.id, {})
+            missing = set(texts_by_job[job.id]) - set(embeddings)
+            try:
+                if missing:
+                    raise RuntimeError(f"No embeddings generated for fields {sorted(missing)}")
+                if embeddings or removed_by_job[job.id]:
+                    embedding_factory.store_embeddings_dict(
+                        job.user_id,
+                        embeddings,
+                        content_hashes={field: embedding_factory.content_hash(text)
+                                        for field, text in texts_by_job[job.id].items()},
+                        removed_types=removed_by_job[job.id]
+                    )
+                self._mark_succeeded(job)
+            except Exception as e:
+                db.session.rollback()
+                self._mark_failed(job, str(e))
+            db.session.commit()
+
+        logger.info(f"Worker {worker_name} processed {len(jobs)} embedding jobs")
+        return len(jobs)
+
+    @staticmethod
+    def _schema_ready() -> bool:
+        """Whether run_migration has created the tables and columns the workers use."""
+        inspector = inspect(db.engine)
+        if not inspector.has_table(EmbeddingJob.__tablename__):
+            return False
+        columns = {column['name'] for column in inspector.get_columns('user_embeddings')}
+        return {'is_searchable', 'content_hash'} <= columns
+
+    def start_workers(self, app) -> None:
+        """
+        Start the configured number of daemon worker threads.
+
+        Workers only run in the server process: not under tests or CLI commands such as flask db. If the
+        database hasn't been migrated yet, the queue is disabled and embeddings are generated inline.
+        """
+        if not self.enabled or self._threads:
+            return
+        if app.testing or click.get_current_context(silent=True) is not None:
+            logger.info("Not starting embedding job workers in a test or CLI context")
+            return
+
+        try:
+            with app.app_context():
+                schema_ready = self._schema_ready()
+        except Exception as e:
+            logger.error(f"Error checking the embedding job schema: {str(e)}")
+            schema_ready = False
+        if not schema_ready:
+            logger.warning("embedding_jobs or the user_embeddings eligibility columns are missing, run the "
+                           "pgvector migration. Embedding jobs are disabled until then")
+            self.enabled = False
+            return
+
+        def run(worker_name: str):
+            while True:
+                processed = 0
+                try:
+                    with app.app_context():
+                        processed = self.run_batch(worker_name)
+                except Exception as e:
+                    logger.error(f"Embedding job worker {worker_name} error: {str(e)}")
+                    logger.exception(e)
+                if not processed:
+                    time.sleep(self.poll_seconds)
+
+        for number in range(self.worker_count):
+            worker_name = f'{self.worker_prefix}-{number}'
+            thread = threading.Thread(target=run, args=(worker_name,), name=f'embedding-job-worker-{number}',
+                                      daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {self.worker_count} embedding job workers")
+
+    def get_job(self, job_id: str) -> Optional[EmbeddingJob]:
+        return db.session.get(EmbeddingJob, job_id)
+
+    def latest_for_user(self, user_id: str) -> Optional[EmbeddingJob]:
+        return (
+            EmbeddingJob.query.filter_by(user_id=user_id)
+            .order_by(EmbeddingJob.created_at.desc())
+            .first()
+        )
+
+    def retry(self, job_id: str) -> Optional[EmbeddingJob]:
+        """Put a dead job back in the queue with a fresh set of attempts."""
+        job = self.get_job(job_id)
+        if not job or job.status != EmbeddingJobStatus.DEAD:
+            return None
+        job.status = EmbeddingJobStatus.QUEUED
+        job.attempts = 0
+        job.run_after = datetime.utcnow()
+        job.finished_at = None
+        db.session.commit()
+        logger.info(f"Requeued dead embedding job {job_id}")
+        return job
+
+    def status(self, dead_limit: int = 50) -> Dict[str, Any]:
+        """Return job counts per status and the most recent dead jobs."""
+        counts = dict(
+            db.session.query(EmbeddingJob.status, func.count(EmbeddingJob.id))
+            .group_by(EmbeddingJob.status)
+            .all()
+        )
+        oldest_queued = (
+            db.session.query(func.min(EmbeddingJob.created_at))
+            .filter(EmbeddingJob.status == EmbeddingJobStatus.QUEUED)
+            .scalar()
+        )
+        dead_jobs = (
+            EmbeddingJob.query.filter_by(status=EmbeddingJobStatus.DEAD)
+            .order_by(EmbeddingJob.finished_at.desc())
+            .limit(dead_limit)
+            .all()
+        )
+        return {
+            'enabled': self.enabled,
+            'workers': len(self._threads),
+            'counts': counts,
+            'oldest_queued_at': oldest_queued.isoformat() if oldest_queued else None,
+            'dead': [job.to_dict() for job in dead_jobs]
+        }
+
+
+# Global instance
+embedding_job_queue = EmbeddingJobQueue()
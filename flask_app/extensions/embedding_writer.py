@@ -0,0 +1,178 @@
+import io
+import struct
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+from sqlalchemy import literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from extensions.database import db
+from extensions.logging import get_logger
+from flask_app.config import OpenAIConfig
+from flask_app.models.embedding import UserEmbedding
+
+logger = get_logger(__name__)
+
+# Binary COPY framing, see https://www.postgresql.org/docs/current/sql-copy.html#id-1.9.3.55.9.4
+_COPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('!ii', 0, 0)
+_COPY_TRAILER = struct.pack('!h', -1)
+_POSTGRES_EPOCH = datetime(2000, 1, 1)
+_COPY_COLUMNS = ('id', 'user_id', 'embedding_type', 'vector_embedding', 'content_hash', 'created_at')
+
+
+class EmbeddingWriter:
+    """
+    Set-based writes to user_embeddings.
+
+    Rows are upserted with INSERT ... ON CONFLICT (user_id, embedding_type) DO UPDATE, thousands per
+    statement, instead of a SELECT per (user, embedding_type). Large loads can use binary COPY into a
+    temporary staging table followed by one INSERT ... SELECT ... ON CONFLICT. Both paths run in the
+    current session's transaction, the caller syncs eligibility and commits.
+    """
+
+    def __init__(self, chunk_size: Optional[int] = None, copy_min_rows: Optional[int] = None):
+        """
+        Args:
+            chunk_size: Rows per INSERT statement (default: EMBEDDING_WRITE_CHUNK_SIZE)
+            copy_min_rows: Use binary COPY when at least this many rows are written, 0 disables COPY
+                           (default: EMBEDDING_COPY_MIN_ROWS)
+        """
+        config = OpenAIConfig()
+        self.chunk_size = chunk_size or config.EMBEDDING_WRITE_CHUNK_SIZE
+        self.copy_min_rows = config.EMBEDDING_COPY_MIN_ROWS if copy_min_rows is None else copy_min_rows
+
+    @staticmethod
+    def build_rows(embeddings_by_user: Dict[str, Dict[str, List[float]]],
+                   content_hashes_by_user: Optional[Dict[str, Dict[str, str]]] = None) -> List[Dict[str, Any]]:
+        """
+        Flatten user_id -> {embedding_type: vector} into rows for write().
+
+        Args:
+            embeddings_by_user: Dictionary of user_id -> {embedding_type: vector}
+            content_hashes_by_user: Optional dictionary of user_id -> {embedding_type: content hash}
+        """
+        content_hashes_by_user = content_hashes_by_user or {}
+        return [
+            {
+                'user_id': user_id,
+                'embedding_type': embedding_type,
+                'vector_embedding': vector,
+                'content_hash': content_hashes_by_user.get(user_id, {}).get(embedding_type)
+            }
+            for user_id, embeddings in embeddings_by_user.items()
+            for embedding_type, vector in embeddings.items()
+        ]
+
+    def write(self, rows: List[Dict[str, Any]], use_copy: Optional[bool] = None) -> List[str]:
+        """
+        Upsert embedding rows.
+
+        Args:
+            rows: Dictionaries with user_id, embedding_type, vector_embedding and optionally content_hash
+            use_copy: Force or disable the binary COPY path (default: COPY from copy_min_rows rows)
+
+        Returns:
+            The embedding_type of every row that was inserted rather than updated
+        """
+        # ON CONFLICT can't touch the same row twice in one statement, the last row for a key wins
+        unique_rows = {}
+        for row in rows:
+            unique_rows[(row['user_id'], row['embedding_type'])] = row
+        rows = list(unique_rows.values())
+        if not rows:
+            return []
+
+        if use_copy is None:
+            use_copy = 0 < self.copy_min_rows <= len(rows)
+
+        if use_copy:
+            inserted_types = self._copy_upsert(rows)
+        else:
+            inserted_types = []
+            for start in range(0, len(rows), self.chunk_size):
+                inserted_types.extend(self._upsert(rows[start:start + self.chunk_size]))
+
+        logger.info(f"Wrote {len(rows)} embeddings ({len(inserted_types)} new) "
+                    f"using {'COPY' if use_copy else 'INSERT ... ON CONFLICT'}")
+        return inserted_types
+
+    def _upsert(self, rows: List[Dict[str, Any]]) -> List[str]:
+        now = datetime.utcnow()
+        values = [
+            {
+                'id': str(uuid4()),
+                'user_id': row['user_id'],
+                'embedding_type': row['embedding_type'],
+                'vector_embedding': row['vector_embedding'],
+                'content_hash': row.get('content_hash'),
+                'created_at': now
+            }
+            for row in rows
+        ]
+        statement = pg_insert(UserEmbedding).values(values)
+        statement = statement.on_conflict_do_update(
+            constraint=UserEmbedding.UNIQUE_CONSTRAINT,
+            set_={
+                'vector_embedding': statement.excluded.vector_embedding,
+                'content_hash': statement.excluded.content_hash
+            }
+        ).returning(UserEmbedding.embedding_type, literal_column('(xmax = 0)').label('inserted'))
+        result = db.session.execute(statement).all()
+        return [row.embedding_type for row in result if row.inserted]
+
+    @staticmethod
+    def _encode_field(value: Any) -> bytes:
+        if value is None:
+            return struct.pack('!i', -1)
+        if isinstance(value, datetime):
+            delta = value - _POSTGRES_EPOCH
+            data = struct.pack('!q', (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds)
+        elif isinstance(value, str):
+            data = value.encode('utf-8')
+        else:
+            # pgvector's binary format: int16 dimensions, int16 unused, then float32 (vector) or float16 (halfvec)
+            value_format = 'e' if UserEmbedding.STORAGE_FORMAT == 'halfvec' else 'f'
+            data = struct.pack('!hh', len(value), 0) + struct.pack(f'!{len(value)}{value_format}', *value)
+        return struct.pack('!i', len(data)) + data
+
+    def _encode_copy(self, rows: List[Dict[str, Any]]) -> io.BytesIO:
+        now = datetime.utcnow()
+        buffer = io.BytesIO()
+        buffer.write(_COPY_HEADER)
+        field_count = struct.pack('!h', len(_COPY_COLUMNS))
+        for row in rows:
+            buffer.write(field_count)
+            for value in (str(uuid4()), row['user_id'], row['embedding_type'], row['vector_embedding'],
+                          row.get('content_hash'), now):
+                buffer.write(self._encode_field(value))
+        buffer.write(_COPY_TRAILER)
+        buffer.seek(0)
+        return buffer
+
+    def _copy_upsert(self, rows: List[Dict[str, Any]]) -> List[str]:
+        columns = ', '.join(_COPY_COLUMNS)
+        # The DBAPI connection behind the session, so COPY runs in the same transaction
+        cursor = db.session.connection().connection.cursor()
+        try:
+            cursor.execute(
+                'CREATE TEMP TABLE IF NOT EXISTS user_embeddings_staging '
+                '(LIKE user_embeddings INCLUDING DEFAULTS) ON COMMIT DROP'
+            )
+            cursor.execute('TRUNCATE user_embeddings_staging')
+            cursor.copy_expert(
+                f'COPY user_embeddings_staging ({columns}) FROM STDIN WITH (FORMAT binary)',
+                self._encode_copy(rows)
+            )
+            cursor.execute(
+                f'INSERT INTO user_embeddings ({columns}) '
+                f'SELECT {columns} FROM user_embeddings_staging '
+                f'ON CONFLICT ON CONSTRAINT {UserEmbedding.UNIQUE_CONSTRAINT} DO UPDATE '
+                f'SET vector_embedding = EXCLUDED.vector_embedding, content_hash = EXCLUDED.content_hash '
+                f'RETURNING embedding_type, (xmax = 0)'
+            )
+            return [embedding_type for embedding_type, inserted in cursor.fetchall() if inserted]
+        finally:
+            cursor.close()
+
+
+# Global instance
+embedding_writer = EmbeddingWriter()
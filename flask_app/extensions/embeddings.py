@@ -1,13 +1,38 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple, Hashable, NamedTuple, Iterator
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
+import json
+import time
+import numpy as np
 import openai
+from sqlalchemy import select, literal, union_all, func, text
 from flask_app.extensions.logging import get_logger
 from flask_app.models.embedding import UserEmbedding
-from flask_app.extensions.database import db
-from flask_app.config import OpenAIConfig, EXCLUDED_EMBEDDING_FIELDS
+from flask_app.models.index_version import IndexVersion
+from extensions.database import db
+from flask_app.extensions.embedding_cache import EmbeddingCache
+from flask_app.extensions.lru_cache import LRUCache
+from flask_app.extensions.match_cache import MatchResultCache
+from flask_app.extensions.embedding_catalog import embedding_catalog
+from flask_app.extensions.vector_index import vector_index_manager
+from flask_app.extensions.mentor_index import mentor_vector_index, MentorVectorIndex
+from flask_app.extensions.fusion import get_fusion_strategy
+from flask_app.extensions.assignment import capacitated_assignment, remaining_capacity
+from flask_app.extensions.match_filters import MatchFilters
+from flask_app.extensions.embedding_writer import embedding_writer
+from flask_app.config import OpenAIConfig, MatchingConfig, EmbeddingStorageConfig, EXCLUDED_EMBEDDING_FIELDS
 
 logger = get_logger(__name__)
 
 
+class EmbeddingMatch(NamedTuple):
+    """A single search hit: which user and field matched, and how far the vectors are apart."""
+    user_id: str
+    embedding_type: str
+    distance: float
+
+
 class EmbeddingFactory:
     """
     Responsible for generating and storing embeddings.
@@ -18,7 +43,7 @@ class EmbeddingFactory:
     _instance = None
 
     def __new__(cls):
-        if not hasattr(cls, 'instance'):
+        if cls._instance is None:
             cls._instance = super(EmbeddingFactory, cls).__new__(cls)
         return cls._instance
 
@@ -42,13 +67,146 @@ class EmbeddingFactory:
         self.embedding_model = config.EMBEDDING_MODEL
         self.openai_client = openai.OpenAI()
 
+        # Reduced output size, None leaves it to the model
+        self.embedding_dimensions = EmbeddingStorageConfig().EMBEDDING_DIMENSIONS
+
+        # Request batching limits
+        self.batch_max_items = config.EMBEDDING_BATCH_MAX_ITEMS
+        self.batch_max_tokens = config.EMBEDDING_BATCH_MAX_TOKENS
+        self.input_max_tokens = config.EMBEDDING_INPUT_MAX_TOKENS
+        self.bulk_concurrency = config.EMBEDDING_BULK_CONCURRENCY
+
+        # Content-addressed cache checked before calling OpenAI
+        self.embedding_cache = None
+        if config.EMBEDDING_CACHE_ENABLED:
+            self.embedding_cache = EmbeddingCache(
+                memory_size=config.EMBEDDING_CACHE_MEMORY_SIZE,
+                max_rows=config.EMBEDDING_CACHE_MAX_ROWS
+            )
+
         # Mark as initialized
         self._initialized = True
 
+    @staticmethod
+    def _to_text(value: Any) -> Optional[str]:
+        """
+        Convert a profile value into the text that gets embedded.
+
+        Lists are joined the same way the admin importers do it, everything else is stringified.
+        Returns None for values that have nothing to embed.
+        """
+        if value is None:
+            return None
+        if isinstance(value, list):
+            text = ', '.join(str(item) for item in value)
+        else:
+            text = str(value)
+        return text if text.strip() else None
+
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """
+        Cheap upper-bound token estimate used for packing batches.
+
+        English text averages ~4 characters per token, dividing by 3 keeps us safely under the API limits.
+        """
+        return len(text) // 3 + 1
+
+    def _pack_batches(self, items: List[Tuple[Hashable, str]]) -> List[List[Tuple[Hashable, str]]]:
+        """
+        Pack (key, text) pairs into batches that respect the item and token limits of a single request.
+
+        Inputs that are likely over the per-input token limit are sent on their own so a rejection
+        only affects that one input.
+
+        Args:
+            items: List of (key, text) pairs
+
+        Returns:
+            List of batches, each a list of (key, text) pairs
+        """
+        batches = []
+        current_batch = []
+        current_tokens = 0
+
+        for key, text in items:
+            tokens = self._estimate_tokens(text)
+            if tokens > self.input_max_tokens:
+                logger.warning(f"Input for key '{key}' may exceed the token limit, sending it on its own")
+                batches.append([(key, text)])
+                continue
+
+            if current_batch and (len(current_batch) >= self.batch_max_items or
+                                  current_tokens + tokens > self.batch_max_tokens):
+                batches.append(current_batch)
+                current_batch = []
+                current_tokens = 0
+
+            current_batch.append((key, text))
+            current_tokens += tokens
+
+        if current_batch:
+            batches.append(current_batch)
+
+        return batches
+
+    def _get_cached_embeddings(self, texts: List[str]) -> Dict[str, List[float]]:
+        """Return cached embeddings for texts, keyed by text. Cache errors are treated as misses."""
+        if not self.embedding_cache or not texts:
+            return {}
+        try:
+            return self.embedding_cache.get_many(self.embedding_model, texts)
+        except Exception as e:
+            logger.error(f'Error reading embedding cache: {str(e)}')
+            return {}
+
+    def _cache_embeddings(self, embeddings: Dict[str, List[float]]) -> None:
+        """Add freshly generated embeddings (text -> embedding) to the cache."""
+        if not self.embedding_cache or not embeddings:
+            return
+        try:
+            self.embedding_cache.put_many(self.embedding_model, embeddings)
+        except Exception as e:
+            logger.error(f'Error writing embedding cache: {str(e)}')
+
+    def _embed_batch(self, texts: List[str], user_id: Optional[str] = None) -> List[List[float]]:
+        """
+        Embed a list of texts with a single API call.
+
+        Args:
+            texts: Texts to embed, must fit in one request (see _pack_batches)
+            user_id: Optional ID of the user - prevents abuse on the OpenAI end
+
+        Returns:
+            List of embeddings in the same order as texts
+        """
+        request_args = {
+            'model': self.embedding_model,
+            'input': texts
+        }
+        if user_id:
+            request_args['user'] = user_id
+        if self.embedding_dimensions:
+            request_args['dimensions'] = self.embedding_dimensions
+
+        response = self.openai_client.embeddings.create(**request_args)
+
+        # The API returns an index per item, don't rely on the response order
+        embeddings = [None] * len(texts)
+        for item in response.data:
+            embeddings[item.index] = item.embedding
+        missing = [index for index, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            raise RuntimeError(f"Embeddings response is missing inputs {missing} of {len(texts)}")
+        return embeddings
+
     def generate_embeddings(self, user_id, embedding_dict: Dict[str, str]) -> Dict[str, List[float]]:
         """
         Takes in a dictionary of key value pairs, generates embeddings on each value and returns a dict
-        with the same keys with 'embedding' appended to the key and the value being the embedding.
+        with the same keys and the value being the embedding.
+
+        All values are sent together as a single batched request, split into several requests only when
+        the item or token limits are hit. If a request fails, the keys in that batch are left out of the result.
 
         This method is thread-safe and can be called from multiple threads.
 
@@ -57,32 +215,109 @@ class EmbeddingFactory:
             embedding_dict: Dictionary with keys as identifiers and values as text to embed
 
         Returns:
-            Dictionary with keys as original keys + '_embedding' and values as embedding vectors
+            Dictionary with the original keys and values as embedding vectors
         """
         result_dict = {}
 
+        items = []
         for key, value in embedding_dict.items():
+            text = self._to_text(value)
+            if text is None:
+                logger.debug(f"Skipping empty value for key '{key}'")
+                continue
+            items.append((key, text))
+
+        # Reuse cached embeddings, only the rest goes to OpenAI
+        cached = self._get_cached_embeddings([text for _, text in items])
+        for key, text in items:
+            if text in cached:
+                result_dict[key] = cached[text]
+        items = [(key, text) for key, text in items if text not in cached]
+
+        generated = {}
+        for batch in self._pack_batches(items):
+            batch_keys = [key for key, _ in batch]
             try:
-                # Generate embedding using OpenAI API
-                logger.debug(f'_generate_embeddings for key: {key} with value: {value}')
-                response = self.openai_client.embeddings.create(
-                    model=self.embedding_model,
-                    input=value,
-                    user=user_id
-                )
-
-                # Extract the embedding from the response
-                embedding = response.data[0].embedding
+                logger.debug(f'_generate_embeddings for keys: {batch_keys}')
+                embeddings = self._embed_batch([text for _, text in batch], user_id)
 
-                # Store the embedding in the result dictionary
-                result_dict[key] = embedding
-                logger.debug(f"Generated embedding for key '{key}' with length {len(embedding)}")
+                for (key, text), embedding in zip(batch, embeddings):
+                    result_dict[key] = embedding
+                    generated[text] = embedding
+                    logger.debug(f"Generated embedding for key '{key}' with length {len(embedding)}")
             except Exception as e:
-                logger.error(f"Error generating embedding for key '{key}': {str(e)}")
+                logger.error(f"Error generating embeddings for keys {batch_keys}: {str(e)}")
 
+        self._cache_embeddings(generated)
+        logger.debug(f'generate_embeddings reused {len(cached)} cached embeddings for user {user_id}')
         logger.info(f'generate_embeddings completed for user {user_id}, created {len(result_dict)} embeddings')
         return result_dict
 
+    def generate_embeddings_bulk(
+            self,
+            items: List[Tuple[str, str, Any]],
+            max_workers: Optional[int] = None
+    ) -> Dict[str, Dict[str, List[float]]]:
+        """
+        Generate embeddings for many users at once.
+
+        Takes (user_id, field, text) triples from any number of profiles, embeds each distinct text once,
+        packs them into full batch requests and sends those with bounded concurrency. Use this instead of
+        calling generate_embeddings per user for imports and other bulk jobs.
+
+        Only the OpenAI calls run on worker threads, the embedding cache is read and written from the calling thread.
+
+        Args:
+            items: List of (user_id, field, text) triples
+            max_workers: Maximum number of requests in flight (default: EMBEDDING_BULK_CONCURRENCY)
+
+        Returns:
+            Dictionary of user_id -> {field: embedding}. Fields whose batch failed are left out.
+        """
+        # Identical texts (country, time zone, subject, ...) only need to be embedded once
+        text_targets = defaultdict(list)
+        for user_id, field, value in items:
+            text = self._to_text(value)
+            if text is None:
+                continue
+            text_targets[text].append((user_id, field))
+
+        result = defaultdict(dict)
+
+        # Reuse cached embeddings, only the rest goes to OpenAI
+        cached = self._get_cached_embeddings(list(text_targets.keys()))
+        for text, embedding in cached.items():
+            for user_id, field in text_targets[text]:
+                result[user_id][field] = embedding
+
+        batches = self._pack_batches([(text, text) for text in text_targets if text not in cached])
+        logger.info(f'generate_embeddings_bulk embedding {len(text_targets) - len(cached)} distinct texts from '
+                    f'{len(items)} fields in {len(batches)} requests ({len(cached)} cached)')
+
+        generated = {}
+        max_workers = max_workers or self.bulk_concurrency
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            future_to_batch = {
+                executor.submit(self._embed_batch, [text for _, text in batch]): batch
+                for batch in batches
+            }
+            for future in as_completed(future_to_batch):
+                batch = future_to_batch[future]
+                try:
+                    embeddings = future.result()
+                except Exception as e:
+                    logger.error(f'Error generating bulk embeddings for a batch of {len(batch)} texts: {str(e)}')
+                    continue
+
+                for (text, _), embedding in zip(batch, embeddings):
+                    generated[text] = embedding
+                    for user_id, field in text_targets[text]:
+                        result[user_id][field] = embedding
+
+        self._cache_embeddings(generated)
+        logger.info(f'generate_embeddings_bulk completed for {len(result)} users')
+        return dict(result)
+
     def print_embeddings(self, user_id, embedding_dict: Dict[str, str]) -> None:
         """
         Print the generated embeddings.
@@ -115,7 +350,55 @@ class EmbeddingFactory:
         # Generate embeddings for each field individually
         return self.generate_embeddings(user_id, embedding_dict)
 
-    def store_embeddings_dict(self, user_id: str, embeddings_dict: Dict[str, List[float]]) -> None:
+    def content_hash(self, text: str) -> str:
+        """Return the hash stored with an embedding of text, it changes when the text or the model does."""
+        return EmbeddingCache.cache_key(self.embedding_model, text)
+
+    def diff_profile(self, user_id: str, embedding_dict: Dict[str, Any]) -> Tuple[Dict[str, str], List[str]]:
+        """
+        Compare a profile against the content hashes of the user's stored embeddings.
+
+        Args:
+            user_id: The ID of the user
+            embedding_dict: Dictionary with the full set of fields that should be embedded
+
+        Returns:
+            Tuple of (field -> text for fields that are new or whose text changed,
+                      embedding types that are stored but no longer in the profile)
+        """
+        texts = {}
+        for key, value in embedding_dict.items():
+            text = self._to_text(value)
+            if text is not None:
+                texts[key] = text
+
+        stored_hashes = dict(
+            db.session.query(UserEmbedding.embedding_type, UserEmbedding.content_hash)
+            .filter(UserEmbedding.user_id == user_id)
+            .all()
+        )
+        changed = {key: text for key, text in texts.items() if stored_hashes.get(key) != self.content_hash(text)}
+        removed = [embedding_type for embedding_type in stored_hashes if embedding_type not in texts]
+        logger.debug(f"Profile diff for user {user_id}: {len(changed)} changed, {len(removed)} removed, "
+                     f"{len(texts) - len(changed)} unchanged")
+        return changed, removed
+
+    @staticmethod
+    def _is_searchable(user_id: str) -> bool:
+        """Whether the user's embeddings are returned by mentor searches, after sync_eligibility."""
+        return db.session.query(
+            db.session.query(UserEmbedding.id)
+            .filter(UserEmbedding.user_id == user_id, UserEmbedding.is_searchable == True)
+            .exists()
+        ).scalar()
+
+    def store_embeddings_dict(
+            self,
+            user_id: str,
+            embeddings_dict: Dict[str, List[float]],
+            content_hashes: Optional[Dict[str, str]] = None,
+            removed_types: Optional[List[str]] = None
+    ) -> None:
         """
         Store pre-generated embeddings in the database.
 
@@ -124,34 +407,46 @@ class EmbeddingFactory:
         Args:
             user_id: The ID of the user
             embeddings_dict: Dictionary with embedding types as keys and vector embeddings as values
+            content_hashes: Content hash per embedding type. Types without one are stored without a hash,
+                            so they are re-embedded the next time the profile is stored
+            removed_types: Embedding types to delete for this user
 
         Returns:
             None
         """
-        # Store each embedding in the database
-        for embedding_type, vector_embedding in embeddings_dict.items():
-            # Check if an embedding of this type already exists for this user
-            existing_embedding = UserEmbedding.query.filter_by(
-                user_id=user_id,
-                embedding_type=embedding_type
-            ).first()
-
-            if existing_embedding:
-                # Update existing embedding
-                logger.info(f"Updating existing {embedding_type} embedding for user {user_id}")
-                existing_embedding.vector_embedding = vector_embedding
-            else:
-                # Create new embedding
-                new_embedding = UserEmbedding(
-                    user_id=user_id,
-                    embedding_type=embedding_type,
-                    vector_embedding=vector_embedding
-                )
-                db.session.add(new_embedding)
+        # Upsert every embedding in one statement
+        added_types = embedding_writer.write(
+            embedding_writer.build_rows({user_id: embeddings_dict}, {user_id: content_hashes or {}})
+        )
+
+        # Delete embeddings for fields that are no longer in the profile
+        removed_types = list(removed_types or [])
+        if removed_types:
+            removed_types = [
+                row.embedding_type for row in
+                db.session.query(UserEmbedding.embedding_type)
+                .filter(UserEmbedding.user_id == user_id, UserEmbedding.embedding_type.in_(removed_types))
+                .all()
+            ]
+            UserEmbedding.query.filter(
+                UserEmbedding.user_id == user_id,
+                UserEmbedding.embedding_type.in_(removed_types)
+            ).delete(synchronize_session=False)
+            logger.info(f"Deleting {removed_types} embeddings for user {user_id}")
 
         # Commit all changes to the database
         try:
+            db.session.flush()
+            searchable_changed = UserEmbedding.sync_eligibility([user_id])
+            # New vectors only change mentor search results if this user's embeddings are searchable
+            if (embeddings_dict or removed_types) and not searchable_changed and self._is_searchable(user_id):
+                IndexVersion.bump(IndexVersion.MENTORS)
             db.session.commit()
+            for embedding_type in added_types:
+                embedding_catalog.record_added(embedding_type)
+            for embedding_type in removed_types:
+                embedding_catalog.record_removed(embedding_type)
+            mentor_vector_index.refresh_users([user_id])
             logger.info(f"Successfully stored embeddings for user {user_id}")
         except Exception as e:
             db.session.rollback()
@@ -162,18 +457,31 @@ class EmbeddingFactory:
         """
         Store embeddings in the database.
 
+        Only fields whose text changed since they were last embedded are sent to OpenAI and written,
+        and embeddings for fields that are no longer in embedding_dict are deleted.
+
         Args:
             user_id: The ID of the user
-            embedding_dict: Dictionary with text to generate embeddings for and store
+            embedding_dict: Dictionary with the full set of fields to generate embeddings for and store
 
         Returns:
             None
         """
-        # Generate embeddings
-        embeddings_dict = self.generate_embedding_dict(user_id, embedding_dict)
+        changed, removed = self.diff_profile(user_id, embedding_dict)
+        if not changed and not removed:
+            logger.info(f"Embeddings for user {user_id} are up to date")
+            return
+
+        # Generate embeddings for the changed fields only
+        embeddings_dict = self.generate_embeddings(user_id, changed)
 
         # Store embeddings in the database
-        self.store_embeddings_dict(user_id, embeddings_dict)
+        self.store_embeddings_dict(
+            user_id,
+            embeddings_dict,
+            content_hashes={key: self.content_hash(text) for key, text in changed.items()},
+            removed_types=removed
+        )
 
 
 class TheAlgorithm:
@@ -189,7 +497,7 @@ class TheAlgorithm:
     _instance = None
 
     def __new__(cls):
-        if not hasattr(cls, 'instance'):
+        if cls._instance is None:
             cls._instance = super(TheAlgorithm, cls).__new__(cls)
         return cls._instance
 
@@ -201,11 +509,142 @@ class TheAlgorithm:
 
         self.embedding_factory = EmbeddingFactory()
 
+        config = MatchingConfig()
+        self.search_mode = config.MATCHING_SEARCH_MODE
+        self.fusion_strategy = config.MATCHING_FUSION_STRATEGY
+        self.rrf_k = config.MATCHING_RRF_K
+        self.field_weights = config.MATCHING_FIELD_WEIGHTS
+        self.candidate_depth = config.MATCHING_CANDIDATE_DEPTH
+        self.missing_distance = config.MATCHING_MISSING_DISTANCE
+        self.binary_rerank = config.MATCHING_BINARY_RERANK
+        self.binary_candidates = config.MATCHING_BINARY_CANDIDATES
+        self.batch_chunk_size = config.MATCHING_BATCH_CHUNK_SIZE
+        self.criteria_as_filters = config.MATCHING_CRITERIA_AS_FILTERS
+        self.time_zone_window_hours = config.MATCHING_TIME_ZONE_WINDOW_HOURS
+        self.mentor_capacity = config.MATCHING_MENTOR_CAPACITY
+
+        # Query-side embeddings keyed by model + normalized field text, repeat searches skip OpenAI
+        self.query_embedding_cache = LRUCache(
+            max_size=config.QUERY_EMBEDDING_CACHE_SIZE,
+            default_ttl=config.QUERY_EMBEDDING_CACHE_TTL_SECONDS or None
+        )
+
+        # Complete results keyed by criteria + mentors index version
+        self.match_result_cache = None
+        if config.MATCH_RESULT_CACHE_ENABLED:
+            self.match_result_cache = MatchResultCache(
+                max_size=config.MATCH_RESULT_CACHE_SIZE,
+                ttl=config.MATCH_RESULT_CACHE_TTL_SECONDS,
+                negative_ttl=config.MATCH_RESULT_CACHE_NEGATIVE_TTL_SECONDS
+            )
+
         # Mark as initialized
         self._initialized = True
 
-    def _find_closest_embeddings_for_vector(self, embedding_type: str, vector: List[float], limit: int = 10) -> List[
-        UserEmbedding]:
+    def _generate_query_embeddings(self, user_id: str, embedding_dict: Dict[str, Any]) -> Dict[str, List[float]]:
+        """
+        Embed the search criteria, reusing query embeddings cached by earlier searches.
+
+        Only the fields whose text isn't in the query embedding cache are sent to the EmbeddingFactory.
+
+        Args:
+            user_id: The ID of the user making the search
+            embedding_dict: Dictionary with keys as identifiers and values as text to embed
+
+        Returns:
+            Dictionary with the original keys and values as embedding vectors
+        """
+        model = self.embedding_factory.embedding_model
+        result = {}
+        misses = {}  # key -> (text, cache_key)
+        for key, value in embedding_dict.items():
+            text = EmbeddingFactory._to_text(value)
+            if text is None:
+                continue
+            cache_key = EmbeddingCache.cache_key(model, text)
+            embedding = self.query_embedding_cache.get(cache_key)
+            if embedding is not None:
+                result[key] = embedding
+            else:
+                misses[key] = (text, cache_key)
+
+        if misses:
+            generated = self.embedding_factory.generate_embeddings(
+                user_id, {key: text for key, (text, _) in misses.items()}
+            )
+            for key, embedding in generated.items():
+                self.query_embedding_cache.set(misses[key][1], embedding)
+                result[key] = embedding
+
+        logger.debug(f"Query embeddings for user {user_id}: {len(result) - len(misses)} cached, "
+                     f"{len(misses)} generated")
+        return result
+
+    @staticmethod
+    def _binary_code(vector: List[float]) -> str:
+        """Sign bits of vector as a bit string, same as pgvector's binary_quantize."""
+        return ''.join('1' if value > 0 else '0' for value in vector)
+
+    def _build_search_query(self, embedding_type: str, vector: List[float], limit: int, search_key: str = None,
+                            binary_candidates: Optional[int] = None, filters: Optional[MatchFilters] = None):
+        """
+        Build the nearest-neighbour query for one vector.
+
+        Only user_id, embedding_type and the computed cosine distance are selected, stored vectors
+        are never sent back from the database. Only active mentors are searched, using the
+        is_searchable flag kept on user_embeddings so no join with users is needed.
+
+        With binary_candidates the search runs in two stages: the rows whose binary codes are closest
+        by Hamming distance are picked first into a materialized CTE, then only those are reranked by
+        exact cosine distance.
+
+        Structured filters are pushed down as a semi-join on the generated filter columns of users.
+
+        Args:
+            embedding_type: The type of embedding to search for, or 'all' to search across all types
+            vector: The vector to compare against
+            limit: Maximum number of results to return
+            search_key: Optional label added as a search_key column, used to tell results apart in a UNION
+            binary_candidates: Number of Hamming prefilter candidates to rerank, None for a single-stage search
+            filters: Structured filters the mentors must pass
+
+        Returns:
+            SQLAlchemy Select statement
+        """
+        # Matches the predicate of the managed partial vector indexes
+        conditions = [UserEmbedding.is_searchable == True]
+        if embedding_type != 'all':
+            conditions.append(UserEmbedding.embedding_type == embedding_type)
+        if filters is not None and not filters.is_empty:
+            conditions.append(UserEmbedding.user_id.in_(filters.user_ids_query()))
+
+        source = UserEmbedding.__table__.c
+        if binary_candidates:
+            # The Hamming stage is ordered by the bit_hamming_ops index. MATERIALIZED keeps Postgres from
+            # folding it into the rerank, which then sorts only these rows by exact cosine distance
+            name = 'binary_candidates'
+            if search_key is not None:
+                name += '_' + hashlib.sha1(search_key.encode('utf-8')).hexdigest()[:8]
+            source = (
+                select(UserEmbedding.user_id, UserEmbedding.embedding_type, UserEmbedding.vector_embedding)
+                .where(*conditions)
+                .order_by(UserEmbedding.binary_code().hamming_distance(self._binary_code(vector)))
+                .limit(binary_candidates)
+                .cte(name)
+                .prefix_with('MATERIALIZED')
+            ).c
+            conditions = []
+
+        cosine_distance = source.vector_embedding.cosine_distance(vector).label('cosine_distance')
+        columns = [source.user_id, source.embedding_type, cosine_distance]
+        if search_key is not None:
+            columns.insert(0, literal(search_key).label('search_key'))
+
+        return select(*columns).where(*conditions).order_by(cosine_distance).limit(limit)
+
+    def _find_closest_embeddings_for_vector(self, embedding_type: str, vector: List[float], limit: int = 10,
+                                            binary_candidates: Optional[int] = None,
+                                            filters: Optional[MatchFilters] = None) -> List[EmbeddingMatch]:
         """
         Helper method to find the closest embeddings for a specific vector.
 
@@ -215,72 +654,212 @@ class TheAlgorithm:
             embedding_type: The type of embedding to search for, or 'all' to search across all types
             vector: The vector to compare against
             limit: Maximum number of results to return
+            binary_candidates: Number of Hamming prefilter candidates to rerank, None for a single-stage search
+            filters: Structured filters the mentors must pass
 
         Returns:
-            List of UserEmbedding objects sorted by cosine distance
+            List of EmbeddingMatch tuples sorted by cosine distance
         """
         try:
-            # Import User model here to avoid circular imports
-            from flask_app.models.user import User, UserType, ApplicationStatus
-
-            # Join with User model to filter by user_type and is_active
-            if embedding_type != 'all':
-                closest_embeddings = (
-                    UserEmbedding.query
-                    .join(User, UserEmbedding.user_id == User.cognito_sub)
-                    .filter(UserEmbedding.embedding_type == embedding_type)
-                    .filter(User.user_type == UserType.MENTOR)
-                    .filter(
-                        User.is_active == True)  # TODO: Update to use Sohini's is_active based on mentor availability
-                    .order_by(UserEmbedding.vector_embedding.cosine_distance(vector))
-                    .limit(limit)
-                    .all()
-                )
-            else:
+            if embedding_type == 'all':
                 logger.debug(f'Searching across all embedding types')
-                closest_embeddings = (
-                    UserEmbedding.query
-                    .join(User, UserEmbedding.user_id == User.cognito_sub)
-                    .filter(User.user_type == UserType.MENTOR)
-                    .filter(
-                        User.is_active == True)  # TODO: Update to use Sohini's is_active based on mentor availability
-                    .order_by(UserEmbedding.vector_embedding.cosine_distance(vector))
-                    .limit(limit)
-                    .all()
-                )
+            rows = db.session.execute(
+                self._build_search_query(embedding_type, vector, limit, binary_candidates=binary_candidates,
+                                         filters=filters)
+            ).all()
+            closest_embeddings = [
+                EmbeddingMatch(row.user_id, row.embedding_type, float(row.cosine_distance))
+                for row in rows
+            ]
             logger.debug(f"Found {len(closest_embeddings)} active mentor matches for embedding type '{embedding_type}'")
             return closest_embeddings
         except Exception as e:
             logger.error(f"Error finding closest embeddings for type '{embedding_type}': {str(e)}")
             return []
 
-    def _assign_points_for_embeddings(
+    def _find_closest_embeddings_for_vectors(
+            self,
+            searches: List[Tuple[str, str, List[float]]],
+            limit: int = 10,
+            binary_candidates: Optional[int] = None,
+            filters: Optional[MatchFilters] = None
+    ) -> Dict[str, List[EmbeddingMatch]]:
+        """
+        Run several nearest-neighbour searches in a single database round trip.
+
+        Every search becomes one branch of a UNION ALL, each with its own ORDER BY and LIMIT,
+        so the database still ranks each key independently.
+
+        Args:
+            searches: List of (search_key, embedding_type, vector) tuples. embedding_type may be 'all'.
+            limit: Maximum number of results to return per search
+            binary_candidates: Number of Hamming prefilter candidates to rerank, None for a single-stage search
+            filters: Structured filters the mentors must pass
+
+        Returns:
+            Dictionary of search_key -> list of EmbeddingMatch tuples sorted by cosine distance
+        """
+        results = {search_key: [] for search_key, _, _ in searches}
+        if not searches:
+            return results
+
+        try:
+            statement = union_all(*[
+                self._build_search_query(embedding_type, vector, limit, search_key=search_key,
+                                         binary_candidates=binary_candidates, filters=filters)
+                for search_key, embedding_type, vector in searches
+            ])
+            rows = db.session.execute(statement).all()
+        except Exception as e:
+            logger.error(f"Error running combined search for keys {list(results.keys())}: {str(e)}")
+            return results
+
+        for row in rows:
+            results[row.search_key].append(
+                EmbeddingMatch(row.user_id, row.embedding_type, float(row.cosine_distance))
+            )
+
+        # UNION ALL does not guarantee branch order, sort each list again
+        for matches in results.values():
+            matches.sort(key=lambda match: match.distance)
+
+        logger.debug(f"Combined search over {len(searches)} keys returned {len(rows)} active mentor matches")
+        return results
+
+    def _rerun_short_filtered_searches(
             self,
-            embeddings: List[UserEmbedding],
-            user_points: Dict[str, int],
-            user_embeddings: Dict[str, List[UserEmbedding]]
+            searches: List[Tuple[str, str, List[float]]],
+            search_results: Dict[str, List[EmbeddingMatch]],
+            limit: int,
+            filters: MatchFilters
     ) -> None:
         """
-        Helper method to assign points based on embedding ranks.
+        Run the filtered searches that came back with fewer than limit matches again as exact scans.
+
+        HNSW and ivfflat apply the filters to the rows their index scan found, so a selective filter can
+        return few or no rows even when enough matching mentors exist. The exact scan only reads the
+        mentors the filters allow, which is cheap exactly when the filter is that selective.
+        Updates search_results in place.
+        """
+        short = [search for search in searches if len(search_results.get(search[0], [])) < limit]
+        if not short:
+            return
+
+        logger.info(f"Filtered search returned fewer than {limit} matches for {[search[0] for search in short]}, "
+                    f"running an exact scan")
+        try:
+            # A savepoint contains the rerun: if it fails, rolling back to it also restores enable_indexscan
+            # and leaves the request's transaction usable
+            with db.session.begin_nested():
+                # Turn ANN index scans off for the rerun, the filter columns are still read with bitmap index scans
+                db.session.execute(text("SELECT set_config('enable_indexscan', 'off', true)"))
+                rerun = self._find_closest_embeddings_for_vectors(short, limit, filters=filters)
+                db.session.execute(text("SELECT set_config('enable_indexscan', 'on', true)"))
+        except Exception as e:
+            logger.error(f"Error running exact filtered search: {str(e)}")
+            db.session.rollback()
+            return
+
+        for search_key, matches in rerun.items():
+            if len(matches) > len(search_results.get(search_key, [])):
+                search_results[search_key] = matches
+
+    def _find_closest_embeddings_in_index(
+            self,
+            searches: List[Tuple[str, str, List[float]]],
+            limit: int = 10,
+            binary_candidates: Optional[int] = None,
+            filters: Optional[MatchFilters] = None
+    ) -> Dict[str, List[EmbeddingMatch]]:
+        """
+        Run the searches against the in-process mentor vector index instead of Postgres.
 
         Args:
-            embeddings: List of UserEmbedding objects
-            user_points: Dictionary to store points for each user_id
-            user_embeddings: Dictionary to store user embeddings
+            searches: List of (search_key, embedding_type, vector) tuples. embedding_type may be 'all'.
+            limit: Maximum number of results to return per search
+            binary_candidates: Number of Hamming prefilter candidates to rerank, None scores every vector
+            filters: Structured filters the mentors must pass, resolved to user_ids with one indexed query
 
         Returns:
-            None (updates the dictionaries in place)
+            Dictionary of search_key -> list of EmbeddingMatch tuples sorted by cosine distance
+        """
+        user_ids = None
+        if filters is not None and not filters.is_empty:
+            user_ids = set(db.session.scalars(filters.user_ids_query()))
+        return {
+            search_key: [
+                EmbeddingMatch(*match)
+                for match in mentor_vector_index.search(embedding_type, vector, limit, binary_candidates, user_ids)
+            ]
+            for search_key, embedding_type, vector in searches
+        }
+
+    def _get_available_embedding_types(self) -> List[str]:
         """
-        for rank, embedding in enumerate(embeddings, 1):
-            if embedding.user_id not in user_points:
-                user_points[embedding.user_id] = 0
-                user_embeddings[embedding.user_id] = []
+        Get the embedding types stored in the database.
+
+        Read from the embedding catalog, the table is never scanned just to list the types.
+
+        Returns:
+            List of embedding type strings
+        """
+        return embedding_catalog.types()
+
+    def _find_exact_distances(
+            self,
+            searches: List[Tuple[str, str, List[float]]],
+            missing: Dict[str, List[str]],
+            use_index: bool = False
+    ) -> Dict[str, Dict[str, float]]:
+        """
+        Compute exact distances for candidates that a field's top-k search didn't return.
+
+        All fields are fetched in one UNION ALL statement. Each branch is restricted to a handful
+        of user_ids, so it is a short exact scan rather than an ANN search. For 'all' searches the
+        closest embedding of any type is used.
+
+        Args:
+            searches: List of (search_key, embedding_type, vector) tuples
+            missing: Dictionary of search_key -> user_ids that need a distance for that key
+            use_index: Compute the distances from the in-process mentor vector index instead of Postgres
+
+        Returns:
+            Dictionary of search_key -> {user_id: cosine distance}
+        """
+        results = {search_key: {} for search_key, _, _ in searches}
+        searches = [search for search in searches if missing.get(search[0])]
+        if not searches:
+            return results
+
+        if use_index:
+            for search_key, embedding_type, vector in searches:
+                results[search_key] = mentor_vector_index.distances(embedding_type, vector, missing[search_key])
+            return results
+
+        branches = []
+        for search_key, embedding_type, vector in searches:
+            query = (
+                select(
+                    literal(search_key).label('search_key'),
+                    UserEmbedding.user_id,
+                    func.min(UserEmbedding.vector_embedding.cosine_distance(vector)).label('cosine_distance')
+                )
+                .where(UserEmbedding.user_id.in_(missing[search_key]))
+                .group_by(UserEmbedding.user_id)
+            )
+            if embedding_type != 'all':
+                query = query.where(UserEmbedding.embedding_type == embedding_type)
+            branches.append(query)
 
-            # Add points (lower is better)
-            user_points[embedding.user_id] += rank
+        try:
+            rows = db.session.execute(union_all(*branches)).all()
+        except Exception as e:
+            logger.error(f"Error fetching exact distances for keys {list(missing.keys())}: {str(e)}")
+            return results
 
-            # Store the embedding
-            user_embeddings[embedding.user_id].append(embedding)
+        for row in rows:
+            results[row.search_key][row.user_id] = float(row.cosine_distance)
+        return results
 
     def _get_user_embedding_types(self, user_id: str) -> List[str]:
         """
@@ -293,93 +872,152 @@ class TheAlgorithm:
             List of embedding type strings
         """
         try:
-            embedding_types = UserEmbedding.query.filter_by(user_id=user_id).distinct(
-                UserEmbedding.embedding_type).all()
+            # Only select the type column, the vectors aren't needed here
+            embedding_types = (
+                db.session.query(UserEmbedding.embedding_type)
+                .filter(UserEmbedding.user_id == user_id)
+                .distinct()
+                .all()
+            )
             logger.debug(f"Found {len(embedding_types)} embedding types for user {user_id}")
-            logger.debug(f'Embedding types: {embedding_types}')
-            return_types = []
-            for embedding_type in embedding_types:
-                return_types.append(embedding_type.embedding_type)
-            # Extract column names from result
+            return_types = [row.embedding_type for row in embedding_types]
+            logger.debug(f'Embedding types: {return_types}')
             return return_types
         except Exception as e:
             logger.error(f"Error getting embedding types for user {user_id}: {str(e)}")
             return []
 
-    def _prepare_result_list(
+    def _split_filters(
             self,
-            user_points: Dict[str, int],
-            user_embeddings: Dict[str, List[UserEmbedding]],
-            limit: int
-    ) -> List[Dict[str, Any]]:
+            criteria: Dict[str, Any],
+            filters: Optional[MatchFilters] = None
+    ) -> Tuple[Dict[str, Any], Optional[MatchFilters]]:
         """
-        Prepare the final result list sorted by points.
+        Work out which criteria are embedded and which are applied as structured filters.
 
         Args:
-            user_points: Dictionary with points for each user_id
-            user_embeddings: Dictionary with embeddings for each user_id
-            limit: Maximum number of results to return
+            criteria: Search criteria, key -> text
+            filters: Explicit structured filters
 
         Returns:
-            List of dictionaries with user_id, score, and embeddings
+            Tuple of (criteria to embed, filters or None when there are none)
         """
-        # Sort users by total points (lowest is best)
-        sorted_users = sorted(user_points.items(), key=lambda x: x[1])
+        if self.criteria_as_filters:
+            criteria, filters = MatchFilters.from_criteria(criteria, self.time_zone_window_hours, filters)
+        if filters is None or filters.is_empty:
+            return criteria, None
+        return criteria, filters
 
-        # Prepare the result list
-        result = []
-        for user_id, points in sorted_users:
-            if user_id in user_embeddings:
-                # Add user embeddings with their score
-                result.append({
-                    "user_id": user_id,
-                    "score": points,
-                    "embeddings": user_embeddings[user_id]
-                })
-
-        return result[:limit]
-
-    def _process_embedding_search(
+    def _split_batch_filters(
             self,
-            embedding_type: str,
-            vector: List[float],
-            user_points: Dict[str, int],
-            user_embeddings: Dict[str, List[UserEmbedding]],
-            limit: int = 10
-    ) -> None:
+            queries: Dict[str, Dict[str, Any]],
+            excluded_keys: List[str] = None,
+            filters: Optional[MatchFilters] = None
+    ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, MatchFilters]]:
+        """
+        Drop excluded keys from every query and split off its structured filters (see _split_filters).
+
+        Returns:
+            Tuple of (query_id -> criteria to embed, query_id -> filters for the queries that have any)
         """
-        Helper method to process a single embedding search and update rankings.
+        if excluded_keys is None:
+            excluded_keys = EXCLUDED_EMBEDDING_FIELDS
 
-        This method finds the closest embeddings for a given vector and
-        assigns points based on their rank. It's used both for searching
-        specific embedding types and for fallback searches across all types.
+        criteria_by_query = {}
+        filters_by_query = {}
+        for query_id, criteria in queries.items():
+            criteria = {key: value for key, value in criteria.items() if key not in excluded_keys}
+            criteria_by_query[query_id], query_filters = self._split_filters(criteria, filters)
+            if query_filters is not None:
+                filters_by_query[query_id] = query_filters
+        return criteria_by_query, filters_by_query
+
+    def _fuse_search_results(
+            self,
+            searches: List[Tuple[str, str, List[float]]],
+            search_results: Dict[str, List[EmbeddingMatch]],
+            limit: int,
+            fusion: Optional[str] = None,
+            field_weights: Optional[Dict[str, float]] = None,
+            use_index: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Fuse the per-field results into one ranked list.
+
+        Every candidate returned by any field gets a row in a candidate x field distance matrix.
+        Cells a field's top-k search didn't cover are filled with exact distances fetched in one
+        batch, so a mentor that is missing from one list is judged on its real distance for that
+        field. The matrix is then scored by the fusion strategy.
 
         Args:
-            embedding_type: The type of embedding to search for
-            vector: The vector to compare against
-            user_points: Dictionary to store points for each user_id
-            user_embeddings: Dictionary to store user embeddings
+            searches: List of (search_key, embedding_type, vector) tuples that were searched
+            search_results: Dictionary of search_key -> list of EmbeddingMatch tuples
             limit: Maximum number of results to return
+            fusion: Fusion strategy name (default: MATCHING_FUSION_STRATEGY)
+            field_weights: Per-field weights, fields not listed weigh 1 (default: MATCHING_FIELD_WEIGHTS)
+            use_index: Fill the gaps from the in-process mentor vector index instead of Postgres
 
         Returns:
-            None (updates the dictionaries in place)
+            List of dictionaries with user_id, score, distance, distances and embeddings
         """
-        # Find closest embeddings for this vector
-        closest_embeddings = self._find_closest_embeddings_for_vector(
-            embedding_type,
-            vector,
-            limit
-        )
+        search_keys = [search_key for search_key, _, _ in searches]
+        user_embeddings = defaultdict(list)
+        for search_key in search_keys:
+            for match in search_results.get(search_key, []):
+                user_embeddings[match.user_id].append(match)
+
+        candidates = list(user_embeddings.keys())
+        if not candidates:
+            return []
+        positions = {user_id: row for row, user_id in enumerate(candidates)}
+
+        distances = np.full((len(candidates), len(search_keys)), np.nan, dtype=np.float32)
+        for column, search_key in enumerate(search_keys):
+            for match in search_results.get(search_key, []):
+                row = positions[match.user_id]
+                # 'all' searches can return several fields of one user, keep the closest
+                if np.isnan(distances[row, column]) or match.distance < distances[row, column]:
+                    distances[row, column] = match.distance
+
+        missing = {
+            search_key: [candidates[row] for row in np.flatnonzero(np.isnan(distances[:, column]))]
+            for column, search_key in enumerate(search_keys)
+        }
+        exact_distances = self._find_exact_distances(searches, missing, use_index)
+        for column, search_key in enumerate(search_keys):
+            for user_id, distance in exact_distances[search_key].items():
+                distances[positions[user_id], column] = distance
+        distances[np.isnan(distances)] = self.missing_distance
+
+        field_weights = self.field_weights if field_weights is None else field_weights
+        weights = np.array([field_weights.get(search_key, 1.0) for search_key in search_keys], dtype=np.float32)
+        strategy = get_fusion_strategy(fusion or self.fusion_strategy, self.rrf_k)
+        order, scores = strategy.rank(distances, weights)
 
-        # Assign points based on rank
-        self._assign_points_for_embeddings(closest_embeddings, user_points, user_embeddings)
+        result = []
+        for row in order[:limit]:
+            user_id = candidates[row]
+            result.append({
+                "user_id": user_id,
+                "score": float(scores[row]),
+                "distance": float(distances[row].mean()),
+                "distances": {search_key: float(distances[row, column])
+                              for column, search_key in enumerate(search_keys)},
+                "embeddings": user_embeddings[user_id]
+            })
+        return result
 
     def get_closest_embeddings(
             self,
             user_id: str,
             embedding_to_search_for: Dict[str, str],
             limit: int = 10,
-            excluded_keys: List[str] = None
+            excluded_keys: List[str] = None,
+            ef_search: Optional[int] = None,
+            probes: Optional[int] = None,
+            fusion: Optional[str] = None,
+            field_weights: Optional[Dict[str, float]] = None,
+            filters: Optional[MatchFilters] = None
     ) -> List[Dict[str, Any]]:
         """
         Find the closest embeddings to the given embedding dictionary.
@@ -388,7 +1026,7 @@ class TheAlgorithm:
         1. For each key in embedding_to_search_for, check if that key exists in the database
         2. If the key exists, search only for that specific key
         3. If the key doesn't exist, search across all embedding types
-        4. Aggregate all rankings to produce a final sorted list
+        4. Fuse the per-key distances into a final sorted list (see _fuse_search_results)
         5. Exclude any keys specified in excluded_keys
 
         Args:
@@ -396,6 +1034,13 @@ class TheAlgorithm:
             embedding_to_search_for: Dictionary with keys as identifiers and values as text to embed
             limit: Maximum number of results to return (default: 10)
             excluded_keys: List of keys to exclude from the search (default: None)
+            ef_search: HNSW candidate list size for this search, trades latency for recall (default: HNSW_EF_SEARCH)
+            probes: Number of ivfflat lists to scan for this search (default: IVFFLAT_PROBES)
+            fusion: 'weighted_cosine', 'rrf' or 'rank_sum' (default: MATCHING_FUSION_STRATEGY)
+            field_weights: Per-key weights used by the fusion, keys not listed weigh 1
+                           (default: MATCHING_FIELD_WEIGHTS)
+            filters: Structured filters on mentor profile fields. With MATCHING_CRITERIA_AS_FILTERS the
+                     country, stateProvince and timeZone criteria are turned into filters instead of embedded.
 
         Returns:
             A list of closest embeddings, sorted by match score (best matches first)
@@ -410,26 +1055,38 @@ class TheAlgorithm:
             if key in embedding_to_search_for:
                 embedding_to_search_for.pop(key)
 
+        embedding_to_search_for, filters = self._split_filters(embedding_to_search_for, filters)
+
         if not embedding_to_search_for:
             logger.error("None or no valid keys provided, unable to find any embeddings")
             return []
 
+        # Identical searches against an unchanged set of mentors return the cached result
+        result_cache_key = None
+        if self.match_result_cache:
+            try:
+                result_cache_key = MatchResultCache.cache_key(
+                    embedding_to_search_for, limit, excluded_keys, IndexVersion.current(IndexVersion.MENTORS),
+                    {'fusion': fusion or self.fusion_strategy, 'field_weights': field_weights,
+                     'ef_search': ef_search, 'probes': probes,
+                     'filters': filters.to_dict() if filters else None}
+                )
+                cached_result = self.match_result_cache.get(result_cache_key)
+                if cached_result is not None:
+                    logger.info(f"Returning cached match result with {len(cached_result)} matches")
+                    return cached_result
+            except Exception as e:
+                logger.error(f"Error reading match result cache: {str(e)}")
+
         # Generate embeddings for the search terms
-        search_embeddings = self.embedding_factory.generate_embeddings(user_id, embedding_to_search_for)
+        search_embeddings = self._generate_query_embeddings(user_id, embedding_to_search_for)
         logger.error(f'Search embeddings keys: {search_embeddings.keys()}')
-        # Dictionary to store points for each user_id
-        user_points = {}
-        # Dictionary to store user embeddings
-        user_embeddings = {}
-
         # Get all available embedding types in the database
-        _available_embedding_types = UserEmbedding.query.distinct(UserEmbedding.embedding_type).all()
-        available_embeddings = []
-        for embedding_type in _available_embedding_types:
-            available_embeddings.append(embedding_type.embedding_type)
+        available_embeddings = self._get_available_embedding_types()
         logger.debug(f"Available embedding types in database: {available_embeddings}")
 
-        # Process each key in the search request
+        # Work out what to search for each key in the search request
+        searches = []
         for embedding_type, vector in search_embeddings.items():
             # Skip excluded keys
             if embedding_type in excluded_keys:
@@ -439,31 +1096,432 @@ class TheAlgorithm:
             # Check if this embedding type exists in the database
             if embedding_type in available_embeddings:
                 logger.debug(f"Searching for specific embedding type: {embedding_type}")
-                # Process this specific embedding search
-                self._process_embedding_search(
-                    embedding_type,
-                    vector,
-                    user_points,
-                    user_embeddings,
-                    limit
-                )
+                searches.append((embedding_type, embedding_type, vector))
             else:
                 logger.debug(f"Embedding type {embedding_type} not found in database, searching across all types")
-                self._process_embedding_search(
-                    'all',
-                    vector,
-                    user_points,
-                    user_embeddings,
-                    limit
-                )
+                searches.append((embedding_type, 'all', vector))
+
+        # Candidates fetched per key, fusion fills in the distances the other keys didn't return
+        depth = self.candidate_depth or limit
+        # Two-stage search: Hamming prefilter on binary codes, exact cosine rerank of the survivors
+        binary_candidates = max(self.binary_candidates, depth) if self.binary_rerank else None
+
+        use_index = mentor_vector_index.is_ready
+        if use_index:
+            # Answer from memory, no database round trip at all
+            search_results = self._find_closest_embeddings_in_index(searches, depth, binary_candidates, filters)
+        else:
+            # Recall/latency knobs only last until the end of the current transaction. The Hamming stage
+            # reads binary_candidates rows from its HNSW index, so ef_search has to cover those too
+            try:
+                vector_index_manager.apply_search_settings(db.session, ef_search, probes,
+                                                           binary_candidates or depth, filtered=filters is not None)
+            except Exception as e:
+                logger.error(f"Error applying vector index search settings: {str(e)}")
 
-        # Step 4: Prepare and return the final result list
-        result = self._prepare_result_list(user_points, user_embeddings, limit)
+            if self.search_mode == 'single_query':
+                # Submit every search vector in one statement
+                search_results = self._find_closest_embeddings_for_vectors(searches, depth, binary_candidates,
+                                                                           filters)
+            else:
+                search_results = {
+                    search_key: self._find_closest_embeddings_for_vector(embedding_type, vector, depth,
+                                                                         binary_candidates, filters)
+                    for search_key, embedding_type, vector in searches
+                }
+            if filters is not None:
+                self._rerun_short_filtered_searches(searches, search_results, depth, filters)
+
+        # Step 4: Fuse the per-key results and return the final result list
+        result = self._fuse_search_results(searches, search_results, limit, fusion, field_weights, use_index)
+        if result_cache_key:
+            self.match_result_cache.set(result_cache_key, result)
 
         logger.info(
             f"Completed embedding search with {len(embedding_to_search_for)} criteria, found {len(result)} matches")
         return result
 
+    def _generate_query_embeddings_batch(
+            self,
+            queries: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Dict[str, List[float]]]:
+        """
+        Embed the criteria of many searches at once.
+
+        Cached query embeddings are reused, the rest go through generate_embeddings_bulk so every
+        distinct text is embedded once, in packed batch requests.
+
+        Args:
+            queries: Dictionary of query_id -> {key: text}
+
+        Returns:
+            Dictionary of query_id -> {key: embedding vector}
+        """
+        model = self.embedding_factory.embedding_model
+        result = {query_id: {} for query_id in queries}
+        items = []
+        cache_keys = {}  # (query_id, key) -> cache_key
+        for query_id, criteria in queries.items():
+            for key, value in criteria.items():
+                text = EmbeddingFactory._to_text(value)
+                if text is None:
+                    continue
+                cache_key = EmbeddingCache.cache_key(model, text)
+                embedding = self.query_embedding_cache.get(cache_key)
+                if embedding is not None:
+                    result[query_id][key] = embedding
+                else:
+                    items.append((query_id, key, text))
+                    cache_keys[(query_id, key)] = cache_key
+
+        if items:
+            generated = self.embedding_factory.generate_embeddings_bulk(items)
+            for query_id, embeddings in generated.items():
+                for key, embedding in embeddings.items():
+                    self.query_embedding_cache.set(cache_keys[(query_id, key)], embedding)
+                    result[query_id][key] = embedding
+
+        logger.debug(f"Batch query embeddings: {len(items)} generated for {len(queries)} queries")
+        return result
+
+    def _iter_batch_distances(
+            self,
+            query_embeddings: Dict[str, Dict[str, List[float]]],
+            query_filters: Optional[Dict[str, MatchFilters]] = None
+    ) -> Iterator[Tuple[List[str], List[str], List[str], np.ndarray, np.ndarray]]:
+        """
+        Exact distances between every query and every searchable mentor, a chunk of queries at a time.
+
+        Each search key is scored as one matrix multiply of the chunk's query vectors against the
+        mentor matrix of that embedding type. Keys with no stored type of the same name are compared
+        with every type and the closest is kept, same as the 'all' search of get_closest_embeddings.
+        Mentors a query's filters rule out get inf for every key of that query.
+
+        Args:
+            query_embeddings: Dictionary of query_id -> {key: embedding vector}
+            query_filters: Dictionary of query_id -> structured filters, queries not listed are unfiltered
+
+        Yields:
+            Tuples of (query_ids, search_keys, mentor_ids, distances, present) where distances has shape
+            (queries, mentors, keys) with inf where a mentor has no embedding for a key, and present has
+            shape (queries, keys) marking the keys each query searched on
+        """
+        search_keys = sorted({key for embeddings in query_embeddings.values() for key in embeddings})
+        query_ids = [query_id for query_id, embeddings in query_embeddings.items() if embeddings]
+        if not search_keys or not query_ids:
+            return
+
+        available = set(self._get_available_embedding_types())
+        key_types = {key: key if key in available else 'all' for key in search_keys}
+        needed_types = None if 'all' in key_types.values() else sorted(set(key_types.values()))
+        matrices = mentor_vector_index.matrices(needed_types)
+
+        mentor_ids = sorted({user_id for user_ids, _ in matrices.values() for user_id in user_ids})
+        mentor_columns = {user_id: column for column, user_id in enumerate(mentor_ids)}
+        type_columns = {
+            name: np.array([mentor_columns[user_id] for user_id in user_ids], dtype=np.intp)
+            for name, (user_ids, _) in matrices.items()
+        }
+        logger.info(f"Scoring {len(query_ids)} queries against {len(mentor_ids)} mentors on {len(search_keys)} keys")
+
+        # Queries with identical filters share one lookup of the mentors they allow
+        allowed_masks = {}
+        query_masks = {}
+        for query_id, filters in (query_filters or {}).items():
+            if query_id not in query_embeddings or filters is None or filters.is_empty:
+                continue
+            filters_key = json.dumps(filters.to_dict(), sort_keys=True)
+            if filters_key not in allowed_masks:
+                allowed = set(db.session.scalars(filters.user_ids_query()))
+                allowed_masks[filters_key] = np.array([user_id in allowed for user_id in mentor_ids], dtype=bool)
+            query_masks[query_id] = allowed_masks[filters_key]
+
+        for start in range(0, len(query_ids), self.batch_chunk_size):
+            chunk_ids = query_ids[start:start + self.batch_chunk_size]
+            distances = np.full((len(chunk_ids), len(mentor_ids), len(search_keys)), np.inf, dtype=np.float32)
+            present = np.zeros((len(chunk_ids), len(search_keys)), dtype=bool)
+
+            for column, key in enumerate(search_keys):
+                rows = [row for row, query_id in enumerate(chunk_ids) if key in query_embeddings[query_id]]
+                if not rows:
+                    continue
+                present[rows, column] = True
+                queries_matrix = np.stack([
+                    MentorVectorIndex._normalize(query_embeddings[chunk_ids[row]][key]) for row in rows
+                ])
+
+                embedding_type = key_types[key]
+                types = list(matrices) if embedding_type == 'all' else [embedding_type]
+                for name in types:
+                    if name not in matrices:
+                        continue
+                    block = np.ix_(rows, type_columns[name], [column])
+                    scored = (1.0 - queries_matrix @ matrices[name][1].T)[:, :, None]
+                    distances[block] = np.minimum(distances[block], scored)
+
+            for row, query_id in enumerate(chunk_ids):
+                if query_id in query_masks:
+                    distances[row, ~query_masks[query_id], :] = np.inf
+
+            yield chunk_ids, search_keys, mentor_ids, distances, present
+
+    def get_closest_embeddings_batch(
+            self,
+            queries: Dict[str, Dict[str, Any]],
+            limit: int = 10,
+            excluded_keys: List[str] = None,
+            fusion: Optional[str] = None,
+            field_weights: Optional[Dict[str, float]] = None,
+            filters: Optional[MatchFilters] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Find the closest mentors for many searches at once.
+
+        All criteria are embedded together, then every chunk of queries is scored against every
+        searchable mentor with one matrix multiply per key (see _iter_batch_distances). Per query,
+        the candidates are the top candidate_depth mentors of each key, fused exactly like
+        get_closest_embeddings, but every distance is exact since the whole matrix is computed.
+
+        Args:
+            queries: Dictionary of query_id (usually the mentee's user_id) -> {key: text}
+            limit: Maximum number of results per query (default: 10)
+            excluded_keys: List of keys to exclude from the search (default: EXCLUDED_EMBEDDING_FIELDS)
+            fusion: 'weighted_cosine', 'rrf' or 'rank_sum' (default: MATCHING_FUSION_STRATEGY)
+            field_weights: Per-key weights used by the fusion, keys not listed weigh 1
+                           (default: MATCHING_FIELD_WEIGHTS)
+            filters: Structured filters applied to every query, see get_closest_embeddings
+
+        Returns:
+            Dictionary of query_id -> list of dictionaries with user_id, score, distance and distances,
+            best matches first. Queries without any usable criteria get an empty list.
+        """
+        queries, query_filters = self._split_batch_filters(queries, excluded_keys, filters)
+        results = {query_id: [] for query_id in queries}
+        query_embeddings = self._generate_query_embeddings_batch(queries)
+
+        depth = self.candidate_depth or limit
+        field_weights = self.field_weights if field_weights is None else field_weights
+        strategy = get_fusion_strategy(fusion or self.fusion_strategy, self.rrf_k)
+
+        for chunk_ids, search_keys, mentor_ids, distances, present in self._iter_batch_distances(query_embeddings,
+                                                                                                 query_filters):
+            # Top candidates per key for the whole chunk at once
+            if depth < len(mentor_ids):
+                top = np.argpartition(distances, depth - 1, axis=1)[:, :depth, :]
+            else:
+                top = np.broadcast_to(np.arange(len(mentor_ids))[None, :, None],
+                                      (len(chunk_ids), len(mentor_ids), len(search_keys)))
+
+            for row, query_id in enumerate(chunk_ids):
+                columns = np.flatnonzero(present[row])
+                candidates = np.unique(top[row][:, columns])
+                query_distances = distances[row][np.ix_(candidates, columns)]
+                # Only mentors that some key actually returned are candidates
+                found = np.isfinite(query_distances).any(axis=1)
+                candidates = candidates[found]
+                query_distances = query_distances[found]
+                if not candidates.size:
+                    continue
+                query_distances[~np.isfinite(query_distances)] = self.missing_distance
+
+                keys = [search_keys[column] for column in columns]
+                weights = np.array([field_weights.get(key, 1.0) for key in keys], dtype=np.float32)
+                order, scores = strategy.rank(query_distances, weights)
+                results[query_id] = [
+                    {
+                        "user_id": mentor_ids[candidates[index]],
+                        "score": float(scores[index]),
+                        "distance": float(query_distances[index].mean()),
+                        "distances": {key: float(query_distances[index, position]) for position, key in enumerate(keys)}
+                    }
+                    for index in order[:limit]
+                ]
+
+        logger.info(f"Completed batch embedding search for {len(queries)} queries")
+        return results
+
+    def score_matrix(
+            self,
+            queries: Dict[str, Dict[str, Any]],
+            excluded_keys: List[str] = None,
+            field_weights: Optional[Dict[str, float]] = None,
+            filters: Optional[MatchFilters] = None
+    ) -> Tuple[List[str], List[str], np.ndarray]:
+        """
+        Weighted cosine distance between every query and every searchable mentor.
+
+        Rank based fusions only make sense within one query's list, so the matrix always uses the
+        weighted mean of the per-key distances.
+
+        Args:
+            queries: Dictionary of query_id -> {key: text}
+            excluded_keys: List of keys to exclude from the search (default: EXCLUDED_EMBEDDING_FIELDS)
+            field_weights: Per-key weights, keys not listed weigh 1 (default: MATCHING_FIELD_WEIGHTS)
+            filters: Structured filters applied to every query, see get_closest_embeddings
+
+        Returns:
+            Tuple of (query_ids, mentor_ids, distances) where distances has shape (queries, mentors),
+            lower is better, inf where the mentor has no embedding for any of the query's keys.
+            Queries without any usable criteria are left out.
+        """
+        field_weights = self.field_weights if field_weights is None else field_weights
+        queries, query_filters = self._split_batch_filters(queries, excluded_keys, filters)
+        query_embeddings = self._generate_query_embeddings_batch(queries)
+
+        query_ids, mentor_ids, chunks = [], [], []
+        for chunk_ids, search_keys, mentor_ids, distances, present in self._iter_batch_distances(query_embeddings,
+                                                                                                 query_filters):
+            found = (np.isfinite(distances) & present[:, None, :]).any(axis=2)
+            distances[~np.isfinite(distances)] = self.missing_distance
+            weights = np.array([field_weights.get(key, 1.0) for key in search_keys], dtype=np.float32)
+            weights = present * weights
+            fused = np.einsum('qmk,qk->qm', distances, weights) / weights.sum(axis=1)[:, None]
+            fused[~found] = np.inf
+            query_ids.extend(chunk_ids)
+            chunks.append(fused)
+
+        if not chunks:
+            return [], mentor_ids, np.zeros((0, len(mentor_ids)), dtype=np.float32)
+        return query_ids, mentor_ids, np.concatenate(chunks)
+
+    def assign_cohort(
+            self,
+            queries: Dict[str, Dict[str, Any]],
+            capacities: Optional[Dict[str, int]] = None,
+            default_capacity: Optional[int] = None,
+            limit: int = 10,
+            excluded_keys: List[str] = None,
+            field_weights: Optional[Dict[str, float]] = None,
+            filters: Optional[MatchFilters] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Assign a cohort of mentees to mentors without overloading any mentor.
+
+        Instead of giving every mentee their own top list, where popular mentors end up on everyone's,
+        the mentee x mentor distance matrix (see score_matrix) is solved as one assignment with a
+        capacity per mentor (see capacitated_assignment), minimizing the total distance.
+
+        Args:
+            queries: Dictionary of mentee user_id -> {key: text}
+            capacities: Mentees each mentor can take, mentor user_id -> count
+            default_capacity: Capacity of mentors not in capacities (default: MATCHING_MENTOR_CAPACITY)
+            limit: Length of each mentee's recommended list, the assigned mentor first
+            excluded_keys: List of keys to exclude from the search (default: EXCLUDED_EMBEDDING_FIELDS)
+            field_weights: Per-key weights, keys not listed weigh 1 (default: MATCHING_FIELD_WEIGHTS)
+            filters: Structured filters applied to every mentee, see get_closest_embeddings
+
+        Returns:
+            Dictionary of mentee user_id -> dictionary with assigned_mentor (None if there was no room),
+            distance and recommendations. Recommendations after the assigned mentor only list mentors
+            with capacity left after the assignment.
+        """
+        capacities = capacities or {}
+        default_capacity = self.mentor_capacity if default_capacity is None else default_capacity
+        results = {query_id: {"assigned_mentor": None, "distance": None, "recommendations": []} for query_id in queries}
+
+        query_ids, mentor_ids, distances = self.score_matrix(queries, excluded_keys, field_weights, filters)
+        if not query_ids or not mentor_ids:
+            return results
+
+        mentor_capacities = np.array([capacities.get(user_id, default_capacity) for user_id in mentor_ids],
+                                     dtype=np.int64)
+        assigned = capacitated_assignment(distances, mentor_capacities)
+        open_mentors = remaining_capacity(assigned, mentor_capacities) > 0
+
+        for row, query_id in enumerate(query_ids):
+            column = assigned[row]
+            recommended = [column] if column >= 0 else []
+            candidates = np.flatnonzero(open_mentors & np.isfinite(distances[row]))
+            candidates = candidates[candidates != column]
+            count = limit - len(recommended)
+            if count > 0 and candidates.size:
+                if count < candidates.size:
+                    candidates = candidates[np.argpartition(distances[row, candidates], count - 1)[:count]]
+                recommended.extend(candidates[np.argsort(distances[row, candidates])])
+            results[query_id] = {
+                "assigned_mentor": mentor_ids[column] if column >= 0 else None,
+                "distance": float(distances[row, column]) if column >= 0 else None,
+                "recommendations": [mentor_ids[index] for index in recommended]
+            }
+
+        logger.info(f"Assigned {int((assigned >= 0).sum())} of {len(queries)} mentees to {len(mentor_ids)} mentors")
+        return results
+
+    def measure_binary_recall(
+            self,
+            sample_size: int = 50,
+            limit: int = 10,
+            binary_candidates: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Measure recall@limit of the two-stage binary search against the exact search.
+
+        Stored mentor embeddings are sampled as queries. For each one the exact top-limit (every
+        vector scored, ANN index scans disabled) is compared with the two-stage result.
+
+        Args:
+            sample_size: Number of stored embeddings to use as queries
+            limit: Number of results compared per query
+            binary_candidates: Prefilter candidates to evaluate (default: MATCHING_BINARY_CANDIDATES)
+
+        Returns:
+            Dictionary with mean recall, the worst query's recall and mean latency of both paths
+        """
+        binary_candidates = binary_candidates or self.binary_candidates
+        use_index = mentor_vector_index.is_ready
+
+        sample = db.session.execute(
+            select(UserEmbedding.embedding_type, UserEmbedding.vector_embedding)
+            .where(UserEmbedding.is_searchable == True)
+            .order_by(func.random())
+            .limit(sample_size)
+        ).all()
+        db.session.commit()
+
+        recalls = []
+        exact_seconds = 0.0
+        binary_seconds = 0.0
+        for row in sample:
+            vector = row.vector_embedding
+            vector = vector.to_list() if hasattr(vector, 'to_list') else [float(value) for value in vector]
+
+            started = time.perf_counter()
+            if use_index:
+                exact = mentor_vector_index.search(row.embedding_type, vector, limit)
+            else:
+                # Turn ANN index scans off for this transaction so every vector is scored
+                db.session.execute(text("SELECT set_config('enable_indexscan', 'off', true)"))
+                exact = self._find_closest_embeddings_for_vector(row.embedding_type, vector, limit)
+                db.session.commit()
+            exact_seconds += time.perf_counter() - started
+
+            started = time.perf_counter()
+            if use_index:
+                approximate = mentor_vector_index.search(row.embedding_type, vector, limit, binary_candidates)
+            else:
+                vector_index_manager.apply_search_settings(db.session, limit=binary_candidates)
+                approximate = self._find_closest_embeddings_for_vector(row.embedding_type, vector, limit,
+                                                                       binary_candidates)
+                db.session.commit()
+            binary_seconds += time.perf_counter() - started
+
+            exact_ids = {match[0] for match in exact}
+            if exact_ids:
+                recalls.append(len(exact_ids & {match[0] for match in approximate}) / len(exact_ids))
+
+        result = {
+            'queries': len(recalls),
+            'limit': limit,
+            'binary_candidates': binary_candidates,
+            'source': 'memory' if use_index else 'postgres',
+            'recall': sum(recalls) / len(recalls) if recalls else None,
+            'min_recall': min(recalls) if recalls else None,
+            'exact_ms': exact_seconds * 1000 / len(sample) if sample else None,
+            'binary_ms': binary_seconds * 1000 / len(sample) if sample else None
+        }
+        logger.info(f"Binary prefilter recall measurement: {result}")
+        return result
+
 # Create the singleton instances
 # embedding_factory = EmbeddingFactory()
 # the_algorithm = TheAlgorithm()
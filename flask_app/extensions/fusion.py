@@ -0,0 +1,99 @@
+from typing import Dict, Type
+import numpy as np
+from extensions.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def column_ranks(distances: np.ndarray) -> np.ndarray:
+    """Return the 1-based rank of every cell within its column (closest = 1)."""
+    order = np.argsort(distances, axis=0, kind='stable')
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(1, distances.shape[0] + 1)[:, None], axis=0)
+    return ranks
+
+
+class FusionStrategy:
+    """
+    Combines a candidate x field matrix of cosine distances into one score per candidate.
+
+    Subclasses implement score(). Every cell of the matrix is filled in before fusion, so
+    candidates are compared on all fields, not only the ones they happened to rank for.
+    """
+    name = None
+    higher_is_better = False
+
+    def score(self, distances: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            distances: float array of shape (candidates, fields)
+            weights: float array of shape (fields,)
+
+        Returns:
+            float array of shape (candidates,)
+        """
+        raise NotImplementedError
+
+    def rank(self, distances: np.ndarray, weights: np.ndarray):
+        """
+        Score and order the candidates, best first. Ties are broken by mean distance.
+
+        Returns:
+            Tuple of (order, scores) where order indexes into the candidate axis
+        """
+        scores = self.score(distances, weights)
+        primary = -scores if self.higher_is_better else scores
+        order = np.lexsort((distances.mean(axis=1), primary))
+        return order, scores
+
+
+class WeightedCosineFusion(FusionStrategy):
+    """Weighted mean cosine distance across fields, lower is better."""
+    name = 'weighted_cosine'
+
+    def score(self, distances: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        return distances @ weights / weights.sum()
+
+
+class ReciprocalRankFusion(FusionStrategy):
+    """Reciprocal rank fusion, sum of weight / (k + rank) per field, higher is better."""
+    name = 'rrf'
+    higher_is_better = True
+
+    def __init__(self, k: int = 60):
+        self.k = k
+
+    def score(self, distances: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        return (weights / (self.k + column_ranks(distances))).sum(axis=1)
+
+
+class RankSumFusion(FusionStrategy):
+    """Weighted sum of per-field ranks, lower is better. Closest to the original points scoring."""
+    name = 'rank_sum'
+
+    def score(self, distances: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        return column_ranks(distances) @ weights
+
+
+FUSION_STRATEGIES: Dict[str, Type[FusionStrategy]] = {
+    strategy.name: strategy for strategy in (WeightedCosineFusion, ReciprocalRankFusion, RankSumFusion)
+}
+
+
+def get_fusion_strategy(name: str, rrf_k: int = 60) -> FusionStrategy:
+    """
+    Look up a fusion strategy by name.
+
+    Args:
+        name: One of FUSION_STRATEGIES
+        rrf_k: Rank offset for reciprocal rank fusion
+
+    Returns:
+        FusionStrategy instance
+    """
+    if name not in FUSION_STRATEGIES:
+        logger.error(f"Unknown fusion strategy: {name}")
+        raise ValueError(f"Fusion strategy must be one of {sorted(FUSION_STRATEGIES)}")
+    if name == ReciprocalRankFusion.name:
+        return ReciprocalRankFusion(rrf_k)
+    return FUSION_STRATEGIES[name]()
@@ -0,0 +1,141 @@
+import json
+import threading
+import time
+import urllib.request
+from typing import Any, Dict, List
+from jose import jwk
+from extensions.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class JWKSCache:
+    """
+    Process-wide cache of one JSON Web Key Set.
+
+    The key set is fetched once and the public key objects are constructed once per kid, so
+    verifying a token needs no network call. The set is fetched again when it is older than the
+    TTL or a token names a kid it doesn't hold (Cognito rotated its keys). Refreshes are
+    single-flight: one thread fetches while the others wait and then use its result. Unknown kids
+    refresh at most once per min_refresh_interval, so tokens with made-up kids can't make every
+    request fetch the set. If a refresh fails the keys already held keep being used.
+    """
+
+    def __init__(self, url: str, ttl: int = 3600, min_refresh_interval: int = 30, timeout: float = 5):
+        """
+        Args:
+            url: URL of the JWKS document
+            ttl: Seconds before the key set is fetched again
+            min_refresh_interval: Minimum seconds between refreshes caused by an unknown kid
+            timeout: Timeout of the fetch in seconds
+        """
+        self.url = url
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self._jwks: List[Dict[str, Any]] = []
+        self._public_keys: Dict[str, Any] = {}
+        self._loaded_at = 0.0
+        self._attempted_at = 0.0
+        self._finished_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self.refreshes = 0
+        self.failures = 0
+
+    @property
+    def keys(self) -> List[Dict[str, Any]]:
+        """The raw JWKs, loading them first if needed."""
+        if not self._loaded_at:
+            self.refresh()
+        return list(self._jwks)
+
+    def _is_stale(self) -> bool:
+        return time.monotonic() - self._loaded_at > self.ttl
+
+    def refresh(self, coalesce: bool = False) -> None:
+        """
+        Fetch the key set and construct its public keys.
+
+        Args:
+            coalesce: Skip the fetch if another thread's fetch finished while this one waited for the lock
+
+        Raises:
+            Exception: If the fetch fails and no keys were loaded before
+        """
+        requested_at = time.monotonic()
+        with self._refresh_lock:
+            if coalesce and self._finished_at >= requested_at:
+                return
+            self._attempted_at = time.monotonic()
+            try:
+                self._fetch()
+            finally:
+                self._finished_at = time.monotonic()
+
+    def _fetch(self) -> None:
+        logger.debug(f"Fetching JWK from: {self.url}")
+        try:
+            with urllib.request.urlopen(self.url, timeout=self.timeout) as f:
+                response = f.read()
+            jwks = json.loads(response.decode('utf-8'))['keys']
+            public_keys = {key['kid']: jwk.construct(key) for key in jwks}
+        except Exception as e:
+            self.failures += 1
+            if not self._public_keys:
+                logger.error(f"Failed to fetch JWK keys: {str(e)}")
+                raise
+            logger.error(f"Failed to refresh JWK keys, keeping {len(self._public_keys)} cached keys: {str(e)}")
+            return
+
+        # Swap in whole dictionaries so readers never see a half-built set
+        self._jwks = jwks
+        self._public_keys = public_keys
+        self._loaded_at = time.monotonic()
+        self.refreshes += 1
+        logger.info(f"Loaded {len(public_keys)} JWK keys")
+
+    def get_key(self, kid: str):
+        """
+        Return the constructed public key for kid, or None if the key set doesn't have it.
+
+        Refreshes the key set if it has expired, or if kid is unknown. Either way at most once
+        per min_refresh_interval once keys are loaded.
+        """
+        can_refresh = time.monotonic() - self._attempted_at >= self.min_refresh_interval
+        if not self._loaded_at or (self._is_stale() and can_refresh):
+            self.refresh(coalesce=True)
+        key = self._public_keys.get(kid)
+        if key is not None:
+            return key
+
+        if time.monotonic() - self._attempted_at >= self.min_refresh_interval:
+            logger.info(f"Unknown kid {kid}, refreshing JWK keys")
+            self.refresh(coalesce=True)
+            key = self._public_keys.get(kid)
+        return key
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'url': self.url,
+            'kids': sorted(self._public_keys),
+            'age_seconds': time.monotonic() - self._loaded_at if self._loaded_at else None,
+            'ttl': self.ttl,
+            'refreshes': self.refreshes,
+            'failures': self.failures
+        }
+
+
+_caches: Dict[str, JWKSCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_jwks_cache(url: str, ttl: int = 3600, min_refresh_interval: int = 30, timeout: float = 5) -> JWKSCache:
+    """Return the shared JWKSCache for url, creating it on first use."""
+    cache = _caches.get(url)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(url)
+            if cache is None:
+                cache = JWKSCache(url, ttl, min_refresh_interval, timeout)
+                _caches[url] = cache
+    return cache
@@ -0,0 +1,87 @@
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+from extensions.logging import get_logger
+from flask_app.extensions.lru_cache import LRUCache
+from flask_app.extensions.embedding_cache import EmbeddingCache
+
+logger = get_logger(__name__)
+
+
+class MatchResultCache:
+    """
+    In-process cache of complete match results.
+
+    Entries are keyed by a hash of the normalized criteria, the search options and the mentors index
+    version. The version is bumped in the same transaction as any change to mentor embeddings or
+    eligibility, so once it moves every older entry simply stops being looked up and ages out of the
+    LRU. Empty results are cached too, with a shorter time to live.
+    """
+
+    def __init__(self, max_size: int = 500, ttl: int = 600, negative_ttl: int = 60):
+        """
+        Args:
+            max_size: Maximum number of results kept
+            ttl: Seconds a non-empty result is kept
+            negative_ttl: Seconds an empty result is kept
+        """
+        self.results = LRUCache(max_size=max_size, default_ttl=ttl or None)
+        self.negative_ttl = negative_ttl
+
+    @staticmethod
+    def _normalize_value(value: Any) -> Optional[str]:
+        if value is None:
+            return None
+        if isinstance(value, list):
+            value = ', '.join(str(item) for item in value)
+        text = EmbeddingCache.normalize(str(value))
+        return text or None
+
+    @classmethod
+    def cache_key(cls, criteria: Dict[str, Any], limit: int, excluded_keys, version: int,
+                  options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Return the cache key for a search.
+
+        Args:
+            criteria: Search criteria, key -> text
+            limit: Maximum number of results requested
+            excluded_keys: Keys excluded from the search
+            version: Current mentors index version
+            options: Any other search options that change the result (fusion, weights, ...)
+        """
+        normalized = {
+            key: text for key, text in ((key, cls._normalize_value(value)) for key, value in criteria.items())
+            if text is not None
+        }
+        payload = json.dumps({
+            'criteria': normalized,
+            'limit': limit,
+            'excluded_keys': sorted(excluded_keys or []),
+            'version': version,
+            'options': options or {}
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Return a copy of the cached result, or None on a miss."""
+        result = self.results.get(key)
+        if result is None:
+            return None
+        return [dict(match) for match in result]
+
+    def set(self, key: str, result: List[Dict[str, Any]]) -> None:
+        """Cache a result, empty results use the negative TTL."""
+        if result:
+            self.results.set(key, [dict(match) for match in result])
+        elif self.negative_ttl > 0:
+            self.results.set(key, [], ttl=self.negative_ttl)
+
+    def clear(self) -> int:
+        return self.results.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.results.stats()
+        stats['ttl'] = self.results.default_ttl
+        stats['negative_ttl'] = self.negative_ttl
+        return stats
@@ -0,0 +1,231 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo, available_timezones, ZoneInfoNotFoundError
+from sqlalchemy import select
+from extensions.logging import get_logger
+from flask_app.models.user import User
+from flask_app.extensions.profile_normalization import (
+    normalize_country, normalize_state_province, normalize_time_zone
+)
+
+logger = get_logger(__name__)
+
+
+def _text_list(value: Any, name: str) -> Optional[List[str]]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ValueError(f"{name} must be a string or a list of strings")
+    return [item.strip() for item in value if item.strip()] or None
+
+
+def _optional_int(value: Any, name: str) -> Optional[int]:
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer")
+
+
+def time_zones_within(time_zone: str, window_hours: float, at: Optional[datetime] = None) -> List[str]:
+    """
+    Return every IANA time zone whose current UTC offset is within window_hours of time_zone's.
+
+    Offsets depend on daylight saving time, so the list is worked out at search time and
+    matched against the stored zone names.
+    """
+    at = at or datetime.now(timezone.utc)
+    try:
+        reference = at.astimezone(ZoneInfo(time_zone)).utcoffset()
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown time zone: {time_zone}")
+
+    window = window_hours * 3600
+    zones = []
+    for name in available_timezones():
+        try:
+            offset = at.astimezone(ZoneInfo(name)).utcoffset()
+        except (ZoneInfoNotFoundError, ValueError):
+            continue
+        if abs((offset - reference).total_seconds()) <= window:
+            zones.append(name)
+    return sorted(zones)
+
+
+class MatchFilters:
+    """
+    Structured filters on mentor profiles.
+
+    Categorical and numeric profile fields are matched exactly instead of being embedded and ranked.
+    Every filter is a WHERE clause on a column Postgres generates from users.profile (see the filter_*
+    columns on User), pushed into the vector search as a semi-join on users. Locations are free text on
+    the forms, so "USA", "NC" or "Central Time Zone" are normalized the same way on both sides.
+    """
+
+    # Criteria keys turned into filters by from_criteria, in place of being embedded
+    CRITERIA_FIELDS = ('country', 'stateProvince', 'timeZone')
+
+    def __init__(self, countries: Optional[List[str]] = None, states: Optional[List[str]] = None,
+                 time_zone: Optional[str] = None, time_zone_window_hours: float = 0,
+                 subjects: Optional[List[str]] = None, min_years_teaching: Optional[int] = None,
+                 max_years_teaching: Optional[int] = None):
+        """
+        Args:
+            countries: Mentor country must be one of these (normalized, see normalize_country)
+            states: Mentor state/province must be one of these (normalized, see normalize_state_province)
+            time_zone: IANA time zone the mentor should be close to
+            time_zone_window_hours: Largest allowed difference in UTC offset from time_zone
+            subjects: Mentor primary subject must be one of these (case-insensitive)
+            min_years_teaching: Smallest allowed yearsTeaching
+            max_years_teaching: Largest allowed yearsTeaching
+        """
+        self.countries = countries
+        self.states = states
+        self.time_zone = time_zone
+        self.time_zone_window_hours = time_zone_window_hours
+        self.subjects = subjects
+        self.min_years_teaching = min_years_teaching
+        self.max_years_teaching = max_years_teaching
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'MatchFilters':
+        """
+        Build filters from a request body.
+
+        Example:
+        {
+            "country": "United States",
+            "stateProvince": ["North Carolina", "South Carolina"],
+            "timeZone": "America/New_York",
+            "timeZoneWindowHours": 2,
+            "subjects": ["Biology", "Chemistry"],
+            "minYearsTeaching": 5
+        }
+
+        timeZone may be an IANA name or a description such as "Eastern Time" (see normalize_time_zone).
+
+        Raises:
+            ValueError: If a filter has the wrong type or names a time zone that isn't recognized
+        """
+        data = data or {}
+        if not isinstance(data, dict):
+            raise ValueError("filters must be a JSON object")
+
+        time_zone = data.get('timeZone')
+        if time_zone is not None and not isinstance(time_zone, str):
+            raise ValueError("timeZone must be a string")
+        if time_zone and time_zone.strip():
+            # Fail on an unknown zone now rather than matching nobody later
+            normalized = normalize_time_zone(time_zone)
+            if normalized is None:
+                raise ValueError(f"Unknown time zone: {time_zone}")
+            time_zone = normalized
+        else:
+            time_zone = None
+        try:
+            window = float(data.get('timeZoneWindowHours') or 0)
+        except (TypeError, ValueError):
+            raise ValueError("timeZoneWindowHours must be a number")
+
+        return cls(
+            countries=_text_list(data.get('country'), 'country'),
+            states=_text_list(data.get('stateProvince'), 'stateProvince'),
+            time_zone=time_zone,
+            time_zone_window_hours=window,
+            subjects=_text_list(data.get('subjects'), 'subjects'),
+            min_years_teaching=_optional_int(data.get('minYearsTeaching'), 'minYearsTeaching'),
+            max_years_teaching=_optional_int(data.get('maxYearsTeaching'), 'maxYearsTeaching')
+        )
+
+    @classmethod
+    def from_criteria(cls, criteria: Dict[str, Any], time_zone_window_hours: float = 0,
+                      filters: Optional['MatchFilters'] = None) -> Tuple[Dict[str, Any], 'MatchFilters']:
+        """
+        Move the categorical fields of search criteria into filters.
+
+        Criteria come from profiles, so this never raises: a field that isn't usable as a filter (a
+        time zone that isn't recognized, a value that isn't text) stays in the criteria and is embedded.
+
+        Args:
+            criteria: Search criteria, key -> text
+            time_zone_window_hours: Window used for a timeZone criterion
+            filters: Explicit filters, these win over the criteria
+
+        Returns:
+            Tuple of (criteria that still need embedding, combined filters)
+        """
+        remaining = dict(criteria)
+        values = {}
+        for key in cls.CRITERIA_FIELDS:
+            value = criteria.get(key)
+            if isinstance(value, str) and value.strip():
+                values[key] = value
+                del remaining[key]
+            elif not value:
+                remaining.pop(key, None)
+
+        time_zone = normalize_time_zone(values['timeZone']) if 'timeZone' in values else None
+        if 'timeZone' in values and time_zone is None:
+            logger.debug(f"Time zone criterion not recognized, embedding it instead: {values['timeZone']}")
+            remaining['timeZone'] = values['timeZone']
+
+        from_criteria = cls(
+            countries=[values['country']] if 'country' in values else None,
+            states=[values['stateProvince']] if 'stateProvince' in values else None,
+            time_zone=time_zone,
+            time_zone_window_hours=time_zone_window_hours
+        )
+        if filters is None:
+            return remaining, from_criteria
+
+        combined = cls(**vars(filters))
+        combined.countries = filters.countries or from_criteria.countries
+        combined.states = filters.states or from_criteria.states
+        if not filters.time_zone:
+            combined.time_zone = from_criteria.time_zone
+            combined.time_zone_window_hours = from_criteria.time_zone_window_hours
+        return remaining, combined
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.countries or self.states or self.time_zone or self.subjects
+                    or self.min_years_teaching is not None or self.max_years_teaching is not None)
+
+    def clauses(self) -> list:
+        """WHERE clauses on the generated filter columns of users."""
+        clauses = []
+        if self.countries:
+            clauses.append(User.filter_country.in_(sorted({normalize_country(value) for value in self.countries})))
+        if self.states:
+            clauses.append(User.filter_state_province.in_(
+                sorted({normalize_state_province(value) for value in self.states})))
+        if self.time_zone:
+            # The generated column holds lowercased IANA names
+            zones = time_zones_within(self.time_zone, self.time_zone_window_hours)
+            clauses.append(User.filter_time_zone.in_([zone.lower() for zone in zones]))
+        if self.subjects:
+            clauses.append(User.filter_primary_subject.in_([value.lower() for value in self.subjects]))
+        if self.min_years_teaching is not None:
+            clauses.append(User.filter_years_teaching >= self.min_years_teaching)
+        if self.max_years_teaching is not None:
+            clauses.append(User.filter_years_teaching <= self.max_years_teaching)
+        return clauses
+
+    def user_ids_query(self):
+        """SELECT of the cognito_sub of every user the filters allow."""
+        return select(User.cognito_sub).where(*self.clauses())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Normalized filters, used in match result cache keys."""
+        return {
+            'countries': sorted({normalize_country(value) for value in self.countries or []}),
+            'states': sorted({normalize_state_province(value) for value in self.states or []}),
+            'time_zone': self.time_zone,
+            'time_zone_window_hours': self.time_zone_window_hours if self.time_zone else None,
+            'subjects': sorted(value.lower() for value in self.subjects or []),
+            'min_years_teaching': self.min_years_teaching,
+            'max_years_teaching': self.max_years_teaching
+        }
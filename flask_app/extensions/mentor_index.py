@@ -0,0 +1,377 @@
+import threading
+from typing import Dict, List, Optional, Set, Tuple, Iterable, Any
+import numpy as np
+from sqlalchemy import select
+from extensions.database import db
+from extensions.logging import get_logger
+from flask_app.config import MatchingConfig
+from flask_app.models.embedding import UserEmbedding
+
+logger = get_logger(__name__)
+
+# Number of set bits in every possible byte, used to popcount packed binary codes
+_POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint16)
+
+
+def binary_code(vector: np.ndarray) -> np.ndarray:
+    """Pack the sign bits of vector into uint8, same bits as pgvector's binary_quantize."""
+    return np.packbits(vector > 0)
+
+
+class _TypeIndex:
+    """
+    Contiguous, pre-normalized float32 matrix of the vectors for one embedding type, with a matching
+    matrix of packed binary codes for the Hamming prefilter.
+    """
+
+    def __init__(self, dimensions: int, capacity: int = 1024):
+        self.matrix = np.zeros((capacity, dimensions), dtype=np.float32)
+        self.codes = np.zeros((capacity, (dimensions + 7) // 8), dtype=np.uint8)
+        self.user_ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+
+    @property
+    def size(self) -> int:
+        return len(self.user_ids)
+
+    def upsert(self, user_id: str, vector: np.ndarray) -> None:
+        position = self.positions.get(user_id)
+        if position is None:
+            if self.size == self.matrix.shape[0]:
+                # Double the capacity so appends stay amortized O(1)
+                grown = np.zeros((self.matrix.shape[0] * 2, self.matrix.shape[1]), dtype=np.float32)
+                grown[:self.size] = self.matrix[:self.size]
+                self.matrix = grown
+                grown_codes = np.zeros((self.codes.shape[0] * 2, self.codes.shape[1]), dtype=np.uint8)
+                grown_codes[:self.size] = self.codes[:self.size]
+                self.codes = grown_codes
+            position = self.size
+            self.user_ids.append(user_id)
+            self.positions[user_id] = position
+        self.matrix[position] = vector
+        self.codes[position] = binary_code(vector)
+
+    def remove(self, user_id: str) -> None:
+        position = self.positions.pop(user_id, None)
+        if position is None:
+            return
+        # Move the last row into the freed slot
+        last = self.size - 1
+        if position != last:
+            moved_user_id = self.user_ids[last]
+            self.matrix[position] = self.matrix[last]
+            self.codes[position] = self.codes[last]
+            self.user_ids[position] = moved_user_id
+            self.positions[moved_user_id] = position
+        self.user_ids.pop()
+
+    def search(self, query: np.ndarray, limit: int, binary_candidates: Optional[int] = None,
+               user_ids: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Return (user_id, cosine_distance) pairs for the limit closest rows.
+
+        With binary_candidates, only the rows whose binary codes are closest to the query's by
+        Hamming distance are scored by cosine similarity. With user_ids, only those users' rows are
+        considered at all.
+        """
+        if self.size == 0 or limit <= 0:
+            return []
+
+        rows = None
+        if user_ids is not None:
+            rows = np.array([self.positions[user_id] for user_id in user_ids if user_id in self.positions],
+                            dtype=np.intp)
+            if not rows.size:
+                return []
+
+        count = self.size if rows is None else rows.size
+        if binary_candidates and binary_candidates < count:
+            codes = self.codes[:self.size] if rows is None else self.codes[rows]
+            hamming = _POPCOUNT[codes ^ binary_code(query)].sum(axis=1)
+            picked = np.argpartition(hamming, binary_candidates - 1)[:binary_candidates]
+            rows = picked if rows is None else rows[picked]
+
+        if rows is not None:
+            similarities = self.matrix[rows] @ query
+        else:
+            similarities = self.matrix[:self.size] @ query
+
+        limit = min(limit, similarities.shape[0])
+        if limit < similarities.shape[0]:
+            top = np.argpartition(-similarities, limit - 1)[:limit]
+        else:
+            top = np.arange(similarities.shape[0])
+        top = top[np.argsort(-similarities[top])]
+        if rows is not None:
+            return [(self.user_ids[rows[i]], float(1.0 - similarities[i])) for i in top]
+        return [(self.user_ids[i], float(1.0 - similarities[i])) for i in top]
+
+
+class MentorVectorIndex:
+    """
+    Optional in-process index of the embeddings of every searchable mentor.
+
+    Vectors are kept per embedding_type in contiguous float32 matrices, normalized up front so a
+    search is one matrix-vector product plus argpartition. The index is loaded in the background
+    at startup and kept current by refresh_users, which writers call after embeddings or mentor
+    eligibility change. Until it is ready, TheAlgorithm keeps using Postgres.
+
+    This class is implemented as a singleton to ensure only one instance exists.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(MentorVectorIndex, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        # Skip initialization if already initialized
+        if hasattr(self, '_initialized') and self._initialized:
+            return
+
+        config = MatchingConfig()
+        self.enabled = config.MATCHING_ANN_INDEX_ENABLED
+        self._types: Dict[str, _TypeIndex] = {}
+        self._lock = threading.RLock()
+        # Held from a refresh's database read until its rows are applied, so refreshes can't apply out of order
+        self._refresh_lock = threading.Lock()
+        self._ready = False
+        # While load() runs, users passed to refresh_users are recorded and refreshed again after the swap,
+        # the snapshot may have been read before their change was committed
+        self._loading = False
+        self._pending_refresh: Set[str] = set()
+
+        # Mark as initialized
+        self._initialized = True
+
+    @property
+    def is_ready(self) -> bool:
+        return self.enabled and self._ready
+
+    @staticmethod
+    def _normalize(vector: Iterable[float]) -> np.ndarray:
+        if hasattr(vector, 'to_numpy'):
+            # halfvec columns load as pgvector HalfVector objects
+            vector = vector.to_numpy()
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm > 0 else array
+
+    @staticmethod
+    def _eligible_rows_query():
+        """Embeddings of the mentors that searches are allowed to return."""
+        return (
+            select(UserEmbedding.user_id, UserEmbedding.embedding_type, UserEmbedding.vector_embedding)
+            .where(UserEmbedding.is_searchable == True)
+        )
+
+    def _upsert_locked(self, user_id: str, embedding_type: str, vector: Iterable[float]) -> None:
+        normalized = self._normalize(vector)
+        type_index = self._types.get(embedding_type)
+        if type_index is None:
+            type_index = _TypeIndex(normalized.shape[0])
+            self._types[embedding_type] = type_index
+        type_index.upsert(user_id, normalized)
+
+    def load(self) -> None:
+        """Load every searchable mentor embedding from the database. Must be called inside an app context."""
+        if not self.enabled:
+            return
+
+        logger.info('Loading mentor vector index')
+        with self._lock:
+            self._loading = True
+            self._pending_refresh = set()
+
+        try:
+            types: Dict[str, Dict[str, Any]] = {}
+            result = db.session.execute(self._eligible_rows_query().execution_options(yield_per=1000))
+            for row in result:
+                types.setdefault(row.embedding_type, {})[row.user_id] = row.vector_embedding
+            db.session.commit()
+
+            with self._lock:
+                self._types = {}
+                for embedding_type, vectors in types.items():
+                    for user_id, vector in vectors.items():
+                        self._upsert_locked(user_id, embedding_type, vector)
+                self._ready = True
+                pending = list(self._pending_refresh)
+        finally:
+            with self._lock:
+                self._loading = False
+                self._pending_refresh = set()
+
+        # Replay the changes that arrived while the snapshot was being read
+        if pending:
+            logger.info(f'Replaying {len(pending)} mentor vector index refreshes from during the load')
+            self.refresh_users(pending)
+
+        logger.info(f'Mentor vector index loaded: {self.stats()}')
+
+    def start_background_load(self, app) -> None:
+        """Load the index on a daemon thread so startup isn't blocked."""
+        if not self.enabled:
+            return
+
+        def run():
+            try:
+                with app.app_context():
+                    self.load()
+            except Exception as e:
+                logger.error(f'Error loading mentor vector index: {str(e)}')
+                logger.exception(e)
+
+        threading.Thread(target=run, name='mentor-vector-index-load', daemon=True).start()
+
+    def refresh_users(self, user_ids: List[str]) -> None:
+        """
+        Bring the index in line with the database for the given users.
+
+        Call this after embeddings are written or a mentor's eligibility changes. Users that are
+        no longer searchable are dropped from every type. Calls made while load() is running are
+        replayed once it finishes. Refreshes are serialized: each one reads the database after the
+        previous one was applied, so an older read never overwrites a newer one.
+
+        Args:
+            user_ids: cognito_sub IDs of the users that changed
+        """
+        if not self.enabled or not user_ids:
+            return
+
+        with self._lock:
+            if self._loading:
+                self._pending_refresh.update(user_ids)
+            if not self._ready:
+                return
+
+        with self._refresh_lock:
+            try:
+                rows = db.session.execute(
+                    self._eligible_rows_query().where(UserEmbedding.user_id.in_(list(user_ids)))
+                ).all()
+            except Exception as e:
+                logger.error(f'Error refreshing mentor vector index for {len(user_ids)} users: {str(e)}')
+                return
+
+            # Searches only wait for the swap, not for the read
+            with self._lock:
+                for type_index in self._types.values():
+                    for user_id in user_ids:
+                        type_index.remove(user_id)
+                for row in rows:
+                    self._upsert_locked(row.user_id, row.embedding_type, row.vector_embedding)
+
+        logger.debug(f'Mentor vector index refreshed for {len(user_ids)} users')
+
+    def search(self, embedding_type: str, vector: List[float], limit: int,
+               binary_candidates: Optional[int] = None,
+               user_ids: Optional[Set[str]] = None) -> List[Tuple[str, str, float]]:
+        """
+        Find the closest mentor embeddings.
+
+        Args:
+            embedding_type: The type of embedding to search for, or 'all' to search across all types
+            vector: The vector to compare against
+            limit: Maximum number of results to return
+            binary_candidates: Prefilter to this many rows per type by Hamming distance of the binary
+                               codes before the exact cosine rerank, None scores every row
+            user_ids: Only search these users, e.g. the ones structured match filters allow
+
+        Returns:
+            List of (user_id, embedding_type, cosine_distance) tuples sorted by distance
+        """
+        query = self._normalize(vector)
+        with self._lock:
+            if embedding_type != 'all':
+                type_index = self._types.get(embedding_type)
+                if type_index is None:
+                    return []
+                return [(user_id, embedding_type, distance)
+                        for user_id, distance in type_index.search(query, limit, binary_candidates, user_ids)]
+
+            matches = []
+            for name, type_index in self._types.items():
+                matches.extend((user_id, name, distance)
+                               for user_id, distance in type_index.search(query, limit, binary_candidates, user_ids))
+        matches.sort(key=lambda match: match[2])
+        return matches[:limit]
+
+    def distances(self, embedding_type: str, vector: List[float], user_ids: Iterable[str]) -> Dict[str, float]:
+        """
+        Exact cosine distances between vector and the given users' embeddings.
+
+        Args:
+            embedding_type: The type of embedding to compare, or 'all' to take the closest of any type
+            vector: The vector to compare against
+            user_ids: cognito_sub IDs to compute distances for
+
+        Returns:
+            Dictionary of user_id -> cosine distance, users without a matching embedding are left out
+        """
+        query = self._normalize(vector)
+        user_ids = list(user_ids)
+        result = {}
+        with self._lock:
+            if embedding_type == 'all':
+                type_indexes = list(self._types.values())
+            else:
+                type_indexes = [self._types[embedding_type]] if embedding_type in self._types else []
+
+            for type_index in type_indexes:
+                present = [user_id for user_id in user_ids if user_id in type_index.positions]
+                if not present:
+                    continue
+                similarities = type_index.matrix[[type_index.positions[user_id] for user_id in present]] @ query
+                for user_id, similarity in zip(present, similarities):
+                    distance = float(1.0 - similarity)
+                    if distance < result.get(user_id, float('inf')):
+                        result[user_id] = distance
+        return result
+
+    def matrices(self, embedding_types: Optional[List[str]] = None) -> Dict[str, Tuple[List[str], np.ndarray]]:
+        """
+        Normalized vector matrices of the searchable mentors, one per embedding type.
+
+        Copied from memory when the index is ready, otherwise read from the database. Must be called
+        inside an app context.
+
+        Args:
+            embedding_types: Types to return, None for every type
+
+        Returns:
+            Dictionary of embedding_type -> (user_ids, float32 matrix with one row per user_id)
+        """
+        if self.is_ready:
+            with self._lock:
+                return {
+                    name: (list(type_index.user_ids), type_index.matrix[:type_index.size].copy())
+                    for name, type_index in self._types.items()
+                    if embedding_types is None or name in embedding_types
+                }
+
+        query = self._eligible_rows_query()
+        if embedding_types is not None:
+            query = query.where(UserEmbedding.embedding_type.in_(list(embedding_types)))
+        types: Dict[str, _TypeIndex] = {}
+        for row in db.session.execute(query.execution_options(yield_per=1000)):
+            normalized = self._normalize(row.vector_embedding)
+            if row.embedding_type not in types:
+                types[row.embedding_type] = _TypeIndex(normalized.shape[0])
+            types[row.embedding_type].upsert(row.user_id, normalized)
+        db.session.commit()
+        return {name: (type_index.user_ids, type_index.matrix[:type_index.size]) for name, type_index in types.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        """Return readiness and the number of vectors held per type."""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'ready': self._ready,
+                'types': {name: type_index.size for name, type_index in self._types.items()}
+            }
+
+
+# Global instance
+mentor_vector_index = MentorVectorIndex()
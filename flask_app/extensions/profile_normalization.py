@@ -0,0 +1,136 @@
+import re
+from functools import lru_cache
+from typing import Dict, Optional
+from zoneinfo import available_timezones
+
+# Location fields are free text on the application forms. Each one is normalized the same way in Python
+# (for filter values) and in SQL (for the generated filter columns on users), so the two always compare
+# equal. Patterns only use regex syntax Postgres (~*) and Python (re.I) read the same way.
+
+# Runs of spaces, periods and commas become one space: "U.S.A." -> "u s a", "Washington, D.C." -> "washington d c"
+_SEPARATORS = '[ .,]+'
+
+COUNTRY_ALIASES: Dict[str, str] = {
+    'us': 'united states',
+    'u s': 'united states',
+    'usa': 'united states',
+    'u s a': 'united states',
+    'united states of america': 'united states',
+    'the united states': 'united states',
+    'uk': 'united kingdom',
+    'u k': 'united kingdom',
+    'great britain': 'united kingdom',
+}
+
+STATE_PROVINCE_ALIASES: Dict[str, str] = {
+    'al': 'alabama', 'ak': 'alaska', 'az': 'arizona', 'ar': 'arkansas', 'ca': 'california',
+    'co': 'colorado', 'ct': 'connecticut', 'de': 'delaware', 'fl': 'florida', 'ga': 'georgia',
+    'hi': 'hawaii', 'id': 'idaho', 'il': 'illinois', 'in': 'indiana', 'ia': 'iowa',
+    'ks': 'kansas', 'ky': 'kentucky', 'la': 'louisiana', 'me': 'maine', 'md': 'maryland',
+    'ma': 'massachusetts', 'mi': 'michigan', 'mn': 'minnesota', 'ms': 'mississippi', 'mo': 'missouri',
+    'mt': 'montana', 'ne': 'nebraska', 'nv': 'nevada', 'nh': 'new hampshire', 'nj': 'new jersey',
+    'nm': 'new mexico', 'ny': 'new york', 'nc': 'north carolina', 'nd': 'north dakota', 'oh': 'ohio',
+    'ok': 'oklahoma', 'or': 'oregon', 'pa': 'pennsylvania', 'ri': 'rhode island', 'sc': 'south carolina',
+    'sd': 'south dakota', 'tn': 'tennessee', 'tx': 'texas', 'ut': 'utah', 'vt': 'vermont',
+    'va': 'virginia', 'wa': 'washington', 'wv': 'west virginia', 'wi': 'wisconsin', 'wy': 'wyoming',
+    'dc': 'district of columbia', 'd c': 'district of columbia', 'washington d c': 'district of columbia',
+    'washington dc': 'district of columbia',
+    'ab': 'alberta', 'bc': 'british columbia', 'mb': 'manitoba', 'nb': 'new brunswick',
+    'nl': 'newfoundland and labrador', 'ns': 'nova scotia', 'nt': 'northwest territories', 'nu': 'nunavut',
+    'on': 'ontario', 'pe': 'prince edward island', 'qc': 'quebec', 'sk': 'saskatchewan', 'yt': 'yukon',
+}
+
+# Already an IANA name, e.g. "America/Chicago" or "Etc/GMT+7"
+_IANA_PATTERN = '^[a-z_]+(/[a-z0-9_+-]+)+$'
+
+
+def _abbreviation(letters: str) -> str:
+    """Pattern for a zone abbreviation standing on its own, e.g. EST, EDT and ET for 'e'."""
+    return f'(^|[^a-z]){letters}[sd]?t([^a-z]|$)'
+
+
+# Free-text zone descriptions, checked in order. Longer names come before the US zones they contain
+TIME_ZONE_PATTERNS = (
+    ('central europe|' + _abbreviation('ce'), 'Europe/Paris'),
+    ('eastern europe|' + _abbreviation('ee'), 'Europe/Athens'),
+    ('newfoundland|' + _abbreviation('n'), 'America/St_Johns'),
+    ('atlantic|' + _abbreviation('a'), 'America/Halifax'),
+    ('eastern|' + _abbreviation('e'), 'America/New_York'),
+    ('central|' + _abbreviation('c'), 'America/Chicago'),
+    ('arizona', 'America/Phoenix'),
+    ('mountain|' + _abbreviation('m'), 'America/Denver'),
+    ('pacific|' + _abbreviation('p'), 'America/Los_Angeles'),
+    ('alaska|' + _abbreviation('ak'), 'America/Anchorage'),
+    ('hawaii|' + _abbreviation('ha?'), 'Pacific/Honolulu'),
+    # Whole-hour UTC offsets, Etc/GMT names have the sign inverted
+    *((f'(utc|gmt) ?-0?{hours}([^0-9]|$)', f'Etc/GMT+{hours}') for hours in range(12, 0, -1)),
+    *((f'(utc|gmt) ?[+]0?{hours}([^0-9]|$)', f'Etc/GMT-{hours}') for hours in range(14, 0, -1)),
+    ('^(utc|gmt|zulu|z)( ?[+-]0?0)?$', 'Etc/UTC'),
+)
+
+
+@lru_cache(maxsize=1)
+def _time_zone_names() -> Dict[str, str]:
+    return {name.lower(): name for name in available_timezones()}
+
+
+def normalize_text(value: str) -> str:
+    return re.sub(_SEPARATORS, ' ', value).strip(' ').lower()
+
+
+def normalize_country(value: str) -> str:
+    normalized = normalize_text(value)
+    return COUNTRY_ALIASES.get(normalized, normalized)
+
+
+def normalize_state_province(value: str) -> str:
+    normalized = normalize_text(value)
+    return STATE_PROVINCE_ALIASES.get(normalized, normalized)
+
+
+def normalize_time_zone(value: str) -> Optional[str]:
+    """
+    Map a free-text time zone ("Central Time Zone", "EST", "GMT-7") to its IANA name.
+
+    Returns:
+        The IANA name, or None if the text isn't recognized
+    """
+    value = value.strip(' ')
+    if re.search(_IANA_PATTERN, value, re.I):
+        return _time_zone_names().get(value.lower())
+    for pattern, zone in TIME_ZONE_PATTERNS:
+        if re.search(pattern, value, re.I):
+            return zone
+    return None
+
+
+def _normalized_text_sql(column_sql: str) -> str:
+    return f"lower(btrim(regexp_replace({column_sql}, '{_SEPARATORS}', ' ', 'g')))"
+
+
+def _aliases_sql(column_sql: str, aliases: Dict[str, str]) -> str:
+    normalized = _normalized_text_sql(column_sql)
+    whens = ' '.join(f"WHEN '{alias}' THEN '{name}'" for alias, name in aliases.items())
+    return f"CASE {normalized} {whens} ELSE {normalized} END"
+
+
+def country_sql(column_sql: str) -> str:
+    """SQL expression equal to normalize_country of column_sql."""
+    return _aliases_sql(column_sql, COUNTRY_ALIASES)
+
+
+def state_province_sql(column_sql: str) -> str:
+    """SQL expression equal to normalize_state_province of column_sql."""
+    return _aliases_sql(column_sql, STATE_PROVINCE_ALIASES)
+
+
+def time_zone_sql(column_sql: str) -> str:
+    """
+    SQL expression with the lowercased IANA name normalize_time_zone finds for column_sql, NULL if none.
+
+    IANA names are lowercased as is, names that don't exist simply never match a filter.
+    """
+    value = f"btrim({column_sql})"
+    whens = [f"WHEN {value} ~* '{_IANA_PATTERN}' THEN lower({value})"]
+    whens.extend(f"WHEN {value} ~* '{pattern}' THEN '{zone.lower()}'" for pattern, zone in TIME_ZONE_PATTERNS)
+    return f"CASE {' '.join(whens)} END"
@@ -0,0 +1,74 @@
+import hashlib
+import time
+from typing import Any, Dict, Optional
+from flask_app.extensions.lru_cache import LRUCache
+
+
+class VerifiedTokenCache:
+    """
+    Claims of tokens that already passed verification, keyed by the SHA-256 of the token.
+
+    Clients send the same access token until it expires, so after the first request its signature
+    and claims don't need checking again. Each entry lives until the token's exp. Revoked tokens are
+    remembered until their exp too, so they are rejected even though their signature is still
+    valid. Both maps are bounded, thread-safe LRU caches; only digests are stored, never tokens.
+    """
+
+    def __init__(self, max_size: int = 10000, max_revoked: int = 10000):
+        """
+        Args:
+            max_size: Maximum number of verified tokens kept
+            max_revoked: Maximum number of revoked tokens remembered
+        """
+        self.tokens = LRUCache(max_size=max_size)
+        self.revoked = LRUCache(max_size=max_revoked)
+
+    @staticmethod
+    def digest(token: str) -> str:
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Return the cached claims of token, or None if it isn't cached or has expired."""
+        digest = self.digest(token)
+        claims = self.tokens.get(digest)
+        if claims is None:
+            return None
+        # The LRU expires entries on the monotonic clock, exp is wall clock time
+        if time.time() >= claims['exp']:
+            self.tokens.pop(digest)
+            return None
+        return claims
+
+    def set(self, token: str, claims: Dict[str, Any]) -> None:
+        """Cache the claims of a verified token until it expires."""
+        ttl = claims['exp'] - time.time()
+        if ttl > 0:
+            self.tokens.set(self.digest(token), claims, ttl=ttl)
+
+    def is_revoked(self, token: str) -> bool:
+        return self.revoked.get(self.digest(token)) is not None
+
+    def revoke(self, token: str, exp: Optional[float] = None) -> None:
+        """
+        Drop token from the cache and reject it from now on.
+
+        Args:
+            token: The token to revoke
+            exp: The token's exp claim, taken from the cached claims if not given
+        """
+        digest = self.digest(token)
+        claims = self.tokens.pop(digest)
+        if exp is None and claims:
+            exp = claims['exp']
+        ttl = exp - time.time() if exp is not None else None
+        if ttl is None or ttl > 0:
+            self.revoked.set(digest, True, ttl=ttl)
+
+    def clear(self) -> int:
+        return self.tokens.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'tokens': self.tokens.stats(),
+            'revoked': len(self.revoked)
+        }
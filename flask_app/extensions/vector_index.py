@@ -0,0 +1,256 @@
+import hashlib
+import math
+import re
+import time
+from typing import Dict, List, Optional, Any
+from sqlalchemy import text, func
+from extensions.database import db
+from extensions.logging import get_logger
+from flask_app.config import MatchingConfig
+from flask_app.models.embedding import UserEmbedding
+from flask_app.models.vector_index import VectorIndexBuild
+
+logger = get_logger(__name__)
+
+GLOBAL_INDEX_NAME = 'user_embeddings_vector_idx'
+GLOBAL_BINARY_INDEX_NAME = 'user_embeddings_bits_idx'
+
+
+class VectorIndexManager:
+    """
+    Builds and tracks the pgvector indexes on user_embeddings.
+
+    Indexes are either HNSW or a right-sized ivfflat, built across all embedding types or as one
+    index per embedding_type. Every index is partial on is_searchable so mentor searches are a pure
+    index scan. With MATCHING_BINARY_RERANK on, a matching HNSW bit_hamming_ops index over the
+    binary codes serves the Hamming prefilter. Every build is recorded in vector_index_builds together with
+    the parameters it used. The per-query knobs (hnsw.ef_search / ivfflat.probes) are applied to
+    the current transaction with apply_search_settings.
+
+    This class is implemented as a singleton to ensure only one instance exists.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(VectorIndexManager, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        # Skip initialization if already initialized
+        if hasattr(self, '_initialized') and self._initialized:
+            return
+
+        config = MatchingConfig()
+        self.method = config.VECTOR_INDEX_METHOD
+        self.per_type = config.VECTOR_INDEX_PER_TYPE
+        self.hnsw_m = config.HNSW_M
+        self.hnsw_ef_construction = config.HNSW_EF_CONSTRUCTION
+        self.default_ef_search = config.HNSW_EF_SEARCH
+        self.default_probes = config.IVFFLAT_PROBES
+        self.filtered_ef_search = config.HNSW_FILTERED_EF_SEARCH
+        self.binary_rerank = config.MATCHING_BINARY_RERANK
+        self._iterative_scan = None
+
+        # Mark as initialized
+        self._initialized = True
+
+    @staticmethod
+    def ivfflat_lists(row_count: int) -> int:
+        """pgvector's sizing guidance: rows / 1000 up to 1M rows, sqrt(rows) above that."""
+        if row_count <= 1000000:
+            return max(row_count // 1000, 1)
+        return int(math.sqrt(row_count))
+
+    @staticmethod
+    def index_name(embedding_type: Optional[str] = None, binary: bool = False) -> str:
+        """Return the managed index name for embedding_type, or the global index name."""
+        if embedding_type is None:
+            return GLOBAL_BINARY_INDEX_NAME if binary else GLOBAL_INDEX_NAME
+        # Postgres identifiers are limited to 63 characters, the hash keeps truncated names unique
+        slug = re.sub(r'[^a-z0-9]+', '_', embedding_type.lower()).strip('_')[:30]
+        digest = hashlib.sha1(embedding_type.encode('utf-8')).hexdigest()[:8]
+        return f"user_embeddings_{'bits' if binary else 'vec'}_{slug}_{digest}_idx"
+
+    def _operator_class(self) -> str:
+        return 'halfvec_cosine_ops' if UserEmbedding.STORAGE_FORMAT == 'halfvec' else 'vector_cosine_ops'
+
+    @staticmethod
+    def _binary_expression() -> str:
+        """Indexed binary code, written exactly like UserEmbedding.binary_code() so the planner can use it."""
+        if UserEmbedding.BINARY_PREFILTER:
+            return 'vector_bits'
+        return f'(binary_quantize(vector_embedding)::bit({UserEmbedding.N_DIMENSIONS}))'
+
+    def _index_predicate(self, embedding_type: Optional[str]) -> str:
+        """WHERE clause of the partial index. Only searchable rows are indexed, same as the search filter."""
+        if embedding_type is None:
+            return 'is_searchable'
+        return f"is_searchable AND embedding_type = '{embedding_type.replace(chr(39), chr(39) * 2)}'"
+
+    def _build_parameters(self, method: str, row_count: int) -> Dict[str, int]:
+        if method == 'hnsw':
+            return {'m': self.hnsw_m, 'ef_construction': self.hnsw_ef_construction}
+        return {'lists': self.ivfflat_lists(row_count)}
+
+    def _create_index_sql(self, name: str, method: str, embedding_type: Optional[str], parameters: Dict[str, int],
+                          binary: bool = False) -> str:
+        with_clause = ', '.join(f'{key} = {value}' for key, value in parameters.items())
+        if binary:
+            column = f'{self._binary_expression()} bit_hamming_ops'
+        else:
+            column = f'vector_embedding {self._operator_class()}'
+        return (
+            f'CREATE INDEX CONCURRENTLY {name} ON user_embeddings '
+            f'USING {method} ({column}) WITH ({with_clause}) WHERE {self._index_predicate(embedding_type)}'
+        )
+
+    def _build_index(self, method: str, embedding_type: Optional[str], row_count: int,
+                     binary: bool = False) -> VectorIndexBuild:
+        """
+        (Re)build a single index without blocking writes.
+
+        The new index is built concurrently under a temporary name and swapped in afterwards, so
+        searches keep using the old index until the new one is ready. Binary indexes are always HNSW
+        over the binary codes with bit_hamming_ops.
+        """
+        if binary:
+            method = 'hnsw'
+        name = self.index_name(embedding_type, binary)
+        temp_name = f'{name[:59]}_new'
+        parameters = self._build_parameters(method, row_count)
+        create_sql = self._create_index_sql(temp_name, method, embedding_type, parameters, binary)
+
+        logger.info(f'Building {method} index {name} with {parameters} over {row_count} rows')
+        started = time.monotonic()
+        # CONCURRENTLY can't run inside a transaction block
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            connection.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS {temp_name}'))
+            connection.execute(text(create_sql))
+            connection.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS {name}'))
+            connection.execute(text(f'ALTER INDEX {temp_name} RENAME TO {name}'))
+        build_seconds = time.monotonic() - started
+
+        build = VectorIndexBuild.query.filter_by(index_name=name).first()
+        if not build:
+            build = VectorIndexBuild(index_name=name)
+            db.session.add(build)
+        build.method = method
+        build.embedding_type = embedding_type
+        build.parameters = parameters
+        build.row_count = row_count
+        build.build_seconds = build_seconds
+        build.built_at = db.func.now()
+        db.session.commit()
+
+        logger.info(f'Built index {name} in {build_seconds:.1f}s')
+        return build
+
+    def _drop_index(self, name: str) -> None:
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            connection.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS {name}'))
+        VectorIndexBuild.query.filter_by(index_name=name).delete()
+        db.session.commit()
+        logger.info(f'Dropped index {name}')
+
+    def drop_indexes(self) -> None:
+        """Drop every managed index, e.g. before the vector column type changes."""
+        for build in VectorIndexBuild.query.all():
+            self._drop_index(build.index_name)
+
+    def build_indexes(self, method: Optional[str] = None, per_type: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """
+        Build the managed vector indexes and drop managed indexes that no longer apply. With
+        MATCHING_BINARY_RERANK on, the binary code indexes for the Hamming prefilter are built too.
+
+        Args:
+            method: 'hnsw' or 'ivfflat' (default: VECTOR_INDEX_METHOD)
+            per_type: Build one partial index per embedding_type instead of one global index
+                      (default: VECTOR_INDEX_PER_TYPE)
+
+        Returns:
+            List of build records as dictionaries
+        """
+        method = method or self.method
+        per_type = self.per_type if per_type is None else per_type
+        if method not in ('hnsw', 'ivfflat'):
+            raise ValueError(f"Unsupported vector index method: {method}")
+
+        if per_type:
+            rows = (
+                db.session.query(UserEmbedding.embedding_type, func.count(UserEmbedding.id))
+                .filter(UserEmbedding.is_searchable == True)
+                .group_by(UserEmbedding.embedding_type)
+                .all()
+            )
+            targets = [(embedding_type, count) for embedding_type, count in rows]
+        else:
+            targets = [(None, db.session.query(func.count(UserEmbedding.id))
+                        .filter(UserEmbedding.is_searchable == True).scalar())]
+        db.session.commit()
+
+        wanted = {self.index_name(embedding_type) for embedding_type, _ in targets}
+        if self.binary_rerank:
+            wanted |= {self.index_name(embedding_type, binary=True) for embedding_type, _ in targets}
+        for build in VectorIndexBuild.query.all():
+            if build.index_name not in wanted:
+                self._drop_index(build.index_name)
+
+        builds = [self._build_index(method, embedding_type, count) for embedding_type, count in targets]
+        if self.binary_rerank:
+            # Without it the Hamming prefilter would scan and sort every searchable row
+            builds.extend(self._build_index(method, embedding_type, count, binary=True)
+                          for embedding_type, count in targets)
+        return [build.to_dict() for build in builds]
+
+    def list_builds(self) -> List[Dict[str, Any]]:
+        """Return the recorded index builds."""
+        return [build.to_dict() for build in VectorIndexBuild.query.order_by(VectorIndexBuild.index_name).all()]
+
+    def supports_iterative_scan(self, session) -> bool:
+        """Whether the installed pgvector has iterative index scans (0.8.0 and later). Checked once."""
+        if self._iterative_scan is None:
+            version = session.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).scalar()
+            parts = tuple(int(part) for part in re.findall(r'\d+', version or '')[:3])
+            self._iterative_scan = parts >= (0, 8, 0)
+            logger.info(f"pgvector {version}, iterative index scans {'on' if self._iterative_scan else 'off'}")
+        return self._iterative_scan
+
+    def apply_search_settings(self, session, ef_search: Optional[int] = None, probes: Optional[int] = None,
+                              limit: Optional[int] = None, filtered: bool = False) -> None:
+        """
+        Apply the per-query recall/latency knobs to the current transaction (same as SET LOCAL).
+
+        Args:
+            session: SQLAlchemy session the search will run on
+            ef_search: HNSW candidate list size (default: HNSW_EF_SEARCH)
+            probes: Number of ivfflat lists to scan (default: IVFFLAT_PROBES)
+            limit: Number of results the search asks for. HNSW can't return more than ef_search rows,
+                   so ef_search is raised to at least limit.
+            filtered: The search has WHERE clauses beyond the index predicate. ef_search is raised to at
+                      least HNSW_FILTERED_EF_SEARCH and iterative scans keep reading the index until
+                      enough rows pass the filters, where pgvector supports them.
+        """
+        if self.method == 'hnsw' or ef_search is not None:
+            ef_search = ef_search or self.default_ef_search
+            if limit:
+                ef_search = max(ef_search, limit)
+            if filtered:
+                ef_search = max(ef_search, self.filtered_ef_search)
+            session.execute(text("SELECT set_config('hnsw.ef_search', :value, true)"),
+                            {'value': str(ef_search)})
+        if self.method == 'ivfflat' or probes is not None:
+            probes = probes or self.default_probes
+            session.execute(text("SELECT set_config('ivfflat.probes', :value, true)"),
+                            {'value': str(probes)})
+        if filtered and self.supports_iterative_scan(session):
+            if self.method == 'hnsw':
+                session.execute(text("SELECT set_config('hnsw.iterative_scan', 'strict_order', true)"))
+            else:
+                # ivfflat only supports relaxed order, results are sorted again after the search anyway
+                session.execute(text("SELECT set_config('ivfflat.iterative_scan', 'relaxed_order', true)"))
+
+
+# Global instance
+vector_index_manager = VectorIndexManager()
@@ -6,7 +6,10 @@ Run this after installing the pgvector extension on your PostgreSQL database
 from flask import current_app
 from extensions.database import db
 from models.embedding import UserEmbedding
+from flask_app.models.user import User
+from flask_app.extensions.vector_index import vector_index_manager
 from sqlalchemy import text
+import hashlib
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,26 +20,188 @@ def setup_pgvector():
         # Create the extension
         db.session.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
         
-        # Create index for cosine similarity searches
-        # This assumes the table structure has been updated to use the vector type
-        db.session.execute(text("""
-            CREATE INDEX IF NOT EXISTS user_embeddings_vector_idx 
-            ON user_embeddings 
-            USING ivfflat (vector_embedding vector_cosine_ops)
-            WITH (lists = 100)
-        """))
-        
         db.session.commit()
-        logger.info("pgvector extension and indexes created successfully")
+
+        # Build the managed indexes for cosine similarity searches (HNSW or right-sized ivfflat,
+        # see VECTOR_INDEX_METHOD / VECTOR_INDEX_PER_TYPE). Build parameters are recorded in vector_index_builds.
+        # This assumes the table structure has been updated to use the vector type
+        builds = vector_index_manager.build_indexes()
+        logger.info(f"pgvector extension and indexes created successfully: {builds}")
         return True
     except Exception as e:
         db.session.rollback()
         logger.error(f"Failed to set up pgvector: {e}")
         return False
 
+def add_eligibility_columns():
+    """Add the denormalized mentor eligibility and content hash columns to user_embeddings and backfill eligibility"""
+    try:
+        db.session.execute(text(
+            "ALTER TABLE user_embeddings "
+            "ADD COLUMN IF NOT EXISTS is_mentor BOOLEAN NOT NULL DEFAULT false, "
+            "ADD COLUMN IF NOT EXISTS is_searchable BOOLEAN NOT NULL DEFAULT false, "
+            "ADD COLUMN IF NOT EXISTS application_status VARCHAR(20), "
+            "ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)"
+        ))
+        UserEmbedding.sync_eligibility()
+        db.session.commit()
+        logger.info("user_embeddings eligibility columns added and backfilled")
+        return True
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to add eligibility columns: {e}")
+        return False
+
+def add_unique_embedding_constraint():
+    """Replace the (user_id, embedding_type) index with the unique constraint bulk upserts conflict on"""
+    try:
+        # Keep the newest row of any duplicates so the constraint can be created. Rows without a
+        # created_at sort last, a row comparison with NULL would leave them in place
+        db.session.execute(text(
+            "DELETE FROM user_embeddings WHERE id IN ("
+            "SELECT id FROM (SELECT id, ROW_NUMBER() OVER ("
+            "PARTITION BY user_id, embedding_type ORDER BY created_at DESC NULLS LAST, id DESC"
+            ") AS position FROM user_embeddings) ranked WHERE position > 1)"
+        ))
+        db.session.execute(text("DROP INDEX IF EXISTS ix_user_embedding_type"))
+        db.session.execute(text(
+            "DO $$ BEGIN "
+            "ALTER TABLE user_embeddings ADD CONSTRAINT uq_user_embedding_type UNIQUE (user_id, embedding_type); "
+            "EXCEPTION WHEN duplicate_table OR duplicate_object THEN NULL; END $$"
+        ))
+        db.session.commit()
+        logger.info("user_embeddings unique constraint created")
+        return True
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to add unique embedding constraint: {e}")
+        return False
+
+def add_profile_filter_columns():
+    """
+    Add the generated columns match filters use to users, each with its own index.
+
+    A generated column's expression can't be changed in place, so each column is tagged with a hash of
+    its expression (as the column comment) and dropped and added again when the model's expression changes.
+    """
+    try:
+        for column in User.__table__.columns:
+            if column.computed is None:
+                continue
+            expression = str(column.computed.sqltext)
+            expression_hash = hashlib.sha256(expression.encode('utf-8')).hexdigest()[:16]
+            current_hash = db.session.execute(text(
+                "SELECT col_description(attrelid, attnum) FROM pg_attribute "
+                "WHERE attrelid = 'users'::regclass AND attname = :name AND NOT attisdropped"
+            ), {'name': column.name}).scalar()
+            if current_hash == expression_hash:
+                continue
+
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            db.session.execute(text(f"ALTER TABLE users DROP COLUMN IF EXISTS {column.name}"))
+            db.session.execute(text(
+                f"ALTER TABLE users ADD COLUMN {column.name} {column_type} "
+                f"GENERATED ALWAYS AS ({expression}) STORED"
+            ))
+            db.session.execute(text(f"COMMENT ON COLUMN users.{column.name} IS '{expression_hash}'"))
+            db.session.execute(text(f"CREATE INDEX IF NOT EXISTS ix_users_{column.name} ON users ({column.name})"))
+            logger.info(f"users.{column.name} generated with expression {expression_hash}")
+        db.session.commit()
+        logger.info("users profile filter columns added")
+        return True
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to add profile filter columns: {e}")
+        return False
+
+def _column_type(table, column):
+    """Return the formatted type of a column, e.g. 'vector(1536)', or None if it doesn't exist"""
+    return db.session.execute(text(
+        "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+        "WHERE attrelid = to_regclass(:table) AND attname = :column AND NOT attisdropped"
+    ), {'table': table, 'column': column}).scalar()
+
+def migrate_storage_format():
+    """
+    Rewrite user_embeddings to the configured dimensions and storage format (see EmbeddingStorageConfig).
+
+    text-embedding-3 vectors can be shortened by keeping the first N dimensions and re-normalizing, which
+    is what the API's dimensions parameter does, so existing rows are converted in place without calling
+    OpenAI. Growing the dimensions needs a re-embed and is refused.
+    """
+    dimensions = UserEmbedding.N_DIMENSIONS
+    storage_format = UserEmbedding.STORAGE_FORMAT
+    target_type = f"{storage_format}({dimensions})"
+    try:
+        current_type = _column_type('user_embeddings', 'vector_embedding')
+        has_bits = _column_type('user_embeddings', 'vector_bits') is not None
+        type_changes = current_type != target_type
+        bits_change = has_bits != UserEmbedding.BINARY_PREFILTER or (has_bits and type_changes)
+        if not type_changes and not bits_change:
+            logger.info(f"user_embeddings already stored as {target_type}")
+            return True
+
+        if type_changes:
+            current_dimensions = int(current_type.split('(')[1].rstrip(')'))
+            if dimensions > current_dimensions:
+                logger.error(f"Can't grow embeddings from {current_dimensions} to {dimensions} dimensions, "
+                             f"they have to be regenerated")
+                return False
+
+        # The managed indexes are tied to the column type, setup_pgvector rebuilds them afterwards
+        vector_index_manager.drop_indexes()
+        db.session.execute(text("ALTER TABLE user_embeddings DROP COLUMN IF EXISTS vector_bits"))
+
+        if type_changes:
+            logger.info(f"Rewriting user_embeddings from {current_type} to {target_type}")
+            db.session.execute(text(
+                f"ALTER TABLE user_embeddings ALTER COLUMN vector_embedding TYPE {target_type} "
+                f"USING l2_normalize(subvector(vector_embedding::vector, 1, {dimensions}))::{target_type}"
+            ))
+
+            # Cached vectors have the old size, the table is only a cache so it's emptied
+            if _column_type('embedding_cache', 'vector_embedding') != f"vector({dimensions})":
+                db.session.execute(text("TRUNCATE embedding_cache"))
+                db.session.execute(text(
+                    f"ALTER TABLE embedding_cache ALTER COLUMN vector_embedding TYPE vector({dimensions})"
+                ))
+
+        if UserEmbedding.BINARY_PREFILTER:
+            db.session.execute(text(
+                f"ALTER TABLE user_embeddings ADD COLUMN vector_bits bit({dimensions}) "
+                f"GENERATED ALWAYS AS (binary_quantize(vector_embedding)::bit({dimensions})) STORED"
+            ))
+
+        db.session.commit()
+        logger.info(f"user_embeddings migrated to {target_type}, binary prefilter={UserEmbedding.BINARY_PREFILTER}")
+        return True
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to migrate embedding storage format: {e}")
+        return False
+
 def run_migration():
     """Run the full migration process"""
     with current_app.app_context():
+        # Searches and the partial vector indexes filter on is_searchable
+        if not add_eligibility_columns():
+            logger.error("Failed to add eligibility columns, aborting migration")
+            return False
+
+        if not add_unique_embedding_constraint():
+            logger.error("Failed to add unique embedding constraint, aborting migration")
+            return False
+
+        # Structured match filters are WHERE clauses on columns generated from users.profile
+        if not add_profile_filter_columns():
+            logger.error("Failed to add profile filter columns, aborting migration")
+            return False
+
+        # Compact the vectors to the configured dimensions / precision before the indexes are built
+        if not migrate_storage_format():
+            logger.error("Failed to migrate embedding storage format, aborting migration")
+            return False
+
         # Set up pgvector extension
         if not setup_pgvector():
             logger.error("Failed to set up pgvector extension, aborting migration")
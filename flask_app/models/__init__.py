@@ -6,11 +6,20 @@ from flask_app.models.user import User, UserType, ApplicationStatus
 from flask_app.models.mentorship_session import MentorshipSession
 from flask_app.models.credits import CreditRedemption, CreditTransfer
 from flask_app.models.embedding import UserEmbedding
+from flask_app.models.embedding_cache import EmbeddingCacheEntry
+from flask_app.models.vector_index import VectorIndexBuild
+from flask_app.models.index_version import IndexVersion
+from flask_app.models.embedding_job import EmbeddingJob, EmbeddingJobStatus
 
 __all__ = [
     'User',
     'UserType',
     'UserEmbedding',
+    'EmbeddingCacheEntry',
+    'VectorIndexBuild',
+    'IndexVersion',
+    'EmbeddingJob',
+    'EmbeddingJobStatus',
     'ApplicationStatus',
     'MentorshipSession',
     'CreditRedemption',
@@ -2,39 +2,120 @@ from extensions.database import db
 from extensions.logging import get_logger
 from datetime import datetime
 from uuid import uuid4
-from typing import List
-from pgvector.sqlalchemy import Vector
+from typing import List, Optional
+from pgvector.sqlalchemy import Vector, HALFVEC, BIT
+from sqlalchemy import update, and_, or_, cast, func
+from sqlalchemy.orm import aliased
+from flask_app.config import EmbeddingStorageConfig
 
 logger = get_logger(__name__)
+storage_config = EmbeddingStorageConfig()
 
 class UserEmbedding(db.Model):
     """Vector embeddings for user matching using pgvector"""
     __tablename__ = 'user_embeddings'
+    UNIQUE_CONSTRAINT = 'uq_user_embedding_type'  # Conflict target for bulk upserts
     __table_args__ = (
-        db.Index('ix_user_embedding_type', 'user_id', 'embedding_type'),
+        db.UniqueConstraint('user_id', 'embedding_type', name=UNIQUE_CONSTRAINT),
         {'extend_existing': True}
     )
-    N_DIMENSIONS = 1536  # Number of dimensions for the vector embedding
+    N_DIMENSIONS = storage_config.EMBEDDING_DIMENSIONS or 1536  # Number of dimensions for the vector embedding
+    STORAGE_FORMAT = storage_config.EMBEDDING_STORAGE_FORMAT  # 'vector' (float32) or 'halfvec' (float16)
+    BINARY_PREFILTER = storage_config.EMBEDDING_BINARY_PREFILTER
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid4()))
     user_id = db.Column(db.String(100), db.ForeignKey('users.cognito_sub', ondelete='CASCADE'),
                         nullable=False, index=True)
     embedding_type = db.Column(db.String(50), nullable=False)
-    vector_embedding = db.Column(Vector(N_DIMENSIONS), nullable=False)
+    vector_embedding = db.Column(HALFVEC(N_DIMENSIONS) if STORAGE_FORMAT == 'halfvec' else Vector(N_DIMENSIONS),
+                                 nullable=False)
+    if BINARY_PREFILTER:
+        # Sign bit of every dimension, maintained by Postgres
+        vector_bits = db.Column(
+            BIT(N_DIMENSIONS),
+            db.Computed(f'binary_quantize(vector_embedding)::bit({N_DIMENSIONS})', persisted=True)
+        )
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Hash of the model and normalized text the vector was generated from, unchanged text isn't re-embedded
+    content_hash = db.Column(db.String(64), nullable=True)
 
-    def __init__(self, user_id: str, embedding_type: str, vector_embedding: List[float]):
+    # Copied from the owning user by sync_eligibility so searches don't have to join users
+    is_mentor = db.Column(db.Boolean, nullable=False, default=False, server_default='false')
+    is_searchable = db.Column(db.Boolean, nullable=False, default=False, server_default='false')
+    application_status = db.Column(db.String(20), nullable=True)  # ApplicationStatus name, e.g. 'APPROVED'
+
+    def __init__(self, user_id: str, embedding_type: str, vector_embedding: List[float],
+                 content_hash: Optional[str] = None):
         """
         Initialize a new embedding
 
         Args:
             user_id: User's cognito_sub
             embedding_type: Type of embedding (e.g., 'bio', 'expertise', 'goals')
-            vector_embedding: 1536-dimensional vector as a list of floats
+            vector_embedding: N_DIMENSIONS-dimensional vector as a list of floats
+            content_hash: Hash of the text the vector was generated from, see EmbeddingFactory.content_hash
         """
         self.user_id = user_id
         self.embedding_type = embedding_type
         self.vector_embedding = vector_embedding
+        self.content_hash = content_hash
         logger.debug(f"Created {embedding_type} embedding for user {user_id}")
 
+    @classmethod
+    def binary_code(cls):
+        """SQL expression for the sign bits of vector_embedding, the column the binary indexes are built on."""
+        if cls.BINARY_PREFILTER:
+            return cls.vector_bits
+        return cast(func.binary_quantize(cls.vector_embedding), BIT(cls.N_DIMENSIONS))
+
+    @classmethod
+    def sync_eligibility(cls, user_ids: Optional[List[str]] = None) -> bool:
+        """
+        Copy mentor eligibility from users onto their embedding rows.
+
+        Must be called after embeddings are added or a user's type, is_active or application_status
+        changes. Only rows whose eligibility actually differs are updated, and the mentors index version
+        is bumped (invalidating cached match results) only when one of them becomes or stops being searchable.
+        Runs in the current session, the caller commits.
+
+        Args:
+            user_ids: cognito_sub IDs to sync, None syncs every row
+
+        Returns:
+            True if the set of searchable mentor rows changed and the index version was bumped
+        """
+        # Import models here to avoid circular imports
+        from flask_app.models.user import User, UserType
+        from flask_app.models.index_version import IndexVersion
+
+        if user_ids is not None and not user_ids:
+            return False
+
+        is_mentor = User.user_type == UserType.MENTOR
+        # TODO: Update to use Sohini's is_active based on mentor availability
+        is_searchable = and_(is_mentor, User.is_active == True)
+        application_status = cast(User.application_status, db.String)
+        # The row as it was before the update, RETURNING only sees the new values
+        previous = aliased(cls)
+        statement = (
+            update(cls)
+            .where(cls.user_id == User.cognito_sub)
+            .where(previous.id == cls.id)
+            .where(or_(
+                cls.is_mentor.is_distinct_from(is_mentor),
+                cls.is_searchable.is_distinct_from(is_searchable),
+                cls.application_status.is_distinct_from(application_status)
+            ))
+            .values(is_mentor=is_mentor, is_searchable=is_searchable, application_status=application_status)
+            .returning(cls.is_searchable.is_distinct_from(previous.is_searchable))
+            .execution_options(synchronize_session=False)
+        )
+        if user_ids is not None:
+            statement = statement.where(cls.user_id.in_(list(user_ids)))
 
+        searchable_changed = any(searchable for (searchable,) in db.session.execute(statement))
+        if searchable_changed:
+            IndexVersion.bump(IndexVersion.MENTORS)
+        logger.debug(f"Synced embedding eligibility for {len(user_ids) if user_ids is not None else 'all'} users"
+                     f"{', searchable mentors changed' if searchable_changed else ''}")
+        return searchable_changed
@@ -0,0 +1,21 @@
+from extensions.database import db
+from extensions.logging import get_logger
+from datetime import datetime
+from pgvector.sqlalchemy import Vector
+from flask_app.models.embedding import UserEmbedding
+
+logger = get_logger(__name__)
+
+class EmbeddingCacheEntry(db.Model):
+    """Content-addressed cache of embeddings, keyed by a hash of the model name and normalized text"""
+    __tablename__ = 'embedding_cache'
+    __table_args__ = (
+        db.Index('ix_embedding_cache_last_used_at', 'last_used_at'),
+        {'extend_existing': True}
+    )
+
+    cache_key = db.Column(db.String(64), primary_key=True)  # sha256 hex digest
+    model = db.Column(db.String(100), nullable=False)
+    vector_embedding = db.Column(Vector(UserEmbedding.N_DIMENSIONS), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,58 @@
+from extensions.database import db
+from extensions.logging import get_logger
+from datetime import datetime
+from uuid import uuid4
+
+logger = get_logger(__name__)
+
+class EmbeddingJobStatus:
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    DEAD = 'dead'  # Ran out of attempts, needs a manual retry
+    SUPERSEDED = 'superseded'  # A newer job for the same user was claimed instead
+
+class EmbeddingJob(db.Model):
+    """Durable unit of embedding work, claimed by background workers with FOR UPDATE SKIP LOCKED"""
+    __tablename__ = 'embedding_jobs'
+    __table_args__ = (
+        db.Index('ix_embedding_jobs_status_run_after', 'status', 'run_after'),
+        {'extend_existing': True}
+    )
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid4()))
+    user_id = db.Column(db.String(100), db.ForeignKey('users.cognito_sub', ondelete='CASCADE'),
+                        nullable=False, index=True)
+    payload = db.Column(db.JSON, nullable=False, default=dict)  # Profile fields to embed
+    status = db.Column(db.String(20), nullable=False, default=EmbeddingJobStatus.QUEUED)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    last_error = db.Column(db.Text, nullable=True)
+    locked_by = db.Column(db.String(100), nullable=True)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __init__(self, user_id: str, payload: dict, max_attempts: int = 5):
+        self.user_id = user_id
+        self.payload = payload
+        self.max_attempts = max_attempts
+        self.status = EmbeddingJobStatus.QUEUED
+        self.attempts = 0
+        self.run_after = datetime.utcnow()
+        logger.debug(f"Created embedding job for user {user_id}")
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'last_error': self.last_error,
+            'run_after': self.run_after.isoformat() if self.run_after else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
@@ -0,0 +1,37 @@
+from extensions.database import db
+from extensions.logging import get_logger
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+logger = get_logger(__name__)
+
+class IndexVersion(db.Model):
+    """Counter that is bumped every time the data behind a search index changes"""
+    __tablename__ = 'index_versions'
+    __table_args__ = {'extend_existing': True}
+
+    MENTORS = 'mentors'  # Mentor embeddings and mentor eligibility
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @classmethod
+    def bump(cls, name: str) -> None:
+        """Increment the version in the current session, it becomes visible when the caller commits"""
+        db.session.execute(
+            pg_insert(cls)
+            .values(name=name, version=1, updated_at=datetime.utcnow())
+            .on_conflict_do_update(
+                index_elements=['name'],
+                set_={'version': cls.version + 1, 'updated_at': datetime.utcnow()}
+            )
+        )
+        logger.debug(f"Bumped {name} index version")
+
+    @classmethod
+    def current(cls, name: str) -> int:
+        """Return the committed version, 0 if it has never been bumped"""
+        version = db.session.execute(select(cls.version).where(cls.name == name)).scalar()
+        return version or 0
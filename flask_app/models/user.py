@@ -1,5 +1,6 @@
 from extensions.database import db
 from extensions.logging import get_logger
+from flask_app.extensions.profile_normalization import country_sql, state_province_sql, time_zone_sql
 from enum import Enum
 from datetime import datetime
 from typing import Optional, Dict, Any
@@ -32,6 +33,25 @@ class User(db.Model):
     # For users only - stored here for easy querying
     application_status = db.Column(db.Enum(ApplicationStatus), nullable=True, index=True)
 
+    # Structured profile fields extracted by Postgres so match filters are indexed WHERE clauses, see MatchFilters.
+    # Location fields are free text, they're normalized the same way as filter values (see profile_normalization)
+    filter_country = db.Column(
+        db.String(100), db.Computed(country_sql("profile->>'country'"), persisted=True), index=True)
+    filter_state_province = db.Column(
+        db.String(100),
+        db.Computed(state_province_sql("coalesce(profile->>'stateProvince', profile->>'state_province')"),
+                    persisted=True),
+        index=True)
+    filter_time_zone = db.Column(
+        db.String(64), db.Computed(time_zone_sql("profile->>'timeZone'"), persisted=True), index=True)
+    filter_primary_subject = db.Column(
+        db.String(200), db.Computed("lower(btrim(profile->>'primarySubject'))", persisted=True), index=True)
+    filter_years_teaching = db.Column(
+        db.Integer,
+        db.Computed("CASE WHEN profile->>'yearsTeaching' ~ '^ *[0-9]{1,4} *$' "
+                    "THEN btrim(profile->>'yearsTeaching')::integer END", persisted=True),
+        index=True)
+
     def __init__(self, email: str, user_type: UserType, cognito_sub: str, profile: Optional[Dict[str, Any]] = None, application_status: Optional[ApplicationStatus] = None):
         logger.debug(f"Creating new User with email: {email[:3]}***{email[-4:]}")
         self.cognito_sub = cognito_sub
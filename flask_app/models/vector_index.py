@@ -0,0 +1,31 @@
+from extensions.database import db
+from extensions.logging import get_logger
+from datetime import datetime
+from uuid import uuid4
+
+logger = get_logger(__name__)
+
+class VectorIndexBuild(db.Model):
+    """Record of a managed pgvector index and the parameters it was built with"""
+    __tablename__ = 'vector_index_builds'
+    __table_args__ = {'extend_existing': True}
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid4()))
+    index_name = db.Column(db.String(63), nullable=False, unique=True)
+    method = db.Column(db.String(20), nullable=False)  # 'hnsw' or 'ivfflat'
+    embedding_type = db.Column(db.String(50), nullable=True)  # Set for per-type partial indexes
+    parameters = db.Column(db.JSON, nullable=False, default=dict)
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+    build_seconds = db.Column(db.Float, nullable=True)
+    built_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'index_name': self.index_name,
+            'method': self.method,
+            'embedding_type': self.embedding_type,
+            'parameters': self.parameters,
+            'row_count': self.row_count,
+            'build_seconds': self.build_seconds,
+            'built_at': self.built_at.isoformat() if self.built_at else None
+        }
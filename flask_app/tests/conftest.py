@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Same import roots as the container: the repository root (PYTHONPATH=/app) and flask_app itself
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Config classes raise on missing required settings at import time, tests never reach OpenAI
+os.environ.setdefault('OPENAI_API_KEY', 'test-key')
@@ -0,0 +1,79 @@
+import itertools
+import numpy as np
+import pytest
+from flask_app.extensions.assignment import capacitated_assignment, remaining_capacity
+
+
+def brute_force(cost, capacities):
+    """Exact (assigned count, total cost) by trying every assignment, small inputs only."""
+    rows, columns = cost.shape
+    best = (0, 0.0)
+    for choice in itertools.product(range(-1, columns), repeat=rows):
+        counts = np.bincount([column for column in choice if column >= 0], minlength=columns)
+        if (counts > capacities).any():
+            continue
+        pairs = [cost[row, column] for row, column in enumerate(choice) if column >= 0]
+        if not np.isfinite(pairs).all():
+            continue
+        candidate = (len(pairs), float(sum(pairs)))
+        if candidate[0] > best[0] or (candidate[0] == best[0] and candidate[1] < best[1]):
+            best = candidate
+    return best
+
+
+def summarize(cost, assigned):
+    rows = np.flatnonzero(assigned >= 0)
+    return len(rows), float(cost[rows, assigned[rows]].sum())
+
+
+@pytest.mark.parametrize('rows, capacities', [
+    (6, [2, 2, 2]),     # balanced
+    (7, [1, 2, 1]),     # more rows than slots
+    (4, [3, 2, 3]),     # spare capacity
+    (5, [0, 4, 1]),     # a column without capacity
+])
+@pytest.mark.parametrize('seed', range(5))
+def test_matches_brute_force(rows, capacities, seed):
+    rng = np.random.default_rng(seed)
+    capacities = np.array(capacities)
+    cost = rng.uniform(0.1, 0.9, (rows, len(capacities)))
+
+    assigned = capacitated_assignment(cost, capacities)
+
+    count, total = summarize(cost, assigned)
+    expected_count, expected_total = brute_force(cost, capacities)
+    assert count == expected_count
+    assert total == pytest.approx(expected_total)
+    assert (remaining_capacity(assigned, capacities) >= 0).all()
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_disallowed_pairs_are_never_assigned(seed):
+    rng = np.random.default_rng(seed)
+    capacities = np.array([1, 2, 1])
+    cost = rng.uniform(0.1, 0.9, (5, 3))
+    cost[rng.random(cost.shape) < 0.4] = np.inf
+
+    assigned = capacitated_assignment(cost, capacities)
+
+    rows = np.flatnonzero(assigned >= 0)
+    assert np.isfinite(cost[rows, assigned[rows]]).all()
+    count, total = summarize(cost, assigned)
+    assert (count, pytest.approx(total)) == brute_force(cost, capacities)
+
+
+@pytest.mark.parametrize('rows, columns, capacity', [(40, 10, 2), (50, 10, 3), (100, 30, 5)])
+def test_fills_every_slot_it_can(rows, columns, capacity):
+    rng = np.random.default_rng(0)
+    cost = rng.uniform(0.1, 0.9, (rows, columns))
+    capacities = np.full(columns, capacity)
+
+    assigned = capacitated_assignment(cost, capacities)
+
+    assert (assigned >= 0).sum() == min(rows, columns * capacity)
+    assert (remaining_capacity(assigned, capacities) >= 0).all()
+
+
+def test_nothing_allowed():
+    assigned = capacitated_assignment(np.full((3, 2), np.inf), np.array([1, 1]))
+    assert (assigned == -1).all()
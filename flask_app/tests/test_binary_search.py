@@ -0,0 +1,89 @@
+import re
+from sqlalchemy import union_all
+from sqlalchemy.dialects import postgresql
+from flask_app.extensions.embeddings import TheAlgorithm
+from flask_app.extensions.match_filters import MatchFilters
+from flask_app.extensions.vector_index import vector_index_manager
+from flask_app.models.embedding import UserEmbedding
+
+VECTOR = [0.5, -0.25, 0.0, 0.75]
+
+
+def _sql(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+def _algorithm():
+    return TheAlgorithm.__new__(TheAlgorithm)
+
+
+def test_single_stage_query_orders_by_cosine():
+    sql = _sql(_algorithm()._build_search_query('bio', VECTOR, 5))
+
+    assert 'WITH' not in sql
+    assert '<~>' not in sql
+    assert re.search(r'WHERE user_embeddings\.is_searchable = true AND user_embeddings\.embedding_type', sql)
+    assert 'ORDER BY cosine_distance' in sql
+
+
+def test_binary_stage_is_a_materialized_cte():
+    sql = _sql(_algorithm()._build_search_query('bio', VECTOR, 5, binary_candidates=40))
+
+    cte = sql[:sql.index('FROM binary_candidates ')]
+    assert re.match(r'WITH binary_candidates AS MATERIALIZED', sql)
+    # The Hamming ordering and every filter live in the CTE, next to the bit_hamming_ops index predicate
+    assert '<~>' in cte and 'user_embeddings.is_searchable = true' in cte
+    assert 'LIMIT' in cte
+    # The rerank reads only the candidates, ordered by exact cosine distance, with no IN (subquery) filter
+    assert 'FROM binary_candidates ORDER BY cosine_distance' in sql
+    assert ' IN (' not in sql
+    assert 'user_embeddings.vector_embedding <=>' not in sql
+
+
+def test_binary_stage_applies_filters_before_the_limit():
+    filters = MatchFilters(countries=['United States'])
+
+    sql = _sql(_algorithm()._build_search_query('all', VECTOR, 5, binary_candidates=40, filters=filters))
+
+    cte = sql[:sql.index('FROM binary_candidates')]
+    assert 'user_embeddings.user_id IN (SELECT users.cognito_sub' in cte
+    assert cte.index('IN (SELECT users.cognito_sub') < cte.rindex('LIMIT')
+
+
+def test_union_branches_get_their_own_ctes():
+    algorithm = _algorithm()
+
+    sql = _sql(union_all(
+        algorithm._build_search_query('bio', VECTOR, 5, search_key='bio', binary_candidates=40),
+        algorithm._build_search_query('goals', VECTOR, 5, search_key='goals', binary_candidates=40),
+    ))
+
+    names = re.findall(r'(binary_candidates_[0-9a-f]{8}) AS MATERIALIZED', sql)
+    assert len(names) == 2 and names[0] != names[1]
+    for name in names:
+        assert f'FROM {name} ORDER BY cosine_distance' in sql
+
+
+def test_binary_index_matches_the_query_expression():
+    sql = vector_index_manager._create_index_sql('user_embeddings_bits_idx_new', 'hnsw', None,
+                                                 {'m': 16, 'ef_construction': 64}, binary=True)
+
+    assert 'USING hnsw (' in sql and 'bit_hamming_ops' in sql
+    assert sql.endswith('WHERE is_searchable')
+    query_expression = _sql(UserEmbedding.binary_code())
+    if UserEmbedding.BINARY_PREFILTER:
+        assert '(vector_bits bit_hamming_ops)' in sql
+        assert query_expression == 'user_embeddings.vector_bits'
+    else:
+        # Same expression as the query, spelled with :: in the DDL
+        dimensions = UserEmbedding.N_DIMENSIONS
+        assert f'((binary_quantize(vector_embedding)::bit({dimensions})) bit_hamming_ops)' in sql
+        assert query_expression == f'CAST(binary_quantize(user_embeddings.vector_embedding) AS BIT({dimensions}))'
+
+
+def test_binary_index_names():
+    assert vector_index_manager.index_name(binary=True) == 'user_embeddings_bits_idx'
+    assert vector_index_manager.index_name('bio', binary=True).startswith('user_embeddings_bits_bio_')
+    assert vector_index_manager.index_name('bio') != vector_index_manager.index_name('bio', binary=True)
+    sql = vector_index_manager._create_index_sql('bio_idx', 'hnsw', 'bio', {'m': 16}, binary=True)
+    assert sql.endswith("WHERE is_searchable AND embedding_type = 'bio'")
@@ -0,0 +1,118 @@
+from types import SimpleNamespace
+import pytest
+from flask_app.extensions.embeddings import EmbeddingFactory
+
+
+class FakeEmbeddings:
+    """Stands in for openai_client.embeddings, returns each input's length as its vector."""
+
+    def __init__(self, reverse=False, drop_last=False):
+        self.reverse = reverse
+        self.drop_last = drop_last
+        self.requests = []
+
+    def create(self, **request_args):
+        self.requests.append(request_args)
+        data = [SimpleNamespace(index=index, embedding=[float(len(text))])
+                for index, text in enumerate(request_args['input'])]
+        if self.drop_last:
+            data = data[:-1]
+        if self.reverse:
+            data.reverse()
+        return SimpleNamespace(data=data)
+
+
+@pytest.fixture
+def factory():
+    # Bypass the singleton and OpenAI setup, only the batching limits and client are needed
+    instance = object.__new__(EmbeddingFactory)
+    instance.embedding_model = 'text-embedding-3-small'
+    instance.embedding_dimensions = None
+    instance.batch_max_items = 3
+    instance.batch_max_tokens = 30
+    instance.input_max_tokens = 20
+    instance.bulk_concurrency = 2
+    instance.embedding_cache = None
+    instance.openai_client = SimpleNamespace(embeddings=FakeEmbeddings())
+    return instance
+
+
+def _text(tokens):
+    """Text that _estimate_tokens counts as exactly tokens."""
+    return 'x' * ((tokens - 1) * 3)
+
+
+def test_pack_batches_respects_item_limit(factory):
+    items = [(f'field-{number}', _text(1)) for number in range(7)]
+
+    batches = factory._pack_batches(items)
+
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert [pair for batch in batches for pair in batch] == items
+
+
+def test_pack_batches_respects_token_limit(factory):
+    items = [('a', _text(12)), ('b', _text(12)), ('c', _text(7)), ('d', _text(6))]
+
+    batches = factory._pack_batches(items)
+
+    assert [[key for key, _ in batch] for batch in batches] == [['a', 'b'], ['c', 'd']]
+    for batch in batches:
+        assert sum(factory._estimate_tokens(text) for _, text in batch) <= factory.batch_max_tokens
+
+
+def test_pack_batches_sends_oversized_inputs_alone(factory):
+    items = [('a', _text(1)), ('huge', _text(21)), ('b', _text(1))]
+
+    batches = factory._pack_batches(items)
+
+    assert [[key for key, _ in batch] for batch in batches] == [['huge'], ['a', 'b']]
+    assert factory._pack_batches([]) == []
+
+
+def test_embed_batch_maps_by_response_index(factory):
+    factory.openai_client.embeddings.reverse = True
+    factory.embedding_dimensions = 256
+
+    embeddings = factory._embed_batch(['a', 'bbb', 'cc'], user_id='user-1')
+
+    assert embeddings == [[1.0], [3.0], [2.0]]
+    request = factory.openai_client.embeddings.requests[0]
+    assert request['user'] == 'user-1' and request['dimensions'] == 256
+
+
+def test_embed_batch_rejects_incomplete_responses(factory):
+    factory.openai_client.embeddings.drop_last = True
+
+    with pytest.raises(RuntimeError):
+        factory._embed_batch(['a', 'bb'])
+
+
+def test_generate_embeddings_keeps_keys_across_batches(factory):
+    profile = {f'field-{number}': 'y' * number for number in range(1, 8)}
+    profile['empty'] = '  '
+
+    result = factory.generate_embeddings('user-1', profile)
+
+    assert result == {key: [float(len(text))] for key, text in profile.items() if key != 'empty'}
+    assert len(factory.openai_client.embeddings.requests) == 3
+
+
+def test_generate_embeddings_bulk_embeds_shared_texts_once(factory):
+    factory.openai_client.embeddings.reverse = True
+    items = [
+        ('user-1', 'country', 'United States'),
+        ('user-2', 'country', 'United States'),
+        ('user-1', 'bio', 'Teaches algebra'),
+        ('user-2', 'subjects', ['math', 'physics']),
+        ('user-3', 'bio', None),
+    ]
+
+    result = factory.generate_embeddings_bulk(items, max_workers=2)
+
+    assert result == {
+        'user-1': {'country': [13.0], 'bio': [15.0]},
+        'user-2': {'country': [13.0], 'subjects': [13.0]},
+    }
+    sent = [text for request in factory.openai_client.embeddings.requests for text in request['input']]
+    assert sorted(sent) == ['Teaches algebra', 'United States', 'math, physics']
@@ -0,0 +1,67 @@
+import click
+import pytest
+from flask import Flask
+from flask_app.extensions import embedding_jobs
+from flask_app.extensions.embedding_jobs import EmbeddingJobQueue
+
+
+class FakeThread:
+    started = []
+
+    def __init__(self, target, args, name, daemon):
+        self.name = name
+
+    def start(self):
+        FakeThread.started.append(self.name)
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    # A fresh instance rather than the shared singleton, worker threads are recorded instead of started
+    instance = object.__new__(EmbeddingJobQueue)
+    instance.__init__()
+    instance.enabled = True
+    monkeypatch.setattr(instance, '_schema_ready', lambda: True)
+    monkeypatch.setattr(embedding_jobs.threading, 'Thread', FakeThread)
+    monkeypatch.setattr(FakeThread, 'started', [])
+    return instance
+
+
+def test_disabled_by_default(monkeypatch):
+    monkeypatch.delenv('EMBEDDING_JOBS_ENABLED', raising=False)
+    instance = object.__new__(EmbeddingJobQueue)
+    instance.__init__()
+
+    assert instance.enabled is False
+
+
+def test_workers_start_in_the_server(queue):
+    queue.start_workers(Flask(__name__))
+
+    assert len(FakeThread.started) == queue.worker_count
+
+
+def test_no_workers_under_tests(queue):
+    app = Flask(__name__)
+    app.testing = True
+
+    queue.start_workers(app)
+
+    assert FakeThread.started == []
+    assert queue.enabled
+
+
+def test_no_workers_in_cli_commands(queue):
+    with click.Context(click.Command('db')):
+        queue.start_workers(Flask(__name__))
+
+    assert FakeThread.started == []
+
+
+def test_missing_schema_disables_the_queue(monkeypatch, queue):
+    monkeypatch.setattr(queue, '_schema_ready', lambda: False)
+
+    queue.start_workers(Flask(__name__))
+
+    assert FakeThread.started == []
+    assert not queue.enabled
@@ -0,0 +1,124 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+import pytest
+from flask_app.extensions import embeddings
+from flask_app.extensions.embeddings import EmbeddingMatch, TheAlgorithm
+from flask_app.extensions.match_filters import MatchFilters
+from flask_app.extensions.vector_index import vector_index_manager
+
+
+class FakeSession:
+    def __init__(self, pgvector_version='0.8.0'):
+        self.pgvector_version = pgvector_version
+        self.statements = []
+        self.savepoints = []
+        self.rolled_back = False
+
+    def execute(self, statement, params=None):
+        self.statements.append((str(statement), params))
+        return SimpleNamespace(scalar=lambda: self.pgvector_version)
+
+    @contextmanager
+    def begin_nested(self):
+        self.savepoints.append('open')
+        try:
+            yield
+        except Exception:
+            self.savepoints[-1] = 'rolled back'
+            raise
+        self.savepoints[-1] = 'released'
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(vector_index_manager, 'method', 'hnsw')
+    monkeypatch.setattr(vector_index_manager, 'default_ef_search', 40)
+    monkeypatch.setattr(vector_index_manager, 'filtered_ef_search', 200)
+    monkeypatch.setattr(vector_index_manager, '_iterative_scan', None)
+    return vector_index_manager
+
+
+def test_filtered_search_settings(manager):
+    session = FakeSession('0.8.0')
+
+    manager.apply_search_settings(session, limit=10, filtered=True)
+
+    assert ("SELECT set_config('hnsw.ef_search', :value, true)", {'value': '200'}) in session.statements
+    assert any("'hnsw.iterative_scan', 'strict_order'" in sql for sql, _ in session.statements)
+
+
+def test_unfiltered_search_settings(manager):
+    session = FakeSession('0.8.0')
+
+    manager.apply_search_settings(session, limit=10)
+
+    assert ("SELECT set_config('hnsw.ef_search', :value, true)", {'value': '40'}) in session.statements
+    assert not any('iterative_scan' in sql for sql, _ in session.statements)
+
+
+def test_no_iterative_scan_before_pgvector_0_8(manager):
+    session = FakeSession('0.7.4')
+
+    manager.apply_search_settings(session, limit=10, filtered=True)
+
+    assert not any('iterative_scan' in sql for sql, _ in session.statements)
+
+
+def test_short_filtered_searches_rerun_exactly(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(embeddings, 'db', SimpleNamespace(session=session))
+    algorithm = TheAlgorithm.__new__(TheAlgorithm)
+    exact = {'bio': [EmbeddingMatch(f'mentor-{index}', 'bio', index / 10) for index in range(3)]}
+    reruns = []
+
+    def find_closest(searches, limit, binary_candidates=None, filters=None):
+        # Index scans have to be off while the rerun runs
+        assert session.statements[-1][0] == "SELECT set_config('enable_indexscan', 'off', true)"
+        reruns.append([search[0] for search in searches])
+        return {search[0]: exact[search[0]] for search in searches}
+
+    monkeypatch.setattr(algorithm, '_find_closest_embeddings_for_vectors', find_closest)
+    searches = [('bio', 'bio', [1.0, 0.0]), ('goals', 'goals', [0.0, 1.0])]
+    full = [EmbeddingMatch(f'mentor-{index}', 'goals', index / 10) for index in range(3)]
+    # HNSW found one row for bio that passed the filter, the exact scan finds three
+    results = {'bio': exact['bio'][:1], 'goals': full}
+
+    algorithm._rerun_short_filtered_searches(searches, results, 3, MatchFilters(countries=['Canada']))
+
+    assert reruns == [['bio']]
+    assert results == {'bio': exact['bio'], 'goals': full}
+    assert session.statements[-1][0] == "SELECT set_config('enable_indexscan', 'on', true)"
+    assert session.savepoints == ['released']
+    assert not session.rolled_back
+
+
+def test_failed_rerun_rolls_back_and_keeps_results(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(embeddings, 'db', SimpleNamespace(session=session))
+    algorithm = TheAlgorithm.__new__(TheAlgorithm)
+
+    def find_closest(searches, limit, binary_candidates=None, filters=None):
+        raise RuntimeError('canceling statement due to statement timeout')
+
+    monkeypatch.setattr(algorithm, '_find_closest_embeddings_for_vectors', find_closest)
+    results = {'bio': [EmbeddingMatch('mentor-1', 'bio', 0.1)]}
+
+    algorithm._rerun_short_filtered_searches([('bio', 'bio', [1.0])], results, 3, MatchFilters(countries=['Canada']))
+
+    # The savepoint is rolled back with the setting, then the transaction, so later statements still run
+    assert session.savepoints == ['rolled back']
+    assert session.rolled_back
+    assert results == {'bio': [EmbeddingMatch('mentor-1', 'bio', 0.1)]}
+
+
+def test_full_filtered_searches_are_not_rerun(monkeypatch):
+    algorithm = TheAlgorithm.__new__(TheAlgorithm)
+    monkeypatch.setattr(algorithm, '_find_closest_embeddings_for_vectors', pytest.fail)
+    results = {'bio': [EmbeddingMatch('mentor-1', 'bio', 0.1)]}
+
+    algorithm._rerun_short_filtered_searches([('bio', 'bio', [1.0])], results, 1, MatchFilters(countries=['Canada']))
+
+    assert results == {'bio': [EmbeddingMatch('mentor-1', 'bio', 0.1)]}
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from flask_app.extensions.fusion import (
+    ReciprocalRankFusion, RankSumFusion, WeightedCosineFusion, column_ranks, get_fusion_strategy
+)
+
+# Three candidates by two fields
+DISTANCES = np.array([
+    [0.1, 0.9],
+    [0.5, 0.2],
+    [0.3, 0.3],
+])
+
+
+def test_column_ranks():
+    assert column_ranks(DISTANCES).tolist() == [[1, 3], [3, 1], [2, 2]]
+    # Ties keep candidate order
+    assert column_ranks(np.array([[0.2], [0.2], [0.1]])).tolist() == [[2], [3], [1]]
+
+
+def test_weighted_cosine():
+    weights = np.array([3.0, 1.0])
+
+    scores = WeightedCosineFusion().score(DISTANCES, weights)
+
+    assert scores == pytest.approx([(0.3 + 0.9) / 4, (1.5 + 0.2) / 4, (0.9 + 0.3) / 4])
+    order, _ = WeightedCosineFusion().rank(DISTANCES, weights)
+    # Candidates 0 and 2 tie at 0.3, the lower mean distance (candidate 2) wins
+    assert order.tolist() == [2, 0, 1]
+
+
+def test_weighted_cosine_is_scale_invariant_in_weights():
+    weights = np.array([1.0, 2.0])
+
+    assert WeightedCosineFusion().score(DISTANCES, weights) == pytest.approx(
+        WeightedCosineFusion().score(DISTANCES, weights * 10))
+
+
+def test_rrf():
+    weights = np.array([1.0, 2.0])
+
+    scores = ReciprocalRankFusion(k=10).score(DISTANCES, weights)
+
+    assert scores == pytest.approx([1 / 11 + 2 / 13, 1 / 13 + 2 / 11, 1 / 12 + 2 / 12])
+    order, _ = ReciprocalRankFusion(k=10).rank(DISTANCES, weights)
+    assert order.tolist() == [1, 2, 0]
+
+
+def test_rank_sum():
+    weights = np.array([1.0, 1.0])
+
+    scores = RankSumFusion().score(DISTANCES, weights)
+
+    assert scores.tolist() == [4, 4, 4]
+    # Every candidate ties on points, mean distance decides
+    order, _ = RankSumFusion().rank(DISTANCES, weights)
+    assert order.tolist() == [2, 1, 0]
+    assert RankSumFusion().score(DISTANCES, np.array([2.0, 1.0])).tolist() == [5, 7, 6]
+
+
+def test_get_fusion_strategy():
+    assert isinstance(get_fusion_strategy('weighted_cosine'), WeightedCosineFusion)
+    assert isinstance(get_fusion_strategy('rank_sum'), RankSumFusion)
+    rrf = get_fusion_strategy('rrf', rrf_k=25)
+    assert isinstance(rrf, ReciprocalRankFusion) and rrf.k == 25
+    with pytest.raises(ValueError):
+        get_fusion_strategy('borda')
@@ -0,0 +1,159 @@
+import json
+import threading
+import time
+import pytest
+from flask_app.extensions import jwks_cache
+from flask_app.extensions.jwks_cache import JWKSCache
+
+
+class FakeJWKS:
+    """Serves a key set through urlopen and counts the fetches."""
+
+    def __init__(self, *kids):
+        self.kids = list(kids)
+        self.fetches = 0
+        self.error = None
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def urlopen(self, url, timeout=None):
+        self.fetches += 1
+        self.entered.set()
+        self.release.wait(5)
+        if self.error:
+            raise self.error
+        body = json.dumps({'keys': [{'kid': kid, 'kty': 'RSA'} for kid in self.kids]}).encode('utf-8')
+        return _Response(body)
+
+
+class _Response:
+    def __init__(self, body):
+        self.body = body
+
+    def read(self):
+        return self.body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def server(monkeypatch):
+    fake = FakeJWKS('kid-1')
+    monkeypatch.setattr(jwks_cache.urllib.request, 'urlopen', fake.urlopen)
+    # Public key objects stand in for jose's RSA keys
+    monkeypatch.setattr(jwks_cache.jwk, 'construct', lambda key: ('public-key', key['kid']))
+    return fake
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(jwks_cache.time, 'monotonic', fake.monotonic)
+    return fake
+
+
+def test_keys_are_loaded_once(server, clock):
+    cache = JWKSCache('https://example.test/jwks.json', ttl=3600)
+
+    assert cache.get_key('kid-1') == ('public-key', 'kid-1')
+    clock.now += 60
+    assert cache.get_key('kid-1') == ('public-key', 'kid-1')
+    assert cache.keys == [{'kid': 'kid-1', 'kty': 'RSA'}]
+    assert server.fetches == 1
+
+
+def test_refetched_after_ttl(server, clock):
+    cache = JWKSCache('https://example.test/jwks.json', ttl=3600)
+    cache.get_key('kid-1')
+    server.kids = ['kid-2']
+
+    clock.now += 3601
+
+    assert cache.get_key('kid-2') == ('public-key', 'kid-2')
+    assert cache.get_key('kid-1') is None
+    assert server.fetches == 2
+
+
+def test_unknown_kid_refreshes_at_most_once_per_interval(server, clock):
+    cache = JWKSCache('https://example.test/jwks.json', min_refresh_interval=30)
+    cache.get_key('kid-1')
+
+    assert cache.get_key('made-up') is None
+    assert server.fetches == 1
+
+    clock.now += 30
+    server.kids = ['kid-1', 'kid-2']
+    assert cache.get_key('made-up') is None
+    assert server.fetches == 2
+    # The rotated key arrived with that refresh, further unknown kids wait for the interval
+    assert cache.get_key('kid-2') == ('public-key', 'kid-2')
+    assert cache.get_key('made-up') is None
+    assert server.fetches == 2
+
+
+def test_failed_refresh_keeps_old_keys(server, clock):
+    cache = JWKSCache('https://example.test/jwks.json', ttl=3600)
+    cache.get_key('kid-1')
+    server.error = OSError('connection reset')
+
+    clock.now += 3601
+
+    assert cache.get_key('kid-1') == ('public-key', 'kid-1')
+    assert cache.failures == 1
+    assert cache.stats()['kids'] == ['kid-1']
+
+
+def test_first_fetch_failure_raises(server, clock):
+    cache = JWKSCache('https://example.test/jwks.json')
+    server.error = OSError('connection refused')
+
+    with pytest.raises(OSError):
+        cache.get_key('kid-1')
+
+    server.error = None
+    clock.now += 1
+    assert cache.get_key('kid-1') == ('public-key', 'kid-1')
+
+
+def test_concurrent_refreshes_coalesce(server):
+    cache = JWKSCache('https://example.test/jwks.json')
+    server.release.clear()
+    results = []
+
+    def lookup():
+        results.append(cache.get_key('kid-1'))
+
+    first = threading.Thread(target=lookup)
+    first.start()
+    assert server.entered.wait(5)
+    # These requests start while the first fetch is in flight and wait on it
+    waiting = [threading.Thread(target=lookup) for _ in range(4)]
+    for thread in waiting:
+        thread.start()
+    time.sleep(0.1)
+    server.release.set()
+    for thread in [first] + waiting:
+        thread.join(5)
+
+    assert results == [('public-key', 'kid-1')] * 5
+    assert server.fetches == 1
+
+
+def test_get_jwks_cache_is_shared_per_url():
+    first = jwks_cache.get_jwks_cache('https://example.test/shared.json')
+
+    assert jwks_cache.get_jwks_cache('https://example.test/shared.json') is first
+    assert jwks_cache.get_jwks_cache('https://example.test/other.json') is not first
@@ -0,0 +1,101 @@
+import pytest
+from flask_app.extensions import lru_cache
+from flask_app.extensions.lru_cache import LRUCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(lru_cache.time, 'monotonic', fake.monotonic)
+    return fake
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'b' is now the least recently used
+
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.evictions == 1
+    assert len(cache) == 2
+
+
+def test_set_existing_key_refreshes_recency():
+    cache = LRUCache(max_size=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.set('a', 10)
+
+    cache.set('c', 3)
+
+    assert cache.get('a') == 10
+    assert cache.get('b', 'gone') == 'gone'
+
+
+def test_default_ttl_and_per_entry_ttl(clock):
+    cache = LRUCache(default_ttl=10)
+    cache.set('default', 1)
+    cache.set('short', 2, ttl=1)
+    cache.set('forever', 3)
+
+    clock.now += 5
+    assert cache.get('short') is None
+    assert cache.get('default') == 1
+
+    clock.now += 5
+    assert cache.get('default') is None
+    assert len(cache) == 1
+
+
+def test_no_ttl_never_expires(clock):
+    cache = LRUCache()
+    cache.set('a', 1)
+
+    clock.now += 10 ** 9
+
+    assert cache.get('a') == 1
+
+
+def test_cached_none_is_a_hit():
+    cache = LRUCache()
+    cache.set('a', None)
+
+    assert cache.get('a', 'default') is None
+    assert cache.hits == 1 and cache.misses == 0
+
+
+def test_pop_and_clear():
+    cache = LRUCache()
+    cache.set('a', 1)
+    cache.set('b', 2)
+
+    assert cache.pop('a') == 1
+    assert cache.pop('a', 'missing') == 'missing'
+    assert cache.clear() == 1
+    assert len(cache) == 0
+
+
+def test_stats(clock):
+    cache = LRUCache(max_size=1, default_ttl=1)
+    cache.set('a', 1)
+    cache.get('a')
+    cache.get('b')
+    clock.now += 2
+    cache.get('a')  # Expired entries count as misses
+    cache.set('b', 2)
+    cache.set('c', 3)
+
+    assert cache.stats() == {'size': 1, 'max_size': 1, 'hits': 1, 'misses': 2, 'evictions': 1,
+                             'hit_rate': pytest.approx(1 / 3)}
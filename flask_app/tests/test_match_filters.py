@@ -0,0 +1,113 @@
+from datetime import datetime, timezone
+import pytest
+from flask_app.extensions.match_filters import MatchFilters, time_zones_within
+from flask_app.extensions.profile_normalization import (
+    normalize_country, normalize_state_province, normalize_time_zone
+)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Central Time Zone', 'America/Chicago'),
+    ('Central Standard Time (CST)', 'America/Chicago'),
+    ('Eastern Standard Time', 'America/New_York'),
+    ('EST', 'America/New_York'),
+    ('Mountain Time (MT)', 'America/Denver'),
+    ('Mountain Time (GMT-7)', 'America/Denver'),
+    ('Pacific Time (PT)', 'America/Los_Angeles'),
+    ('Arizona (MST)', 'America/Phoenix'),
+    ('Central European Time', 'Europe/Paris'),
+    ('GMT-7', 'Etc/GMT+7'),
+    ('UTC+10', 'Etc/GMT-10'),
+    ('UTC', 'Etc/UTC'),
+    ('america/chicago', 'America/Chicago'),
+    ('Mars/Olympus_Mons', None),
+    ('sometime after lunch', None),
+])
+def test_normalize_time_zone(text, expected):
+    assert normalize_time_zone(text) == expected
+
+
+def test_normalize_locations():
+    assert normalize_country('U.S.A.') == normalize_country(' United States ') == 'united states'
+    assert normalize_country('Mexico') == 'mexico'
+    assert normalize_state_province('NC') == normalize_state_province('north  carolina') == 'north carolina'
+    assert normalize_state_province('Washington, D.C.') == 'district of columbia'
+
+
+def test_from_dict():
+    filters = MatchFilters.from_dict({
+        'country': 'United States',
+        'stateProvince': ['North Carolina', ' ', 'SC'],
+        'timeZone': 'Eastern Time',
+        'timeZoneWindowHours': '2',
+        'subjects': 'Biology',
+        'minYearsTeaching': '5'
+    })
+
+    assert filters.countries == ['United States']
+    assert filters.states == ['North Carolina', 'SC']
+    assert filters.time_zone == 'America/New_York'
+    assert filters.time_zone_window_hours == 2.0
+    assert filters.subjects == ['Biology']
+    assert filters.min_years_teaching == 5
+    assert filters.max_years_teaching is None
+    assert not filters.is_empty
+    assert filters.to_dict()['states'] == ['north carolina', 'south carolina']
+
+
+def test_from_dict_empty():
+    assert MatchFilters.from_dict(None).is_empty
+    assert MatchFilters.from_dict({'timeZone': '  ', 'country': []}).is_empty
+
+
+@pytest.mark.parametrize('data', [
+    ['United States'],
+    {'country': 5},
+    {'subjects': ['Biology', 3]},
+    {'timeZone': 7},
+    {'timeZone': 'sometime after lunch'},
+    {'timeZoneWindowHours': 'two'},
+    {'minYearsTeaching': 'many'},
+])
+def test_from_dict_rejects(data):
+    with pytest.raises(ValueError):
+        MatchFilters.from_dict(data)
+
+
+def test_from_criteria_moves_locations_into_filters():
+    criteria = {'country': 'USA', 'stateProvince': 'MN', 'timeZone': 'Central Time Zone', 'bio': 'Science teacher'}
+
+    remaining, filters = MatchFilters.from_criteria(criteria, time_zone_window_hours=1)
+
+    assert remaining == {'bio': 'Science teacher'}
+    assert filters.countries == ['USA']
+    assert filters.states == ['MN']
+    assert filters.time_zone == 'America/Chicago'
+    assert filters.time_zone_window_hours == 1
+
+
+def test_from_criteria_keeps_unrecognized_time_zone():
+    remaining, filters = MatchFilters.from_criteria({'timeZone': 'sometime after lunch', 'country': ''})
+
+    assert remaining == {'timeZone': 'sometime after lunch'}
+    assert filters.is_empty
+
+
+def test_from_criteria_explicit_filters_win():
+    explicit = MatchFilters.from_dict({'country': 'Canada', 'timeZone': 'America/Toronto'})
+
+    remaining, filters = MatchFilters.from_criteria({'country': 'USA', 'timeZone': 'PST'}, 3, explicit)
+
+    assert remaining == {}
+    assert filters.countries == ['Canada']
+    assert filters.time_zone == 'America/Toronto'
+    assert filters.time_zone_window_hours == 0
+
+
+def test_time_zones_within():
+    winter = datetime(2026, 1, 15, tzinfo=timezone.utc)
+
+    assert 'America/Chicago' not in time_zones_within('America/New_York', 0, at=winter)
+    assert 'America/Chicago' in time_zones_within('America/New_York', 1, at=winter)
+    with pytest.raises(ValueError):
+        time_zones_within('Mars/Olympus_Mons', 1)
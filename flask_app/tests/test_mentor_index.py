@@ -0,0 +1,187 @@
+import threading
+import time
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from flask_app.extensions import mentor_index
+from flask_app.extensions.mentor_index import MentorVectorIndex, _TypeIndex, binary_code
+
+
+def _row(user_id, vector, embedding_type='bio'):
+    return SimpleNamespace(user_id=user_id, embedding_type=embedding_type, vector_embedding=vector)
+
+
+class _Result(list):
+    def all(self):
+        return list(self)
+
+
+class FakeSession:
+    """Returns the current searchable rows, on_execute runs while a statement is being read."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.on_execute = None
+
+    def execute(self, statement):
+        rows = list(self.rows)
+        if self.on_execute:
+            on_execute, self.on_execute = self.on_execute, None
+            on_execute()
+        return _Result(rows)
+
+    def commit(self):
+        pass
+
+
+@pytest.fixture
+def index():
+    # A fresh instance rather than the shared singleton
+    instance = object.__new__(MentorVectorIndex)
+    instance.__init__()
+    instance.enabled = True
+    return instance
+
+
+def test_refreshes_during_load_are_replayed(monkeypatch, index):
+    session = FakeSession([_row('mentor-1', [1.0, 0.0])])
+    monkeypatch.setattr(mentor_index, 'db', SimpleNamespace(session=session))
+
+    def approve_mentor_2():
+        # Committed after the snapshot was read, refreshed before the load finished
+        session.rows = [_row('mentor-1', [1.0, 0.0]), _row('mentor-2', [0.0, 1.0])]
+        index.refresh_users(['mentor-2'])
+
+    session.on_execute = approve_mentor_2
+    index.load()
+
+    assert index.is_ready
+    assert index.stats()['types'] == {'bio': 2}
+    assert index.search('bio', [0.0, 1.0], limit=1)[0][0] == 'mentor-2'
+
+
+def test_refresh_before_load_is_ignored(monkeypatch, index):
+    session = FakeSession([_row('mentor-1', [1.0, 0.0])])
+    monkeypatch.setattr(mentor_index, 'db', SimpleNamespace(session=session))
+
+    index.refresh_users(['mentor-1'])
+
+    assert not index.is_ready
+    assert index._pending_refresh == set()
+
+
+def test_overlapping_refreshes_apply_in_order(monkeypatch, index):
+    session = FakeSession([_row('mentor-1', [1.0, 0.0])])
+    monkeypatch.setattr(mentor_index, 'db', SimpleNamespace(session=session))
+    index.load()
+    reading = threading.Event()
+    release = threading.Event()
+
+    def slow_read():
+        reading.set()
+        release.wait(5)
+
+    # The first refresh reads the old vector and stalls, then the vector changes and a second refresh runs
+    session.rows = [_row('mentor-1', [0.0, 1.0])]
+    session.on_execute = slow_read
+    stale = threading.Thread(target=index.refresh_users, args=(['mentor-1'],))
+    stale.start()
+    assert reading.wait(5)
+    session.rows = [_row('mentor-1', [1.0, 1.0])]
+    fresh = threading.Thread(target=index.refresh_users, args=(['mentor-1'],))
+    fresh.start()
+    time.sleep(0.1)
+    release.set()
+    stale.join(5)
+    fresh.join(5)
+
+    assert index.distances('bio', [1.0, 1.0], ['mentor-1'])['mentor-1'] == pytest.approx(0.0, abs=1e-6)
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def _brute_force(vectors, query, limit):
+    distances = sorted((float(1.0 - vector @ query), user_id) for user_id, vector in vectors.items())
+    return [user_id for _, user_id in distances[:limit]]
+
+
+def test_type_index_upsert_grows_and_replaces():
+    type_index = _TypeIndex(dimensions=4, capacity=2)
+    for number in range(5):
+        type_index.upsert(f'mentor-{number}', _unit([number + 1, 1, 0, 0]))
+    type_index.upsert('mentor-2', _unit([0, 0, 0, 1]))
+
+    assert type_index.size == 5
+    assert type_index.matrix.shape[0] >= 5
+    assert type_index.search(_unit([0, 0, 0, 1]), limit=1)[0][0] == 'mentor-2'
+    assert np.array_equal(type_index.codes[type_index.positions['mentor-2']], binary_code(_unit([0, 0, 0, 1])))
+
+
+def test_type_index_remove_keeps_positions_consistent():
+    rng = np.random.default_rng(0)
+    vectors = {f'mentor-{number}': _unit(rng.normal(size=8)) for number in range(20)}
+    type_index = _TypeIndex(dimensions=8, capacity=4)
+    for user_id, vector in vectors.items():
+        type_index.upsert(user_id, vector)
+
+    for user_id in ['mentor-0', 'mentor-19', 'mentor-7', 'missing']:
+        type_index.remove(user_id)
+        vectors.pop(user_id, None)
+
+    assert type_index.size == len(vectors)
+    for user_id, position in type_index.positions.items():
+        assert type_index.user_ids[position] == user_id
+        assert np.allclose(type_index.matrix[position], vectors[user_id])
+    query = _unit(rng.normal(size=8))
+    assert [user_id for user_id, _ in type_index.search(query, limit=5)] == _brute_force(vectors, query, 5)
+
+
+def test_type_index_search_matches_brute_force():
+    rng = np.random.default_rng(1)
+    vectors = {f'mentor-{number}': _unit(rng.normal(size=16)) for number in range(50)}
+    type_index = _TypeIndex(dimensions=16)
+    for user_id, vector in vectors.items():
+        type_index.upsert(user_id, vector)
+    query = _unit(rng.normal(size=16))
+
+    results = type_index.search(query, limit=10)
+
+    assert [user_id for user_id, _ in results] == _brute_force(vectors, query, 10)
+    for user_id, distance in results:
+        assert distance == pytest.approx(1.0 - float(vectors[user_id] @ query), abs=1e-5)
+    # Every row survives a prefilter as wide as the index
+    assert type_index.search(query, limit=10, binary_candidates=50) == results
+    assert len(type_index.search(query, limit=100)) == 50
+
+
+def test_type_index_search_restricted_to_user_ids():
+    rng = np.random.default_rng(2)
+    vectors = {f'mentor-{number}': _unit(rng.normal(size=8)) for number in range(30)}
+    type_index = _TypeIndex(dimensions=8)
+    for user_id, vector in vectors.items():
+        type_index.upsert(user_id, vector)
+    allowed = {f'mentor-{number}' for number in range(0, 30, 3)} | {'missing'}
+    query = _unit(rng.normal(size=8))
+
+    results = type_index.search(query, limit=4, user_ids=allowed)
+
+    expected = _brute_force({user_id: vectors[user_id] for user_id in allowed if user_id in vectors}, query, 4)
+    assert [user_id for user_id, _ in results] == expected
+    assert type_index.search(query, limit=4, user_ids={'missing'}) == []
+    assert all(user_id in allowed for user_id, _ in type_index.search(query, limit=4, binary_candidates=3,
+                                                                         user_ids=allowed))
+
+
+def test_type_index_binary_prefilter_keeps_closest_codes():
+    type_index = _TypeIndex(dimensions=4)
+    type_index.upsert('same-signs', _unit([1, 1, 1, 1]))
+    type_index.upsert('one-flipped', _unit([1, 1, 1, -1]))
+    type_index.upsert('all-flipped', _unit([-1, -1, -1, -1]))
+
+    results = type_index.search(_unit([1, 1, 1, 1]), limit=3, binary_candidates=2)
+
+    assert [user_id for user_id, _ in results] == ['same-signs', 'one-flipped']
+    assert _TypeIndex(dimensions=4).search(_unit([1, 1, 1, 1]), limit=3) == []
@@ -0,0 +1,111 @@
+import pytest
+from flask_app.extensions import token_cache
+from flask_app.extensions.token_cache import VerifiedTokenCache
+
+
+class FakeClock:
+    """Wall clock and monotonic clock that only move when the test moves them, together unless frozen."""
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+        self.monotonic_frozen_at = None
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now if self.monotonic_frozen_at is None else self.monotonic_frozen_at
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(token_cache.time, 'time', fake.time)
+    monkeypatch.setattr(token_cache.time, 'monotonic', fake.monotonic)
+    return fake
+
+
+def test_cached_until_exp(clock):
+    cache = VerifiedTokenCache()
+    claims = {'sub': 'user-1', 'exp': clock.now + 60}
+    cache.set('token-1', claims)
+
+    assert cache.get('token-1') == claims
+    assert cache.get('token-2') is None
+
+    clock.now += 59
+    assert cache.get('token-1') == claims
+    clock.now += 1
+    assert cache.get('token-1') is None
+
+
+def test_expired_claims_are_not_cached(clock):
+    cache = VerifiedTokenCache()
+
+    cache.set('token-1', {'sub': 'user-1', 'exp': clock.now - 1})
+
+    assert cache.get('token-1') is None
+    assert len(cache.tokens) == 0
+
+
+def test_wall_clock_exp_is_checked_on_get(clock):
+    cache = VerifiedTokenCache()
+    cache.set('token-1', {'sub': 'user-1', 'exp': clock.now + 60})
+
+    # The wall clock passes exp while the monotonic clock the LRU expires on doesn't move
+    clock.monotonic_frozen_at = clock.now
+    clock.now += 120
+    assert len(cache.tokens) == 1
+
+    assert cache.get('token-1') is None
+    assert len(cache.tokens) == 0
+
+
+def test_only_digests_are_stored(clock):
+    cache = VerifiedTokenCache()
+
+    cache.set('secret-token', {'sub': 'user-1', 'exp': clock.now + 60})
+
+    assert 'secret-token' not in cache.tokens._entries
+    assert VerifiedTokenCache.digest('secret-token') in cache.tokens._entries
+
+
+def test_revoke_uses_cached_exp(clock):
+    cache = VerifiedTokenCache()
+    cache.set('token-1', {'sub': 'user-1', 'exp': clock.now + 60})
+
+    cache.revoke('token-1')
+
+    assert cache.get('token-1') is None
+    assert cache.is_revoked('token-1')
+    clock.now += 60
+    assert not cache.is_revoked('token-1')
+
+
+def test_revoke_uncached_token(clock):
+    cache = VerifiedTokenCache()
+
+    cache.revoke('token-1', exp=clock.now + 10)
+    cache.revoke('token-2')
+    cache.revoke('token-3', exp=clock.now - 10)
+
+    assert cache.is_revoked('token-1')
+    # Without an exp the revocation is kept until it is evicted
+    assert cache.is_revoked('token-2')
+    assert not cache.is_revoked('token-3')
+    clock.now += 10 ** 6
+    assert not cache.is_revoked('token-1')
+    assert cache.is_revoked('token-2')
+
+
+def test_clear_and_stats(clock):
+    cache = VerifiedTokenCache(max_size=1)
+    cache.set('token-1', {'sub': 'user-1', 'exp': clock.now + 60})
+    cache.set('token-2', {'sub': 'user-2', 'exp': clock.now + 60})
+    cache.revoke('token-3')
+
+    assert cache.get('token-1') is None
+    stats = cache.stats()
+    assert stats['tokens']['size'] == 1 and stats['tokens']['evictions'] == 1
+    assert stats['revoked'] == 1
+    assert cache.clear() == 1